@@ -0,0 +1,22 @@
+"""The Streamlit app as an ASGI application, with cache headers for the UI assets.
+
+    python -m insurance_predictor.assets build
+    uvicorn asgi:app --port 8501
+
+Same app as ``streamlit run main.py``, except that the quote component's
+built files are served by ``StaticAssets`` with long-lived cache headers and
+pre-compressed bodies (see ``insurance_predictor/assets.py``).
+"""
+
+import streamlit as st
+from starlette.middleware import Middleware
+
+from insurance_predictor.assets import StaticAssets
+
+if not hasattr(st, "App"):
+    raise ImportError(
+        f"asgi.py needs streamlit>=1.57 for st.App (installed: {st.__version__}); "
+        "run `pip install -r requirements.txt`, or use `streamlit run main.py`"
+    )
+
+app = st.App("main.py", middleware=[Middleware(StaticAssets)])
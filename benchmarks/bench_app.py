@@ -0,0 +1,90 @@
+"""Quote round trip through the Streamlit script, as the app serves it.
+
+    python -m benchmarks.bench_app
+    python -m benchmarks.bench_app --n 200 --json app.json
+
+The quote card's ``latency_ms`` covers ``normalize_profile`` and the memoized
+``predict_one`` only.  This drives ``main.py`` with Streamlit's ``AppTest``
+harness the way a Predict click does: the component value is set in session
+state and the whole script is rerun, so each sample covers the rerun,
+``serve_quote`` (validation, scoring, drift and shadow hooks, explanation,
+interval) and serializing the render args.  It reports both figures:
+
+* ``rerun`` - wall time of the script rerun, timed here;
+* ``latency_ms`` - what the card shows for the same quotes.
+
+``fresh`` profiles are all distinct, so every quote misses the memo;
+``repeat`` posts one profile again under a new id.  The browser side
+(websocket transfer and the iframe redrawing the card) is not included.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import sys
+import time
+import warnings
+from pathlib import Path
+from typing import Any
+
+from insurance_predictor import ROOT
+
+from .bench_inference import PROFILE, percentiles
+
+SEXES, SMOKERS = ("male", "female"), ("no", "yes")
+REGIONS = ("southwest", "southeast", "northwest", "northeast")
+
+
+def profiles(n: int):
+    grid = itertools.product(range(18, 65), SEXES, SMOKERS, REGIONS, (27.5, 31.0), range(6))
+    for _, (age, sex, smoker, region, bmi, children) in zip(range(n), grid):
+        yield {"age": age, "sex": sex, "bmi": bmi, "children": children, "smoker": smoker, "region": region}
+
+
+def bench(n: int, timeout: float) -> dict[str, Any]:
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(str(ROOT / "main.py"), default_timeout=timeout)
+    app.run()  # model load, explanation tables and the first page render
+    if app.exception:
+        raise RuntimeError(f"main.py failed: {app.exception}")
+    ids = itertools.count()
+    out = {}
+    for case, rows in (("fresh", profiles(n)), ("repeat", itertools.repeat(PROFILE, n))):
+        reruns, latencies = [], []
+        for profile in rows:
+            app.session_state["quote"] = {"id": next(ids), **profile}
+            t0 = time.perf_counter()
+            app.run()
+            reruns.append(time.perf_counter() - t0)
+            result = app.session_state["quote_result"]
+            if "error" in result:
+                raise RuntimeError(f"quote failed: {result['error']}")
+            latencies.append(result["latency_ms"] / 1e3)
+        out[case] = {"rerun": percentiles(reruns), "latency_ms": percentiles(latencies)}
+    return out
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="quote round trip through main.py")
+    parser.add_argument("--n", type=int, default=100, help="quotes per case")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds allowed per script run")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    warnings.simplefilter("ignore")
+    results = bench(args.n, args.timeout)
+
+    print(f"{'case':<8} {'':<11} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for case, r in results.items():
+        for name, p in r.items():
+            print(f"{case:<8} {name:<11} {p['p50_ms']:>6.2f} ms {p['p95_ms']:>6.2f} ms {p['p99_ms']:>6.2f} ms")
+    if args.json:
+        Path(args.json).write_text(json.dumps({"results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""Load, single-row and batch inference benchmarks.
+
+    python -m benchmarks.bench_inference --json results.json
+    python -m benchmarks.bench_inference --quick --compare results.json
+
+Measures, entirely offline:
+
+* artifact load time for each shipped pickle, and the latency of the first
+  prediction after loading ("cold"), each in a fresh subprocess;
+* warm single-row latency percentiles (p50/p95/p99) for ``model.predict``
+  on a one-row DataFrame and for ``Predictor.predict_one``;
+* batch throughput at 1 / 100 / 10k / 1M rows synthesized from the
+  ``insurance.csv`` distribution;
+* peak RSS of the benchmark process.
+
+Results are written as JSON together with the commit and library versions.
+``--compare`` reports the relative change of every timing against an earlier
+results file and exits with status 1 if any got slower than ``--tolerance``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+
+from insurance_predictor import ROOT
+from insurance_predictor.telemetry import peak_rss_mb
+
+from .common import synthesize_book
+
+ARTIFACTS = ["insurance_expense_predictor.pkl", "insurance_model.pkl"]
+BATCH_SIZES = [1, 100, 10_000, 1_000_000]
+PROFILE = {"age": 30, "sex": "male", "bmi": 27.5, "children": 1, "smoker": "no", "region": "southwest"}
+
+_COLD_SCRIPT = """
+import json, sys, time, warnings
+warnings.simplefilter("ignore")
+import joblib, pandas as pd
+t0 = time.perf_counter()
+model = joblib.load(sys.argv[1])
+t1 = time.perf_counter()
+model.predict(pd.DataFrame({k: [v] for k, v in json.loads(sys.argv[2]).items()}))
+t2 = time.perf_counter()
+print(json.dumps({"load_s": t1 - t0, "first_predict_s": t2 - t1}))
+"""
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    ms = np.asarray(samples) * 1e3
+    return {
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+        "n": len(samples),
+    }
+
+
+def time_calls(fn: Callable[[], Any], n: int, warmup: int = 10) -> list[float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def bench_cold(repeat: int) -> dict[str, Any]:
+    out = {}
+    for name in ARTIFACTS:
+        path = ROOT / name
+        runs = []
+        for _ in range(repeat):
+            proc = subprocess.run(
+                [sys.executable, "-c", _COLD_SCRIPT, str(path), json.dumps(PROFILE)],
+                capture_output=True, text=True, check=True,
+            )
+            runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        out[name] = {
+            "size_bytes": path.stat().st_size,
+            "load_ms": float(np.median([r["load_s"] for r in runs]) * 1e3),
+            "cold_predict_ms": float(np.median([r["first_predict_s"] for r in runs]) * 1e3),
+            "runs": repeat,
+        }
+    return out
+
+
+def bench_warm(n: int) -> dict[str, Any]:
+    import pandas as pd
+
+    from insurance_predictor.inference import get_predictor
+
+    predictor = get_predictor()
+    frame = pd.DataFrame({k: [v] for k, v in PROFILE.items()})
+    return {
+        "pipeline_predict": percentiles(time_calls(lambda: predictor.pipeline.predict(frame), n)),
+        "predictor_predict_one": percentiles(time_calls(lambda: predictor.predict_one(PROFILE), n)),
+    }
+
+
+def bench_batch(sizes: list[int], min_seconds: float) -> dict[str, Any]:
+    from insurance_predictor.inference import get_predictor
+
+    predictor = get_predictor()
+    paths = {"pipeline_predict": predictor.pipeline.predict, "predictor_predict": predictor.predict}
+    out: dict[str, Any] = {}
+    for size in sizes:
+        book = synthesize_book(size, seed=size)
+        row: dict[str, Any] = {}
+        for name, fn in paths.items():
+            fn(book.iloc[: min(size, 100)])
+            calls, t0 = 0, time.perf_counter()
+            while True:
+                fn(book)
+                calls += 1
+                elapsed = time.perf_counter() - t0
+                if elapsed >= min_seconds:
+                    break
+            row[name] = {"seconds_per_call": elapsed / calls, "rows_per_second": size * calls / elapsed}
+        row["peak_rss_mb"] = peak_rss_mb()
+        out[str(size)] = row
+    return out
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> dict[str, Any]:
+    import sklearn
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def _timings(results: dict[str, Any], prefix: str = "") -> dict[str, float]:
+    """Flatten results into {dotted.key: seconds-like value} (lower is better)."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_timings(value, name + "."))
+        elif isinstance(value, (int, float)) and key.endswith(("_ms", "seconds_per_call")):
+            flat[name] = float(value)
+    return flat
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> bool:
+    now, before = _timings(current["results"]), _timings(baseline["results"])
+    ok = True
+    print(f"\ncompared with {baseline['environment'].get('commit')} (tolerance {tolerance:.0%}):")
+    for key in sorted(now.keys() & before.keys()):
+        if before[key] <= 0:
+            continue
+        change = now[key] / before[key] - 1
+        flag = ""
+        if change > tolerance:
+            flag, ok = "  REGRESSION", False
+        print(f"  {key:<60} {before[key]:>10.3f} -> {now[key]:>10.3f} {change:>+7.1%}{flag}")
+    return ok
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="inference benchmarks")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown for --compare (default: 0.10)")
+    parser.add_argument("--quick", action="store_true", help="fewer repetitions and no 1M-row batch")
+    parser.add_argument("--sizes", type=int, nargs="+", help=f"batch sizes (default: {BATCH_SIZES})")
+    args = parser.parse_args(argv)
+
+    import warnings
+
+    warnings.simplefilter("ignore")
+    sizes = args.sizes or ([s for s in BATCH_SIZES if s <= 10_000] if args.quick else BATCH_SIZES)
+    results = {
+        "cold": bench_cold(repeat=1 if args.quick else 3),
+        "warm_single_row": bench_warm(n=200 if args.quick else 2000),
+        "batch": bench_batch(sizes, min_seconds=0.2 if args.quick else 1.0),
+    }
+    results["peak_rss_mb"] = peak_rss_mb()
+    report = {"environment": environment(), "results": results}
+
+    for name, r in results["cold"].items():
+        print(f"{name:<34} {r['size_bytes'] / 1e6:5.1f} MB  load {r['load_ms']:8.1f} ms  "
+              f"first predict {r['cold_predict_ms']:7.1f} ms")
+    for name, r in results["warm_single_row"].items():
+        print(f"{name:<34} p50 {r['p50_ms']:7.3f} ms  p95 {r['p95_ms']:7.3f} ms  p99 {r['p99_ms']:7.3f} ms")
+    for size, row in results["batch"].items():
+        cells = "  ".join(f"{k} {v['rows_per_second']:>12,.0f} rows/s" for k, v in row.items() if isinstance(v, dict))
+        print(f"batch {int(size):>9,}  {cells}  (peak RSS {row['peak_rss_mb']:.0f} MB)")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        return 0 if compare(report, baseline, args.tolerance) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
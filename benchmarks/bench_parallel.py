@@ -0,0 +1,71 @@
+"""Scaling curve for sharded process-pool scoring.
+
+    python -m benchmarks.bench_parallel --rows 1000000 --workers 1 2 4 8 16 32
+
+Scores the same synthetic book with each worker count and prints rows/s,
+speed-up over one worker and parallel efficiency.  ``--json`` writes the
+curve to a file for comparison between machines or commits.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+
+from insurance_predictor import DEFAULT_MODEL_PATH
+from insurance_predictor.parallel import ParallelScorer, default_workers
+
+from .common import synthesize_book
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="process-pool scaling benchmark")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        help="worker counts to try (default: powers of two up to the core count)")
+    parser.add_argument("--shard-size", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3, help="best of N runs per worker count")
+    parser.add_argument("--model", default=str(DEFAULT_MODEL_PATH))
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    counts = args.workers
+    if not counts:
+        cores = default_workers()
+        counts = [1 << i for i in range(cores.bit_length()) if 1 << i <= cores]
+        if counts[-1] != cores:
+            counts.append(cores)
+
+    book = synthesize_book(args.rows)
+    results = []
+    baseline = None
+    print(f"{'workers':>7} {'seconds':>9} {'rows/s':>12} {'speed-up':>9} {'efficiency':>10}")
+    for n in counts:
+        with ParallelScorer(args.model, workers=n, shard_size=args.shard_size) as scorer:
+            scorer.predict(book.iloc[: args.shard_size * n])  # start the pool outside the timing
+            best = float("inf")
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                scorer.predict(book)
+                best = min(best, time.perf_counter() - t0)
+        baseline = baseline or best
+        row = {
+            "workers": n,
+            "seconds": best,
+            "rows_per_second": args.rows / best,
+            "speedup": baseline / best,
+            "efficiency": baseline / best / n,
+        }
+        results.append(row)
+        print(f"{n:>7} {best:>9.3f} {row['rows_per_second']:>12,.0f} "
+              f"{row['speedup']:>8.2f}x {row['efficiency']:>9.0%}")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"rows": args.rows, "shard_size": args.shard_size, "results": results}, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,127 @@
+"""Full-precision vs quantized forest: accuracy, memory and latency.
+
+    python -m benchmarks.bench_quantized --json quantized.json
+    python -m benchmarks.bench_quantized --quick
+
+Compiles the model (or loads an ``.icpf`` export), quantizes it (see
+``insurance_predictor/quantized.py``) and reports:
+
+* ``r2_score`` of both forests on the held-out test rows of
+  ``insurance.csv`` (the notebook's split) and the largest change in any
+  quote;
+* bytes per node and in total for the arrays a traversal reads, and the
+  size of each forest saved as an artifact;
+* warm single-row latency percentiles and batch time at the
+  ``bench_inference`` sizes, both through ``predict`` on the same rows.
+
+The lookup table is not involved: both forests walk every tree.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+from insurance_predictor import DEFAULT_MODEL_PATH
+from insurance_predictor.artifact import SUFFIX, load, save
+from insurance_predictor.compiled import CompiledForest, compile_pipeline
+from insurance_predictor.quantized import accuracy, quantize
+from insurance_predictor.training.pipeline import holdout_split, load_dataset
+
+from .bench_inference import BATCH_SIZES, PROFILE, percentiles, time_calls
+from .common import DATA_PATH, synthesize_book
+
+# Arrays read by a traversal; ``cover`` and the split-value table are not.
+WALKED = ("feature", "threshold", "code", "child", "value", "roots")
+
+
+def memory(forest: CompiledForest) -> dict[str, Any]:
+    arrays = forest.to_arrays()
+    walked = sum(a.nbytes for name, a in arrays.items() if name in WALKED)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / f"model{SUFFIX}"
+        save(forest, path)
+        file_bytes = path.stat().st_size
+    return {
+        "dtypes": {name: a.dtype.str for name, a in arrays.items()},
+        "walked_bytes": walked,
+        "bytes_per_node": walked / len(forest.value),
+        "total_bytes": sum(a.nbytes for a in arrays.values()),
+        "file_bytes": file_bytes,
+    }
+
+
+def batch_seconds(forest: CompiledForest, book: pd.DataFrame, min_seconds: float) -> float:
+    forest.predict(book.iloc[:100])
+    calls, t0 = 0, time.perf_counter()
+    while True:
+        forest.predict(book)
+        calls += 1
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_seconds:
+            return elapsed / calls
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="quantized forest benchmark")
+    parser.add_argument("--model", default=str(DEFAULT_MODEL_PATH), help="pipeline pickle or .icpf artifact")
+    parser.add_argument("--quick", action="store_true", help="fewer repetitions and no 1M-row batch")
+    parser.add_argument("--sizes", type=int, nargs="+", help=f"batch sizes (default: {BATCH_SIZES})")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    import warnings
+
+    warnings.simplefilter("ignore")
+    if Path(args.model).suffix == SUFFIX:
+        full = load(args.model)
+    else:
+        from insurance_predictor.registry import get_model
+
+        full = compile_pipeline(get_model(args.model))
+    forests = {"full": full, "quantized": quantize(full)}
+
+    _, X_test, _, y_test = holdout_split(*load_dataset(DATA_PATH))
+    results: dict[str, Any] = {"accuracy": accuracy(full, forests["quantized"], X_test, y_test)}
+    results["memory"] = {name: memory(f) for name, f in forests.items()}
+    row = pd.DataFrame({k: [v] for k, v in PROFILE.items()})
+    n = 300 if args.quick else 3000
+    results["single_row"] = {name: percentiles(time_calls(lambda f=f: f.predict(row), n))
+                             for name, f in forests.items()}
+    sizes = args.sizes or [s for s in BATCH_SIZES if not (args.quick and s > 100_000)]
+    results["batch"] = {}
+    for size in sizes:
+        book = synthesize_book(size, seed=size)
+        results["batch"][str(size)] = {
+            name: batch_seconds(f, book, 0.2 if args.quick else 1.0) for name, f in forests.items()
+        }
+
+    acc, mem = results["accuracy"], results["memory"]
+    print(f"r2 {acc['r2']:.6f} -> {acc['r2_quantized']:.6f} ({acc['r2_delta']:+.2e}); "
+          f"max quote change ${acc['max_abs_diff']:.4f} ({acc['max_rel_diff']:.1e})")
+    print(f"{'':<10} {'bytes/node':>10} {'walked':>10} {'file':>10}")
+    for name, m in mem.items():
+        print(f"{name:<10} {m['bytes_per_node']:>10.1f} {m['walked_bytes'] / 1e6:>8.2f}MB "
+              f"{m['file_bytes'] / 1e6:>8.2f}MB")
+    print(f"{'rows':>10} {'full':>12} {'quantized':>12} {'speed-up':>9}")
+    single = results["single_row"]
+    print(f"{'1 (p50)':>10} {single['full']['p50_ms']:>10.3f}ms {single['quantized']['p50_ms']:>10.3f}ms "
+          f"{single['full']['p50_ms'] / single['quantized']['p50_ms']:>8.2f}x")
+    for size, r in results["batch"].items():
+        print(f"{int(size):>10,} {r['full'] * 1e3:>10.2f}ms {r['quantized'] * 1e3:>10.2f}ms "
+              f"{r['full'] / r['quantized']:>8.2f}x")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,140 @@
+"""Cold-start benchmark: fresh process to first answered quote.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --repeat 10 --json startup.json --budget-ms 200
+
+Each path is run in a new interpreter, ``--repeat`` times:
+
+* ``pickle_pipeline`` - ``joblib.load`` and ``model.predict`` on a one-row
+  DataFrame (what the app did originally);
+* ``pickle_predictor`` - ``get_predictor`` on the pickle and ``predict_one``;
+* ``runtime_icpf`` - ``runtime.load_runtime`` on the exported artifact and
+  ``predict_one`` (NumPy only).
+
+For each, ``in_process_ms`` is measured inside the child from the first
+line of the script (imports, load and the first quote) and ``wall_ms`` by
+the parent from spawning the process until the quote is printed, which adds
+interpreter start-up (shown separately as ``interpreter``).  The child also
+reports which of pandas/sklearn/scipy/joblib it imported.  ``--budget-ms``
+exits with status 1 if the runtime's median in-process time exceeds it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from insurance_predictor import ROOT
+
+PICKLE = ROOT / "insurance_expense_predictor.pkl"
+PROFILE = {"age": 30, "sex": "male", "bmi": 27.5, "children": 1, "smoker": "no", "region": "southwest"}
+
+_PRELUDE = """
+import time
+t0 = time.perf_counter()
+import json, sys
+"""
+_EPILOGUE = """
+heavy = [m for m in ("pandas", "sklearn", "scipy", "joblib") if m in sys.modules]
+print(json.dumps({"in_process_ms": (time.perf_counter() - t0) * 1e3, "cost": float(cost), "heavy": heavy}), flush=True)
+"""
+SCRIPTS = {
+    "interpreter": """cost = 0.0""",
+    "pickle_pipeline": """
+import warnings; warnings.simplefilter("ignore")
+import joblib, pandas as pd
+model = joblib.load(sys.argv[1])
+cost = model.predict(pd.DataFrame({k: [v] for k, v in json.loads(sys.argv[2]).items()}))[0]
+""",
+    "pickle_predictor": """
+import warnings; warnings.simplefilter("ignore")
+from insurance_predictor.inference import get_predictor
+cost = get_predictor(sys.argv[1]).predict_one(json.loads(sys.argv[2]))
+""",
+    "runtime_icpf": """
+from insurance_predictor.runtime import load_runtime
+cost = load_runtime(sys.argv[1]).predict_one(json.loads(sys.argv[2]))
+""",
+}
+
+
+def run_once(script: str, model: Path) -> dict[str, Any]:
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", _PRELUDE + script + _EPILOGUE, str(model), json.dumps(PROFILE)],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, cwd=ROOT, env=env,
+    )
+    line = proc.stdout.readline()
+    wall = time.perf_counter() - t0
+    _, err = proc.communicate()
+    if proc.returncode or not line:
+        raise RuntimeError(f"benchmark child failed:\n{err}")
+    result = json.loads(line)
+    result["wall_ms"] = wall * 1e3
+    return result
+
+
+def bench(model_paths: dict[str, Path], repeat: int) -> dict[str, Any]:
+    out = {}
+    for name, script in SCRIPTS.items():
+        runs = [run_once(script, model_paths.get(name, PICKLE)) for _ in range(repeat)]
+        out[name] = {
+            "in_process_ms": float(np.median([r["in_process_ms"] for r in runs])),
+            "wall_ms": float(np.median([r["wall_ms"] for r in runs])),
+            "wall_min_ms": float(min(r["wall_ms"] for r in runs)),
+            "heavy_imports": runs[0]["heavy"],
+            "cost": runs[0]["cost"],
+            "runs": repeat,
+        }
+    return out
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="cold-start benchmark")
+    parser.add_argument("--artifact", help="exported .icpf (default: export the pickle to a temporary file)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--budget-ms", type=float, help="fail if runtime_icpf's median in-process time exceeds this")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        artifact = Path(args.artifact) if args.artifact else None
+        if artifact is None:
+            import warnings
+
+            from insurance_predictor.artifact import export
+
+            warnings.simplefilter("ignore")
+            artifact = Path(tmp) / "model.icpf"
+            export(PICKLE, artifact)
+        results = bench({"runtime_icpf": artifact}, args.repeat)
+
+    print(f"{'path':<18} {'in-process':>12} {'wall (median)':>14} {'wall (min)':>11}  heavy imports")
+    for name, r in results.items():
+        print(f"{name:<18} {r['in_process_ms']:>9.1f} ms {r['wall_ms']:>11.1f} ms {r['wall_min_ms']:>8.1f} ms  "
+              f"{', '.join(r['heavy_imports']) or '-'}")
+    costs = {round(r["cost"], 6) for name, r in results.items() if name != "interpreter"}
+    if len(costs) != 1:
+        print(f"warning: paths disagree on the quote: {sorted(costs)}", file=sys.stderr)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({"results": results}, indent=2))
+    if args.budget_ms is not None and results["runtime_icpf"]["in_process_ms"] > args.budget_ms:
+        print(f"runtime_icpf took {results['runtime_icpf']['in_process_ms']:.1f} ms "
+              f"(budget {args.budget_ms:.0f} ms)", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
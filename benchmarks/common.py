@@ -0,0 +1,23 @@
+"""Shared helpers for the benchmark scripts."""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from insurance_predictor import ROOT
+
+DATA_PATH = ROOT / "insurance.csv"
+
+
+def synthesize_book(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Bootstrap ``n_rows`` policyholders from the ``insurance.csv`` distribution.
+
+    Rows are resampled with replacement and BMI is jittered by a small amount
+    so that the synthetic book is not just repeated copies of the 1,338 rows.
+    """
+    rng = np.random.default_rng(seed)
+    base = pd.read_csv(DATA_PATH).drop(columns="expenses")
+    book = base.iloc[rng.integers(0, len(base), n_rows)].reset_index(drop=True)
+    book["bmi"] = np.round(np.clip(book["bmi"] + rng.normal(0, 1.0, n_rows), 15.0, 55.0), 1)
+    return book
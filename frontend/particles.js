@@ -0,0 +1,360 @@
+// ── PARTICLE FIELD ──────────────────────────────────────────────────────────
+// Background network of drifting nodes plus the rising ambient particles,
+// drawn on one canvas.  Used by index.html and benchmarks/bench_particles.html.
+//
+// Per frame the cost is roughly linear in the node count:
+// * nodes are bucketed into a uniform grid with cells as wide as the link
+//   distance, so each node is only compared with its own and the forward
+//   neighbouring cells, and pairs are culled on squared distance before any
+//   square root is taken;
+// * edges are collected per alpha bucket and stroked as one path per
+//   bucket, nodes and ambient particles are filled the same way, so a frame
+//   issues a couple of dozen draw calls however many edges there are;
+// * all state lives in preallocated typed arrays (the ambient particles
+//   used to be DOM nodes created every 850 ms and removed 22 s later).
+// The animation stops while the tab is hidden and draws a single still frame
+// under prefers-reduced-motion.  With `adaptive` on, the node count follows
+// the measured per-frame work: it shrinks while frames cost more than
+// `budgetMs` and creeps back up when they are cheap, and at the floor the
+// field drops to every other frame.
+(function (global) {
+  'use strict';
+
+  const DEFAULTS = {
+    nodes: 65,             // node count, and the ceiling for the adaptive count
+    minNodes: 20,
+    linkDist: 145,         // px: closer pairs are joined by an edge
+    linkAlpha: 0.075,      // edge opacity at distance 0, fading to 0 at linkDist
+    alphaBuckets: 8,
+    mouseDist: 130,
+    speedCap: 1.6,
+    ambient: true,
+    ambientEveryMs: 850,
+    ambientLifeMs: 22000,
+    ambientMax: 32,
+    budgetMs: 4,           // per-frame script time the adaptive count aims under
+    adaptive: true,
+    random: Math.random,
+  };
+  const FRAME_MS = 1000 / 60;
+  const TAU = Math.PI * 2;
+  const NODE_RGB = '56,189,248';
+  // Ambient colours and their peak opacity; opacity is drawn in a few levels.
+  const AMBIENT = [['56,189,248', .45], ['129,140,248', .32], ['52,211,153', .32], ['251,191,36', .25]];
+  const AMBIENT_LEVELS = 5;
+
+  class ParticleField {
+    constructor(canvas, options) {
+      const o = this.o = Object.assign({}, DEFAULTS, options || {});
+      this.canvas = canvas;
+      this.ctx = canvas.getContext('2d');
+      this.W = this.H = 0;
+      this.count = o.nodes;
+      this.mx = this.my = -9999;
+
+      const cap = o.nodes;
+      this.x = new Float32Array(cap); this.y = new Float32Array(cap);
+      this.vx = new Float32Array(cap); this.vy = new Float32Array(cap);
+      this.r = new Float32Array(cap);
+      this.alpha = new Uint8Array(cap);             // opacity bucket
+      this.cellItems = new Int32Array(cap);
+      this.nodeCell = new Int32Array(cap);
+      this.cellStart = new Int32Array(1);
+
+      const B = o.alphaBuckets;
+      this.segs = Array.from({ length: B }, () => new Float32Array(cap * 16));
+      this.segCount = new Int32Array(B);
+      this.edgeStyles = Array.from({ length: B }, (_, k) => `rgba(${NODE_RGB},${(o.linkAlpha * (k + .5) / B).toFixed(4)})`);
+      this.nodeStyles = Array.from({ length: B }, (_, k) => `rgba(${NODE_RGB},${(.08 + .55 * (k + .5) / B).toFixed(3)})`);
+
+      const A = o.ambientMax;
+      this.ax = new Float32Array(A); this.size = new Float32Array(A);
+      this.age = new Float32Array(A); this.delay = new Float32Array(A); this.dur = new Float32Array(A);
+      this.colour = new Uint8Array(A); this.live = new Uint8Array(A);
+      this.spawnIn = 0;
+      this.ambientStyles = AMBIENT.map(([rgb, peak]) =>
+        Array.from({ length: AMBIENT_LEVELS }, (_, l) => `rgba(${rgb},${(peak * (l + 1) / AMBIENT_LEVELS).toFixed(3)})`));
+
+      this.running = false;
+      this.throttled = false;
+      this.skip = 0;
+      this.last = 0;
+      this.avgMs = 0;
+      this.avgGap = FRAME_MS;
+      this.sinceAdapt = 0;
+      this.edges = 0;
+      this._frame = this._frame.bind(this);
+    }
+
+    // Size the canvas (CSS pixels) and the grid; nodes keep their relative place.
+    resize(w, h) {
+      const first = !this.W || !this.H, sx = w / this.W, sy = h / this.H;
+      this.W = this.canvas.width = w;
+      this.H = this.canvas.height = h;
+      for (let i = 0; i < this.o.nodes; i++) {
+        if (first) this._spawnNode(i);
+        else { this.x[i] *= sx; this.y[i] *= sy; }
+      }
+      this.cols = Math.max(1, Math.ceil(w / this.o.linkDist));
+      this.rows = Math.max(1, Math.ceil(h / this.o.linkDist));
+      this.cellStart = new Int32Array(this.cols * this.rows + 1);
+      this.cellFill = new Int32Array(this.cols * this.rows);
+    }
+
+    setCount(n) {
+      n = Math.max(1, Math.min(this.o.nodes, n | 0));
+      for (let i = this.count; i < n; i++) this._spawnNode(i);   // reuse pooled slots
+      this.count = n;
+    }
+
+    // Follow the window, the pointer, tab visibility and the motion preference.
+    attach() {
+      const fit = () => this.resize(global.innerWidth, global.innerHeight);
+      fit();
+      global.addEventListener('resize', () => { fit(); this._sync(); });
+      global.document.addEventListener('mousemove', e => { this.mx = e.clientX; this.my = e.clientY; });
+      global.document.addEventListener('visibilitychange', () => this._sync());
+      this.motion = global.matchMedia ? global.matchMedia('(prefers-reduced-motion: reduce)') : null;
+      if (this.motion) {
+        const onChange = () => this._sync();
+        this.motion.addEventListener ? this.motion.addEventListener('change', onChange) : this.motion.addListener(onChange);
+      }
+      this._sync();
+      return this;
+    }
+
+    start() {
+      if (this.running) return;
+      this.running = true;
+      this.last = 0;
+      this.raf = global.requestAnimationFrame(this._frame);
+    }
+
+    stop() {
+      this.running = false;
+      if (this.raf) global.cancelAnimationFrame(this.raf);
+    }
+
+    // Advance by dt milliseconds and draw.  dt = 0 draws a still frame.
+    tick(dt) {
+      const f = Math.min(dt, 3 * FRAME_MS) / FRAME_MS;
+      if (f > 0) this._move(f);
+      this._grid();
+      this._links();
+      const ambient = this.o.ambient && f > 0;
+      if (ambient) this._ambient(dt);
+      const ctx = this.ctx;
+      ctx.clearRect(0, 0, this.W, this.H);
+      this._drawNodes();
+      this._drawEdges();
+      if (ambient) this._drawAmbient();
+    }
+
+    _sync() {
+      const still = this.motion && this.motion.matches;
+      if (global.document.hidden) {
+        this.stop();
+      } else if (still) {
+        this.stop();
+        this.tick(0);
+      } else {
+        this.start();
+      }
+    }
+
+    _frame(now) {
+      if (!this.running) return;
+      this.raf = global.requestAnimationFrame(this._frame);
+      if (this.throttled && (this.skip ^= 1)) return;
+      const dt = this.last ? now - this.last : FRAME_MS;
+      this.last = now;
+      const t0 = global.performance.now();
+      this.tick(dt);
+      this._adapt(global.performance.now() - t0, dt);
+    }
+
+    _adapt(ms, gap) {
+      const o = this.o;
+      this.avgMs = this.avgMs ? this.avgMs * .95 + ms * .05 : ms;
+      this.avgGap = this.avgGap * .95 + Math.min(gap, 200) * .05;
+      if (!o.adaptive || ++this.sinceAdapt < 30) return;
+      this.sinceAdapt = 0;
+      // Over budget, or the page as a whole is missing frames (< 25 fps).
+      const slow = this.avgMs > o.budgetMs || (!this.throttled && this.avgGap > 40);
+      if (slow && this.count > o.minNodes) {
+        this.setCount(Math.max(o.minNodes, Math.floor(this.count * .85)));
+      } else if (slow) {
+        this.throttled = true;
+      } else if (this.avgMs < o.budgetMs / 2) {
+        if (this.throttled) this.throttled = false;
+        else if (this.count < o.nodes) this.setCount(this.count + 1);
+      }
+    }
+
+    _spawnNode(i) {
+      const rnd = this.o.random;
+      this.x[i] = rnd() * this.W;
+      this.y[i] = rnd() * this.H;
+      this.vx[i] = (rnd() - .5) * .42;
+      this.vy[i] = (rnd() - .5) * .42;
+      this.r[i] = rnd() * 1.6 + .4;
+      this.alpha[i] = Math.min(this.o.alphaBuckets - 1, rnd() * this.o.alphaBuckets | 0);
+    }
+
+    _move(f) {
+      const { x, y, vx, vy, W, H, mx, my } = this;
+      const M2 = this.o.mouseDist * this.o.mouseDist, cap2 = this.o.speedCap * this.o.speedCap;
+      for (let i = 0; i < this.count; i++) {
+        x[i] += vx[i] * f; y[i] += vy[i] * f;
+        if (x[i] < 0 || x[i] > W) vx[i] = -vx[i];
+        if (y[i] < 0 || y[i] > H) vy[i] = -vy[i];
+        const dx = x[i] - mx, dy = y[i] - my, d2 = dx * dx + dy * dy;
+        if (d2 < M2 && d2 > 0) {
+          const k = .09 * f / Math.sqrt(d2);
+          vx[i] += dx * k; vy[i] += dy * k;
+        }
+        if (vx[i] * vx[i] + vy[i] * vy[i] > cap2) { vx[i] *= .97; vy[i] *= .97; }
+      }
+    }
+
+    // Counting sort of the nodes by grid cell.
+    _grid() {
+      const { x, y, cols, rows, cellStart, cellFill, cellItems, nodeCell } = this;
+      const L = this.o.linkDist, n = this.count;
+      cellStart.fill(0);
+      for (let i = 0; i < n; i++) {
+        const cx = Math.min(cols - 1, Math.max(0, x[i] / L | 0));
+        const cy = Math.min(rows - 1, Math.max(0, y[i] / L | 0));
+        const c = cy * cols + cx;
+        nodeCell[i] = c;
+        cellStart[c + 1]++;
+      }
+      for (let c = 0; c < cols * rows; c++) cellStart[c + 1] += cellStart[c];
+      cellFill.set(cellStart.subarray(0, cols * rows));
+      for (let i = 0; i < n; i++) cellItems[cellFill[nodeCell[i]]++] = i;
+    }
+
+    // Each pair once: a node's own cell (later entries), then the cells to
+    // the right, below-left, below and below-right.
+    _links() {
+      const { cols, rows, cellStart, cellItems } = this;
+      this.segCount.fill(0);
+      this.edges = 0;
+      for (let cy = 0; cy < rows; cy++) {
+        for (let cx = 0; cx < cols; cx++) {
+          const c = cy * cols + cx, end = cellStart[c + 1];
+          for (let a = cellStart[c]; a < end; a++) {
+            const i = cellItems[a];
+            for (let b = a + 1; b < end; b++) this._pair(i, cellItems[b]);
+            if (cx + 1 < cols) this._scan(i, c + 1);
+            if (cy + 1 < rows) {
+              if (cx > 0) this._scan(i, c + cols - 1);
+              this._scan(i, c + cols);
+              if (cx + 1 < cols) this._scan(i, c + cols + 1);
+            }
+          }
+        }
+      }
+    }
+
+    _scan(i, c) {
+      const { cellStart, cellItems } = this;
+      for (let b = cellStart[c], end = cellStart[c + 1]; b < end; b++) this._pair(i, cellItems[b]);
+    }
+
+    _pair(i, j) {
+      const { x, y } = this, L = this.o.linkDist;
+      const dx = x[i] - x[j], dy = y[i] - y[j], d2 = dx * dx + dy * dy;
+      if (d2 >= L * L) return;
+      const B = this.o.alphaBuckets;
+      const k = Math.min(B - 1, (1 - Math.sqrt(d2) / L) * B | 0);
+      let buf = this.segs[k];
+      const at = this.segCount[k] * 4;
+      if (at + 4 > buf.length) {
+        const grown = new Float32Array(buf.length * 2);
+        grown.set(buf);
+        buf = this.segs[k] = grown;
+      }
+      buf[at] = x[i]; buf[at + 1] = y[i]; buf[at + 2] = x[j]; buf[at + 3] = y[j];
+      this.segCount[k]++;
+      this.edges++;
+    }
+
+    _drawNodes() {
+      const { ctx, x, y, r, alpha } = this;
+      for (let k = 0; k < this.o.alphaBuckets; k++) {
+        ctx.beginPath();
+        let any = false;
+        for (let i = 0; i < this.count; i++) {
+          if (alpha[i] !== k) continue;
+          ctx.moveTo(x[i] + r[i], y[i]);
+          ctx.arc(x[i], y[i], r[i], 0, TAU);
+          any = true;
+        }
+        if (any) { ctx.fillStyle = this.nodeStyles[k]; ctx.fill(); }
+      }
+    }
+
+    _drawEdges() {
+      const ctx = this.ctx;
+      ctx.lineWidth = .5;
+      for (let k = 0; k < this.o.alphaBuckets; k++) {
+        const n = this.segCount[k] * 4, buf = this.segs[k];
+        if (!n) continue;
+        ctx.beginPath();
+        for (let e = 0; e < n; e += 4) {
+          ctx.moveTo(buf[e], buf[e + 1]);
+          ctx.lineTo(buf[e + 2], buf[e + 3]);
+        }
+        ctx.strokeStyle = this.edgeStyles[k];
+        ctx.stroke();
+      }
+    }
+
+    // Rising particles: as the old CSS animation, from the bottom edge to
+    // 80 px above the top over 7-20 s, fading in and out, looping until
+    // their 22 s life is over.
+    _ambient(dt) {
+      const o = this.o, rnd = o.random;
+      for (let p = 0; p < o.ambientMax; p++) {
+        if (this.live[p] && (this.age[p] += dt) >= o.ambientLifeMs) this.live[p] = 0;
+      }
+      this.spawnIn -= dt;
+      if (this.spawnIn > 0) return;
+      this.spawnIn += o.ambientEveryMs;
+      if (this.spawnIn < 0) this.spawnIn = o.ambientEveryMs;   // after a pause
+      const p = this.live.indexOf(0);
+      if (p < 0) return;
+      this.live[p] = 1;
+      this.age[p] = 0;
+      this.ax[p] = rnd() * this.W;
+      this.size[p] = rnd() * 4.5 + .8;
+      this.colour[p] = rnd() * AMBIENT.length | 0;
+      this.dur[p] = (rnd() * 13 + 7) * 1000;
+      this.delay[p] = rnd() * 5000;
+    }
+
+    _drawAmbient() {
+      const { ctx, H } = this, o = this.o;
+      for (let c = 0; c < AMBIENT.length; c++) {
+        for (let l = 0; l < AMBIENT_LEVELS; l++) {
+          ctx.beginPath();
+          let any = false;
+          for (let p = 0; p < o.ambientMax; p++) {
+            if (!this.live[p] || this.colour[p] !== c || this.age[p] < this.delay[p]) continue;
+            const t = ((this.age[p] - this.delay[p]) / this.dur[p]) % 1;
+            const fade = t < .08 ? t / .08 : t < .92 ? 1 - (t - .08) / .84 * .55 : .45 * (1 - (t - .92) / .08);
+            if (Math.min(AMBIENT_LEVELS - 1, fade * AMBIENT_LEVELS | 0) !== l || fade <= 0) continue;
+            const rad = this.size[p] / 2, px = this.ax[p], py = H - t * (H + 80);
+            ctx.moveTo(px + rad, py);
+            ctx.arc(px, py, rad, 0, TAU);
+            any = true;
+          }
+          if (any) { ctx.fillStyle = this.ambientStyles[c][l]; ctx.fill(); }
+        }
+      }
+    }
+  }
+
+  global.ParticleField = ParticleField;
+})(typeof window !== 'undefined' ? window : globalThis);
@@ -0,0 +1,10 @@
+"""Serving and scoring helpers for the insurance expense predictor.
+
+Submodules are imported on demand so that lightweight entry points do not
+pay for scikit-learn or pandas unless they need them.
+"""
+
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_MODEL_PATH = ROOT / "insurance_expense_predictor.pkl"
@@ -0,0 +1,270 @@
+"""Compact, versioned, pickle-free model artifact.
+
+The joblib pickle stores the whole sklearn object graph (3.7 MB, and it has
+to be unpickled, which runs arbitrary code and takes about a second).  This
+format stores only what prediction needs: the ``CompiledForest`` arrays with
+their narrow integer types, plus a JSON header describing the inputs.
+``--quantize`` stores the reduced-precision ``QuantizedForest`` instead (see
+``quantized.py``).
+
+Layout (all integers little-endian)::
+
+    b"ICPF"  magic
+    u16      major format version
+    u16      minor format version
+    u32      header length in bytes
+    ...      UTF-8 JSON header
+    ...      zero padding to a 64-byte boundary, then each array's raw bytes,
+             each starting on a 64-byte boundary
+
+The header records the feature schema, the training data hash, the sklearn
+version that exported the model, the source artifact's hash and, for every
+array, its dtype, shape, offset and compression.  Uncompressed files are
+loaded by memory-mapping: arrays are views into the page cache, so load is
+near-instant and every process serving the same file shares one copy.
+``compress=True`` zlib-compresses each array for shipping; such files are
+decompressed into memory on load instead.
+
+    python -m insurance_predictor.artifact export insurance_expense_predictor.pkl -o model.icpf
+    python -m insurance_predictor.artifact compare insurance_expense_predictor.pkl model.icpf
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Mapping
+
+import numpy as np
+
+from .compiled import CompiledForest
+
+MAGIC = b"ICPF"
+# 1.1 added the optional per-node ``cover`` array used by explanations;
+# 1.2 added quantized forests (``"model": "quantized_random_forest"``).
+FORMAT_VERSION = (1, 2)
+SUFFIX = ".icpf"
+ALIGN = 64
+_PREAMBLE = struct.Struct("<4sHHI")
+
+
+def _align(n: int) -> int:
+    return -(-n // ALIGN) * ALIGN
+
+
+def save(
+    forest: CompiledForest,
+    path: str | os.PathLike,
+    metadata: Mapping[str, Any] | None = None,
+    compress: bool = False,
+) -> None:
+    """Write ``forest`` to ``path``; ``metadata`` is merged into the header."""
+    blobs = []
+    entries = {}
+    for name, array in forest.to_arrays().items():
+        array = np.ascontiguousarray(array)
+        raw = array.astype(array.dtype.newbyteorder("<"), copy=False).tobytes()
+        data = zlib.compress(raw, 6) if compress else raw
+        entries[name] = {
+            "dtype": array.dtype.newbyteorder("<").str,
+            "shape": list(array.shape),
+            "nbytes": len(data),
+            "compression": "zlib" if compress else "none",
+        }
+        blobs.append((name, data))
+
+    header = {
+        "format_version": list(FORMAT_VERSION),
+        "model": forest.kind,
+        "n_trees": forest.n_trees,
+        "n_nodes": int(len(forest.value)),
+        "schema": forest.schema(),
+        **(metadata or {}),
+        "arrays": entries,
+    }
+    # Offsets depend on the header length, which depends on the offsets;
+    # iterate until the header stops growing.
+    offset_base = 0
+    while True:
+        offset = offset_base
+        for name, data in blobs:
+            entries[name]["offset"] = offset
+            offset = _align(offset + len(data))
+        encoded = json.dumps(header, sort_keys=True).encode()
+        start = _align(_PREAMBLE.size + len(encoded))
+        if start == offset_base:
+            break
+        offset_base = start
+
+    tmp = Path(path).with_name(Path(path).name + ".tmp")
+    with open(tmp, "wb") as fh:
+        fh.write(_PREAMBLE.pack(MAGIC, *FORMAT_VERSION, len(encoded)))
+        fh.write(encoded)
+        for name, data in blobs:
+            fh.seek(entries[name]["offset"])
+            fh.write(data)
+    os.replace(tmp, path)
+
+
+def read_header(path: str | os.PathLike) -> dict[str, Any]:
+    with open(path, "rb") as fh:
+        return _parse_header(fh.read(_PREAMBLE.size), fh)
+
+
+def _parse_header(preamble: bytes, fh) -> dict[str, Any]:
+    if len(preamble) < _PREAMBLE.size:
+        raise ValueError("not a model artifact: file too short")
+    magic, major, minor, length = _PREAMBLE.unpack(preamble)
+    if magic != MAGIC:
+        raise ValueError("not a model artifact: bad magic")
+    if major != FORMAT_VERSION[0]:
+        raise ValueError(f"unsupported artifact format {major}.{minor} (this reader handles {FORMAT_VERSION[0]}.x)")
+    return json.loads(fh.read(length))
+
+
+def load(path: str | os.PathLike, mmap_mode: bool = True) -> CompiledForest:
+    """Load an artifact; uncompressed arrays are zero-copy views of an mmap."""
+    forest, _ = load_with_header(path, mmap_mode)
+    return forest
+
+
+def load_with_header(path: str | os.PathLike, mmap_mode: bool = True) -> tuple[CompiledForest, dict[str, Any]]:
+    with open(path, "rb") as fh:
+        header = _parse_header(fh.read(_PREAMBLE.size), fh)
+        if mmap_mode:
+            buf: Any = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            fh.seek(0)
+            buf = fh.read()
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        dtype = np.dtype(entry["dtype"])
+        start, size = entry["offset"], entry["nbytes"]
+        if entry["compression"] == "zlib":
+            raw = zlib.decompress(buf[start:start + size])
+            array = np.frombuffer(raw, dtype=dtype)
+        elif entry["compression"] == "none":
+            array = np.frombuffer(buf, dtype=dtype, count=size // dtype.itemsize, offset=start)
+        else:
+            raise ValueError(f"unknown compression {entry['compression']!r} for array {name}")
+        arrays[name] = array.reshape(entry["shape"])
+    kind = header.get("model", CompiledForest.kind)
+    if kind == CompiledForest.kind:
+        return CompiledForest.from_parts(header["schema"], arrays), header
+    if kind == "quantized_random_forest":
+        from .quantized import QuantizedForest
+
+        return QuantizedForest.from_parts(header["schema"], arrays), header
+    raise ValueError(f"unknown model kind {kind!r}")
+
+
+def export(
+    model_path: str | os.PathLike,
+    output: str | os.PathLike,
+    training_data: str | os.PathLike | None = None,
+    compress: bool = False,
+    quantize: bool = False,
+) -> dict[str, Any]:
+    """Compile a joblib pipeline and write it as an artifact.
+
+    With ``quantize`` the reduced-precision forest is written, and its
+    accuracy against the full forest on the held-out rows of
+    ``training_data`` (the notebook's train/test split) is recorded in the
+    header as ``quantization``.
+    """
+    import sklearn
+
+    from .compiled import compile_pipeline
+    from .inference import FEATURES
+    from .registry import get_model
+    from .tabulated import file_sha256
+
+    forest = compile_pipeline(get_model(model_path))
+    metadata = {
+        "features": FEATURES,
+        "sklearn_version": sklearn.__version__,
+        "source_artifact": {"name": Path(model_path).name, "sha256": file_sha256(model_path)},
+        "training_data": (
+            {"name": Path(training_data).name, "sha256": file_sha256(training_data)} if training_data else None
+        ),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+    if quantize:
+        from .quantized import accuracy, quantize as quantize_forest
+
+        quantized = quantize_forest(forest)
+        if training_data:
+            from .training.pipeline import holdout_split, load_dataset
+
+            _, X_test, _, y_test = holdout_split(*load_dataset(training_data))
+            metadata["quantization"] = accuracy(forest, quantized, X_test, y_test)
+        forest = quantized
+    save(forest, output, metadata, compress=compress)
+    return read_header(output)
+
+
+def _time_load(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv: list[str] | None = None) -> int:
+    from . import ROOT
+
+    parser = argparse.ArgumentParser(description="export and inspect pickle-free model artifacts")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("export", help="compile a joblib pipeline into an artifact")
+    p.add_argument("model")
+    p.add_argument("-o", "--output", help=f"output file (default: <model>{SUFFIX})")
+    p.add_argument("--training-data", default=str(ROOT / "insurance.csv"),
+                   help="file the model was trained on, hashed into the header (default: insurance.csv)")
+    p.add_argument("--compress", action="store_true", help="zlib-compress arrays (disables mmap)")
+    p.add_argument("--quantize", action="store_true",
+                   help="store indexed thresholds, tree-local children and float32 leaves (see quantized.py)")
+    p = sub.add_parser("info", help="print an artifact's header")
+    p.add_argument("artifact")
+    p = sub.add_parser("compare", help="file size and load time of joblib pickles vs artifacts")
+    p.add_argument("files", nargs="+")
+    p.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        output = args.output or Path(args.model).with_suffix((".q" if args.quantize else "") + SUFFIX)
+        header = export(args.model, output, args.training_data, compress=args.compress, quantize=args.quantize)
+        print(f"{header['n_trees']} trees, {header['n_nodes']:,} nodes -> {output} "
+              f"({Path(output).stat().st_size / 1e6:.2f} MB)", file=sys.stderr)
+        q = header.get("quantization")
+        if q:
+            print(f"r2 {q['r2']:.6f} -> {q['r2_quantized']:.6f} ({q['r2_delta']:+.2e}) on {q['rows']:,} held-out rows; "
+                  f"max difference ${q['max_abs_diff']:.4f}", file=sys.stderr)
+    elif args.command == "info":
+        print(json.dumps(read_header(args.artifact), indent=2, sort_keys=True))
+    else:
+        import warnings
+
+        import joblib
+
+        warnings.simplefilter("ignore")
+        print(f"{'file':<40} {'size':>10} {'load':>10}")
+        for name in args.files:
+            if Path(name).suffix == SUFFIX:
+                seconds = _time_load(lambda: load(name), args.repeat)
+            else:
+                seconds = _time_load(lambda: joblib.load(name), args.repeat)
+            print(f"{Path(name).name:<40} {Path(name).stat().st_size / 1e6:>8.2f}MB {seconds * 1e3:>8.2f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,359 @@
+"""Versioned, minified and pre-compressed static assets for the quote UI.
+
+    python -m insurance_predictor.assets build
+    uvicorn asgi:app --port 8501                 # optional, see below
+
+The UI (``frontend/index.html``) is the iframe of a Streamlit custom
+component.  The browser loads it once per session; after that only the
+render arguments (whether the model loaded, the latest result) cross the
+websocket on each interaction.
+
+``build`` turns the hand-edited page into a deployable bundle in
+``frontend/dist``:
+
+* a small ``index.html`` shell;
+* ``app.<hash>.css`` (the page styles) and ``app.<hash>.js`` (the page
+  script plus the local scripts it loads, such as ``particles.js``), both
+  minified;
+* a ``.gz`` copy of every text file, compressed once at build time;
+* ``manifest.json``, which records the hash of the sources it was built
+  from.
+
+``main.py`` serves ``frontend/dist`` only while its manifest matches the
+current sources and falls back to ``frontend/`` otherwise, so an edit to
+``index.html`` is never hidden behind a stale build.
+
+The page loads no web fonts: its font stacks name Syne and DM Mono, which
+are used when installed locally, and otherwise fall back to the system's UI
+and monospace faces.  Nothing is fetched from a third party, so the app
+renders the same offline.
+
+Under ``streamlit run``, Streamlit serves the component files itself.  It
+sends ``index.html`` with ``no-cache`` and everything else as ``public``
+without a lifetime, and it gzips each response on the fly.  ``asgi.py``
+runs the same app under uvicorn with ``StaticAssets`` in front.  With that
+middleware, hashed files are cached for a year as ``immutable``, the
+pre-built ``.gz`` copies are sent as they are, and ``index.html`` is
+revalidated against its ETag, which usually costs a 304.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import re
+import shutil
+import sys
+from pathlib import Path
+from typing import Any, Callable
+
+from . import ROOT
+
+FRONTEND = ROOT / "frontend"
+DIST = FRONTEND / "dist"
+MANIFEST = "manifest.json"
+HASH_LENGTH = 10
+IMMUTABLE = "public, max-age=31536000, immutable"
+COMPRESSIBLE = {".html", ".css", ".js", ".json", ".svg"}
+CONTENT_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".js": "text/javascript; charset=utf-8",
+    ".json": "application/json",
+    ".svg": "image/svg+xml",
+}
+_HASHED = re.compile(r"\.[0-9a-f]{%d}\.[a-z0-9]+$" % HASH_LENGTH)
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def source_hash(src: Path = FRONTEND) -> str:
+    """Hash of everything ``build`` reads: the files in ``src``."""
+    h = hashlib.sha256()
+    for path in sorted(src.glob("*")):
+        if path.is_file():
+            h.update(path.relative_to(src).as_posix().encode() + b"\0" + path.read_bytes())
+    return h.hexdigest()
+
+
+# ── MINIFIERS ─────────────────────────────────────────────────────────────────
+# Conservative on purpose: they drop comments and layout whitespace and leave
+# every token alone, so the output behaves exactly like the source.
+
+_CSS_VERBATIM = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|url\([^)]*\))|/\*.*?\*/""", re.S)
+
+
+def minify_css(text: str) -> str:
+    """Strip comments and layout whitespace; strings and ``url(...)`` are copied verbatim."""
+    kept: list[str] = []
+
+    def hold(m: re.Match) -> str:
+        if m.group(1) is None:
+            return " "  # a comment
+        kept.append(m.group(1))
+        return f"\0{len(kept) - 1}\0"
+
+    text = _CSS_VERBATIM.sub(hold, text)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s*([{};,>])\s*", r"\1", text)
+    text = re.sub(r"([{;])\s*([\w-]+)\s*:\s*", r"\1\2:", text)
+    text = text.replace(";}", "}").strip()
+    return re.sub(r"\0(\d+)\0", lambda m: kept[int(m.group(1))], text)
+
+
+# A "/" after one of these (or at the start) begins a regular expression,
+# anywhere else it is division.
+_REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^") | {""}
+
+
+def minify_js(text: str) -> str:
+    """Strip comments and indentation; strings, templates and regexes are copied verbatim.
+
+    Line breaks are kept so automatic semicolon insertion is unaffected.
+    """
+    out: list[tuple[bool, str]] = []  # (verbatim, text)
+    i, n = 0, len(text)
+    depth: list[int] = []  # brace depth at each open ``${`` in a template literal
+
+    def last_significant() -> str:
+        for _, chunk in reversed(out):
+            stripped = chunk.rstrip()
+            if stripped:
+                return stripped[-1]
+        return ""
+
+    def copy_template(i: int) -> int:
+        # From just after a backtick (or the "}" closing a substitution) to
+        # the closing backtick or the next "${".
+        start = i
+        while i < n:
+            c = text[i]
+            if c == "\\":
+                i += 2
+                continue
+            if c == "`":
+                out.append((True, text[start:i + 1]))
+                return i + 1
+            if c == "$" and i + 1 < n and text[i + 1] == "{":
+                out.append((True, text[start:i + 2]))
+                depth.append(0)
+                return i + 2
+            i += 1
+        raise ValueError("unterminated template literal")
+
+    while i < n:
+        c = text[i]
+        if c in "\"'":
+            j = i + 1
+            while j < n and text[j] != c:
+                j += 2 if text[j] == "\\" else 1
+            out.append((True, text[i:j + 1]))
+            i = j + 1
+        elif c == "`":
+            out.append((True, "`"))
+            i = copy_template(i + 1)
+        elif text.startswith("//", i):
+            i = text.find("\n", i)
+            i = n if i < 0 else i
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            if end < 0:
+                raise ValueError("unterminated comment")
+            # Whitespace, so the tokens on either side stay apart.
+            out.append((False, "\n" if "\n" in text[i:end] else " "))
+            i = end + 2
+        elif c == "/" and last_significant() in _REGEX_PRECEDERS:
+            j, in_class = i + 1, False
+            while j < n and (text[j] != "/" or in_class):
+                if text[j] == "\\":
+                    j += 1
+                elif text[j] == "[":
+                    in_class = True
+                elif text[j] == "]":
+                    in_class = False
+                j += 1
+            while j + 1 < n and text[j + 1].isalpha():
+                j += 1  # flags
+            out.append((True, text[i:j + 1]))
+            i = j + 1
+        elif c == "}" and depth and not depth[-1]:
+            depth.pop()
+            out.append((True, "}"))
+            i = copy_template(i + 1)
+        else:
+            if c in "{}" and depth:
+                depth[-1] += 1 if c == "{" else -1
+            j = i + 1
+            while j < n and text[j] not in "\"'`/{}":
+                j += 1
+            out.append((False, text[i:j]))
+            i = j
+    code = "".join(chunk if verbatim else re.sub(r"[ \t]*\n\s*", "\n", chunk) for verbatim, chunk in out)
+    return code.strip()
+
+
+def minify_html(text: str) -> str:
+    text = re.sub(r"<!--.*?-->", "", text, flags=re.S)
+    lines = (line.strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+# ── BUILD ─────────────────────────────────────────────────────────────────────
+
+def _hashed(name: str, data: bytes) -> str:
+    stem, _, suffix = name.rpartition(".")
+    return f"{stem}.{_sha256(data)[:HASH_LENGTH]}.{suffix}"
+
+
+def build(src: Path = FRONTEND, out: Path = DIST) -> dict[str, Any]:
+    """Write the bundle for ``src/index.html`` to ``out``; returns the manifest."""
+    src, out = Path(src), Path(out)
+    page = (src / "index.html").read_text()
+    styles = re.findall(r"<style>(.*?)</style>", page, flags=re.S)
+    scripts = re.findall(r"<script>(.*?)</script>", page, flags=re.S)
+    if len(styles) != 1 or len(scripts) != 1:
+        raise ValueError("expected exactly one inline <style> and one inline <script> in index.html")
+    # Local scripts loaded ahead of the inline one are bundled with it, in order.
+    includes = re.findall(r'<script src="([^":/]+\.js)"></script>\n?', page)
+    if out.exists():
+        if any(out.iterdir()) and not (out / MANIFEST).exists():
+            raise ValueError(f"{out} is not empty and has no {MANIFEST}; refusing to overwrite it")
+        shutil.rmtree(out)
+    out.mkdir(parents=True)
+
+    files: dict[str, dict[str, Any]] = {}
+
+    def emit(name: str, data: bytes, hashed: bool = True) -> str:
+        if hashed:
+            name = _hashed(name, data)
+        (out / name).write_bytes(data)
+        entry = {"bytes": len(data), "sha256": _sha256(data)}
+        if Path(name).suffix in COMPRESSIBLE:
+            packed = gzip.compress(data, compresslevel=9, mtime=0)
+            (out / (name + ".gz")).write_bytes(packed)
+            entry["gzip_bytes"] = len(packed)
+        files[name] = entry
+        return name
+
+    css = emit("app.css", minify_css(styles[0]).encode())
+    js = emit("app.js", "\n".join(minify_js(code) for code in
+                                     [(src / name).read_text() for name in includes] + scripts).encode())
+    shell = page.replace(f"<style>{styles[0]}</style>", f'<link href="{css}" rel="stylesheet">')
+    shell = re.sub(r'<script src="[^":/]+\.js"></script>\n?', "", shell)
+    shell = shell.replace(f"<script>{scripts[0]}</script>", f'<script src="{js}"></script>')
+    emit("index.html", minify_html(shell).encode(), hashed=False)
+
+    source_bytes = len(page.encode()) + sum((src / name).stat().st_size for name in includes)
+    manifest = {"source_sha256": source_hash(src), "source_bytes": source_bytes, "files": files}
+    (out / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def load_manifest(out: Path = DIST) -> dict[str, Any] | None:
+    try:
+        return json.loads((Path(out) / MANIFEST).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+_current: dict[tuple, dict[str, Any] | None] = {}
+
+
+def current_manifest(src: Path = FRONTEND, out: Path = DIST) -> dict[str, Any] | None:
+    """The manifest of ``out`` if it was built from the current ``src``, else ``None``.
+
+    Cached on the sources' and manifest's mtimes, so it is cheap per rerun.
+    """
+    src, out = Path(src), Path(out)
+    key = tuple(p.stat().st_mtime_ns if p.exists() else 0
+                for p in (src, src / "index.html", out / MANIFEST))
+    if key not in _current:
+        manifest = load_manifest(out)
+        if manifest is not None and manifest.get("source_sha256") != source_hash(src):
+            manifest = None
+        _current.clear()
+        _current[key] = manifest
+    return _current[key]
+
+
+def component_path(src: Path = FRONTEND, out: Path = DIST) -> Path:
+    """Directory to serve the quote component from: the build if current, else the sources."""
+    return Path(out) if current_manifest(src, out) is not None else Path(src)
+
+
+def cache_control(name: str) -> str:
+    return IMMUTABLE if _HASHED.search(name) else "no-cache"
+
+
+# ── ASGI ──────────────────────────────────────────────────────────────────────
+
+class StaticAssets:
+    """ASGI middleware serving the built component files with cache headers.
+
+    Handles GETs for files of a current build under Streamlit's
+    ``/component/`` route and passes every other request through.
+    """
+
+    def __init__(self, app: Callable, src: Path = FRONTEND, out: Path = DIST):
+        self.app = app
+        self.src = Path(src)
+        self.out = Path(out)
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD") or "/component/" not in scope["path"]:
+            return await self.app(scope, receive, send)
+        manifest = current_manifest(self.src, self.out)
+        name = scope["path"].rsplit("/", 1)[-1] or "index.html"
+        entry = (manifest or {}).get("files", {}).get(name)
+        if entry is None:
+            return await self.app(scope, receive, send)
+
+        request_headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        etag = f'"{entry["sha256"][:16]}"'
+        headers = [(b"cache-control", cache_control(name).encode()), (b"etag", etag.encode())]
+        if "gzip_bytes" in entry:
+            headers.append((b"vary", b"Accept-Encoding"))
+        if etag in request_headers.get("if-none-match", ""):
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        path = self.out / name
+        if "gzip_bytes" in entry and "gzip" in request_headers.get("accept-encoding", ""):
+            path = path.with_name(name + ".gz")
+            headers.append((b"content-encoding", b"gzip"))
+        body = path.read_bytes()
+        headers += [
+            (b"content-type", CONTENT_TYPES.get(Path(name).suffix, "application/octet-stream").encode()),
+            (b"content-length", str(len(body)).encode()),
+        ]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="build the quote UI's static assets")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="minify, version and pre-compress frontend/ into frontend/dist")
+    p.add_argument("--src", default=str(FRONTEND))
+    p.add_argument("--out", default=str(DIST))
+    args = parser.parse_args(argv)
+
+    manifest = build(Path(args.src), Path(args.out))
+    files = manifest["files"]
+    for name, f in files.items():
+        packed = f" -> {f['gzip_bytes']:>7,} gzip" if "gzip_bytes" in f else ""
+        print(f"{name:<36} {f['bytes']:>8,} bytes{packed}", file=sys.stderr)
+    text = [f for f in files.values() if "gzip_bytes" in f]
+    print(f"html + css + js: {manifest['source_bytes']:,} bytes of source -> "
+          f"{sum(f['bytes'] for f in text):,} minified, {sum(f['gzip_bytes'] for f in text):,} gzipped "
+          f"-> {args.out}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""Headless batch scoring of policyholder files.
+
+    python -m insurance_predictor.batch book.csv -o priced.csv
+    python -m insurance_predictor.batch book.parquet -o priced.parquet --chunk-size 250000
+
+Input files have the ``insurance.csv`` columns (an ``expenses`` column, if
+present, is carried through untouched).  Rows are read, scored and written
+one fixed-size chunk at a time, so memory use depends on ``--chunk-size``
+and not on the size of the file.  Parquet support needs ``pyarrow``.
+
+``--quantiles 0.05,0.95`` and ``--std`` add columns with quantiles and the
+standard deviation of the forest's per-tree estimates (e.g.
+``predicted_expenses_q05``), computed in the same pass as the prediction.
+
+``--drift`` also profiles the inputs and predictions and, at the end,
+reports their drift against the model's training baseline (see
+``drift.py``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator
+
+import numpy as np
+import pandas as pd
+
+from . import DEFAULT_MODEL_PATH
+from .drift import DriftMonitor, print_report
+from .drift import load_for as load_drift_baseline
+from .inference import FEATURES, Predictor, get_predictor
+from .intervals import check_quantiles
+from .parallel import ParallelScorer, default_workers
+
+PREDICTION_COLUMN = "predicted_expenses"
+PARQUET_SUFFIXES = {".parquet", ".pq"}
+
+
+def _is_parquet(path: str | Path) -> bool:
+    return Path(path).suffix.lower() in PARQUET_SUFFIXES
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as exc:
+        raise RuntimeError("Parquet input/output requires pyarrow (pip install pyarrow)") from exc
+    return pyarrow
+
+
+def iter_chunks(path: str | Path, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Yield ``path`` as DataFrames of at most ``chunk_size`` rows."""
+    if _is_parquet(path):
+        pa = _require_pyarrow()
+        for batch in pa.parquet.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+class ChunkWriter:
+    """Appends scored chunks to a CSV or Parquet file as they arrive."""
+
+    def __init__(self, path: str | Path, parquet: bool | None = None):
+        self.path = Path(path)
+        self._parquet = _is_parquet(path) if parquet is None else parquet
+        self._writer = None
+        self._started = False
+
+    def write(self, frame: pd.DataFrame) -> None:
+        if self._parquet:
+            pa = _require_pyarrow()
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._writer is None:
+                self._writer = pa.parquet.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode="a" if self._started else "w", header=not self._started, index=False)
+        self._started = True
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self) -> "ChunkWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+@dataclass
+class ScoreStats:
+    rows: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def score_frame(
+    predictor: Predictor | ParallelScorer,
+    frame: pd.DataFrame,
+    quantiles: tuple[float, ...] = (),
+    std: bool = False,
+) -> pd.DataFrame:
+    missing = [c for c in FEATURES if c not in frame.columns]
+    if missing:
+        raise ValueError(f"input is missing columns: {', '.join(missing)}")
+    features = frame[FEATURES].copy()
+    for col in ("sex", "smoker", "region"):
+        features[col] = features[col].astype(str).str.strip().str.lower()
+    out = frame.copy()
+    if not quantiles and not std:
+        out[PREDICTION_COLUMN] = predictor.predict(features).astype(np.float64)
+        return out
+    dist = predictor.predict_distribution(features, quantiles, std)
+    out[PREDICTION_COLUMN] = dist.mean
+    for name, values in dist.columns(PREDICTION_COLUMN).items():
+        out[name] = values
+    return out
+
+
+def score_file(
+    input_path: str | Path,
+    output_path: str | Path,
+    *,
+    model_path: str | Path = DEFAULT_MODEL_PATH,
+    chunk_size: int = 100_000,
+    workers: int = 1,
+    quantiles: tuple[float, ...] = (),
+    std: bool = False,
+    drift: DriftMonitor | None = None,
+    progress: Callable[[ScoreStats], None] | None = None,
+) -> ScoreStats:
+    if workers > 1:
+        predictor = ParallelScorer(model_path, workers=workers, shard_size=max(1, chunk_size // workers))
+    else:
+        predictor = get_predictor(model_path)
+    stats = ScoreStats()
+    t0 = time.perf_counter()
+    # Written beside the output and renamed into place on success, so a
+    # failed run never leaves a truncated file under the output's name.
+    output_path = Path(output_path)
+    tmp = output_path.with_name(output_path.name + ".tmp")
+    try:
+        with ChunkWriter(tmp, parquet=_is_parquet(output_path)) as writer:
+            for chunk in iter_chunks(input_path, chunk_size):
+                try:
+                    scored = score_frame(predictor, chunk, quantiles, std)
+                except ValueError as exc:
+                    raise ValueError(
+                        f"chunk {stats.chunks + 1} (rows {stats.rows:,}-{stats.rows + len(chunk) - 1:,}): {exc}"
+                    ) from exc
+                writer.write(scored)
+                if drift is not None:
+                    drift.observe(scored, scored[PREDICTION_COLUMN])
+                stats.rows += len(chunk)
+                stats.chunks += 1
+                stats.seconds = time.perf_counter() - t0
+                if progress is not None:
+                    progress(stats)
+        os.replace(tmp, output_path)
+    finally:
+        tmp.unlink(missing_ok=True)
+        if isinstance(predictor, ParallelScorer):
+            predictor.close()
+    stats.seconds = time.perf_counter() - t0
+    return stats
+
+
+def _report(stats: ScoreStats) -> None:
+    print(
+        f"\r{stats.rows:,} rows in {stats.seconds:.1f}s ({stats.rows_per_second:,.0f} rows/s)",
+        end="", file=sys.stderr, flush=True,
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="CSV or Parquet file of policyholders")
+    parser.add_argument("-o", "--output", required=True, help="CSV or Parquet file to write")
+    parser.add_argument("-m", "--model", default=str(DEFAULT_MODEL_PATH), help="fitted pipeline (.pkl)")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="rows per chunk (default: 100000)")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="worker processes; each chunk is sharded across them (0 = all cores)")
+    parser.add_argument("--quantiles", default="",
+                        help="comma-separated quantiles of the per-tree estimates to add, e.g. 0.05,0.95")
+    parser.add_argument("--std", action="store_true", help="add the standard deviation across trees")
+    parser.add_argument("--drift", action="store_true",
+                        help="report drift of the file against the model's training baseline")
+    parser.add_argument("-q", "--quiet", action="store_true", help="do not print progress")
+    args = parser.parse_args(argv)
+    if args.chunk_size <= 0:
+        parser.error("--chunk-size must be positive")
+    try:
+        quantiles = check_quantiles([q for q in args.quantiles.split(",") if q.strip()])
+    except ValueError as exc:
+        parser.error(str(exc))
+    monitor = None
+    if args.drift:
+        baseline = load_drift_baseline(args.model)
+        if baseline is None:
+            parser.error(f"no current drift baseline for {args.model} (python -m insurance_predictor.drift baseline)")
+        monitor = DriftMonitor(baseline, interval=float("inf"))
+
+    try:
+        stats = score_file(
+            args.input, args.output,
+            model_path=args.model, chunk_size=args.chunk_size,
+            workers=args.workers or default_workers(),
+            quantiles=quantiles, std=args.std, drift=monitor,
+            progress=None if args.quiet else _report,
+        )
+    except ValueError as exc:
+        if not args.quiet:
+            print(file=sys.stderr)
+        print(f"error: {exc}; nothing was written to {args.output}", file=sys.stderr)
+        return 1
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(f"scored {stats.rows:,} rows in {stats.chunks} chunks, {stats.seconds:.2f}s "
+          f"({stats.rows_per_second:,.0f} rows/s) -> {args.output}", file=sys.stderr)
+    if monitor is not None:
+        print_report(monitor.report(cumulative=True), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
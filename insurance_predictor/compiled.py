@@ -0,0 +1,308 @@
+"""Flat, array-backed compilation of the fitted forest pipeline.
+
+``compile_pipeline`` lowers ``ColumnTransformer(StandardScaler, OneHotEncoder)
+-> RandomForestRegressor`` into a handful of contiguous NumPy arrays holding
+every node of every tree (split column, threshold, children, leaf value),
+and folds the preprocessing into the thresholds: a split on a scaled column
+becomes a split on the raw value, and a split on a one-hot column becomes a
+test on a 0/1 indicator.  Prediction is then a vectorized walk of all trees
+for a block of rows at once, with no sklearn or pandas involved.  Index
+arrays use the narrowest integer type that fits, and nothing is copied into
+wider types at load, so the arrays can be used straight from an mmap (see
+``artifact.py``).
+
+Thresholds are folded exactly, not just algebraically.  sklearn compares
+``float32((x - mean) / scale) <= t``; for every split we search for the
+largest float64 ``x`` that goes left under that rule, so the compiled model
+makes the same decision as the pipeline for every input and the outputs
+match ``model.predict`` bit for bit.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Iterator, Mapping
+
+import numpy as np
+
+# Rows walked together; keeps the (rows x trees) index matrices in cache.
+BLOCK_ROWS = 2048
+
+
+@dataclass(frozen=True)
+class Column:
+    """One model input column expressed in terms of a raw feature.
+
+    ``kind`` is ``"numeric"`` (the raw value) or ``"indicator"`` (1.0 when the
+    raw value equals ``category``).
+    """
+
+    source: str
+    kind: str
+    category: str | None = None
+
+
+def _ordered(bits: np.ndarray) -> np.ndarray:
+    # Maps float64 bit patterns to int64 keys with the same ordering (and back).
+    return bits ^ ((bits >> 63) & np.int64(0x7FFFFFFFFFFFFFFF))
+
+
+def fold_thresholds(thresholds: np.ndarray, mean: float, scale: float) -> np.ndarray:
+    """Largest raw ``x`` with ``float32((x - mean) / scale) <= t``, per threshold."""
+    t = np.asarray(thresholds, dtype=np.float64)
+    lo = np.full(t.shape, _ordered(np.array(-1e300).view(np.int64)), dtype=np.int64)
+    hi = np.full(t.shape, _ordered(np.array(1e300).view(np.int64)), dtype=np.int64)
+    with np.errstate(over="ignore"):
+        while True:
+            # The key range spans more than int64, so take the gap unsigned.
+            gap = hi.view(np.uint64) - lo.view(np.uint64)
+            if not np.any(gap > 1):
+                break
+            mid = lo + (gap // 2).astype(np.int64)
+            x = _ordered(mid).view(np.float64)
+            left = ((x - mean) / scale).astype(np.float32) <= t
+            lo = np.where(left, mid, lo)
+            hi = np.where(left, hi, mid)
+    return _ordered(lo).view(np.float64)
+
+
+def _index_dtype(n: int) -> np.dtype:
+    for dtype in (np.uint8, np.uint16, np.int32):
+        if n <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+class CompiledForest:
+    """Array-backed random forest over raw (unscaled, unencoded) features."""
+
+    # Recorded as the ``model`` of an ``.icpf`` header (see ``artifact.py``).
+    kind = "compiled_random_forest"
+
+    def __init__(
+        self,
+        columns: list[Column],
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        child: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        max_depth: int,
+        dropped: Mapping[str, tuple[str, ...]] | None = None,
+        cover: np.ndarray | None = None,
+    ):
+        self._set_schema(columns, dropped)
+        self.feature = feature
+        self.threshold = threshold
+        # ``child[2 * i]`` is the left child of node ``i`` and ``child[2 * i + 1]``
+        # the right, so a traversal step is a single gather.
+        self.child = child
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        # Training samples reaching each node (optional; only explanations
+        # need it).
+        self.cover = cover
+        self._roots = roots.astype(np.intp)
+
+    def _set_schema(self, columns: list[Column], dropped: Mapping[str, tuple[str, ...]] | None) -> None:
+        self.columns = columns
+        # Categories the encoder dropped (e.g. ``drop="first"``): valid inputs
+        # that simply have no indicator column.
+        self.dropped = dict(dropped or {})
+        self.sources = list(dict.fromkeys(c.source for c in columns))
+        self.categories: dict[str, list[str]] = {}
+        for c in columns:
+            if c.kind == "indicator":
+                self.categories.setdefault(c.source, []).append(c.category)
+
+    @property
+    def left(self) -> np.ndarray:
+        return self.child[0::2]
+
+    @property
+    def right(self) -> np.ndarray:
+        return self.child[1::2]
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in self.to_arrays().values())
+
+    def encode(self, data: Mapping[str, Any]) -> np.ndarray:
+        """Build the raw design matrix from a DataFrame or dict of columns."""
+        raw = {s: np.asarray(data[s]) for s in self.sources}
+        n = len(next(iter(raw.values())))
+        X = np.empty((n, len(self.columns)), dtype=np.float64)
+        for j, col in enumerate(self.columns):
+            values = raw[col.source]
+            if col.kind == "numeric":
+                X[:, j] = values
+            else:
+                X[:, j] = values == col.category
+        if np.isnan(X).any():
+            raise ValueError("input contains missing or non-numeric values")
+        for source, known in self.categories.items():
+            unknown = set(np.unique(raw[source]).tolist()) - set(known) - set(self.dropped.get(source, ()))
+            if unknown:
+                raise ValueError(f"unknown {source} value(s): {', '.join(map(str, sorted(unknown)))}")
+        return X
+
+    def iter_tree_values(self, X: np.ndarray) -> Iterator[tuple[int, np.ndarray]]:
+        """Yield ``(start, values)`` per block of rows, ``values`` being (trees, rows)."""
+        n, n_cols = X.shape
+        row_base = np.arange(min(n, BLOCK_ROWS), dtype=np.intp)[:, None] * n_cols
+        for start in range(0, n, BLOCK_ROWS):
+            block = np.ascontiguousarray(X[start:start + BLOCK_ROWS]).ravel()
+            k = len(block) // n_cols
+            base = row_base[:k]
+            node = np.broadcast_to(self._roots, (k, self.n_trees))
+            for _ in range(self.max_depth):
+                x = np.take(block, base + np.take(self.feature, node))
+                go_right = x > np.take(self.threshold, node)
+                node = np.take(self.child, 2 * node.astype(np.intp) + go_right)
+            yield start, np.take(self.value, node).T
+
+    def predict_encoded(self, X: np.ndarray) -> np.ndarray:
+        out = np.empty(X.shape[0], dtype=np.float64)
+        for start, leaves in self.iter_tree_values(X):
+            # Accumulate tree by tree, in estimator order, as RandomForestRegressor
+            # does; cumsum never switches to pairwise summation like sum() can.
+            out[start:start + leaves.shape[1]] = np.cumsum(leaves, axis=0, dtype=np.float64)[-1] / self.n_trees
+        return out
+
+    def predict(self, data: Mapping[str, Any]) -> np.ndarray:
+        return self.predict_encoded(self.encode(data))
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        arrays = {
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "child": self.child,
+            "value": self.value,
+            "roots": self.roots,
+        }
+        if self.cover is not None:
+            arrays["cover"] = self.cover
+        return arrays
+
+    def schema(self) -> dict[str, Any]:
+        """JSON-serialisable description of the input columns."""
+        return {
+            "columns": [{"source": c.source, "kind": c.kind, "category": c.category} for c in self.columns],
+            "dropped": {k: list(v) for k, v in self.dropped.items()},
+            "max_depth": self.max_depth,
+        }
+
+    @classmethod
+    def from_parts(cls, schema: Mapping[str, Any], arrays: Mapping[str, np.ndarray]) -> "CompiledForest":
+        columns = [Column(c["source"], c["kind"], c.get("category")) for c in schema["columns"]]
+        return cls(
+            columns,
+            arrays["feature"], arrays["threshold"], arrays["child"], arrays["value"], arrays["roots"],
+            int(schema["max_depth"]), {k: tuple(v) for k, v in schema.get("dropped", {}).items()},
+            arrays.get("cover"),
+        )
+
+
+def _column_specs(preprocessor: Any) -> tuple[list[Column], list[tuple[float, float]], dict[str, tuple[str, ...]]]:
+    if getattr(preprocessor, "remainder", "drop") != "drop":
+        raise NotImplementedError("ColumnTransformer remainder must be 'drop'")
+    columns: list[Column] = []
+    affine: list[tuple[float, float]] = []
+    dropped: dict[str, tuple[str, ...]] = {}
+    for name, transformer, features in preprocessor.transformers_:
+        if name == "remainder" or transformer == "drop":
+            continue
+        kind = type(transformer).__name__
+        if transformer == "passthrough":
+            for f in features:
+                columns.append(Column(f, "numeric"))
+                affine.append((0.0, 1.0))
+        elif kind == "StandardScaler":
+            mean = transformer.mean_ if transformer.mean_ is not None else np.zeros(len(features))
+            scale = transformer.scale_ if transformer.scale_ is not None else np.ones(len(features))
+            for f, m, s in zip(features, mean, scale):
+                columns.append(Column(f, "numeric"))
+                affine.append((float(m), float(s)))
+        elif kind == "OneHotEncoder":
+            if getattr(transformer, "infrequent_categories_", None) is not None and any(
+                c is not None for c in transformer.infrequent_categories_
+            ):
+                raise NotImplementedError("infrequent categories are not supported")
+            drop_idx = transformer.drop_idx_
+            for i, (f, cats) in enumerate(zip(features, transformer.categories_)):
+                d = None if drop_idx is None else drop_idx[i]
+                for k, cat in enumerate(cats):
+                    if d is not None and k == d:
+                        dropped[f] = dropped.get(f, ()) + (str(cat),)
+                        continue
+                    columns.append(Column(f, "indicator", str(cat)))
+                    affine.append((0.0, 1.0))
+        else:
+            raise NotImplementedError(f"cannot compile transformer {kind}")
+    return columns, affine, dropped
+
+
+def compile_pipeline(pipeline: Any) -> CompiledForest:
+    """Lower a fitted preprocessor + tree-ensemble pipeline to a ``CompiledForest``.
+
+    Raises ``NotImplementedError`` for pipelines it does not know how to fold.
+    """
+    steps = getattr(pipeline, "steps", None)
+    if not steps or len(steps) != 2:
+        raise NotImplementedError("expected a (preprocessor, regressor) pipeline")
+    preprocessor, regressor = steps[0][1], steps[1][1]
+    estimators = getattr(regressor, "estimators_", None)
+    if estimators is None or len(estimators) == 0 or not all(hasattr(e, "tree_") for e in estimators):
+        raise NotImplementedError("regressor is not a fitted tree ensemble")
+    if type(regressor).__name__ != "RandomForestRegressor" or regressor.n_outputs_ != 1:
+        raise NotImplementedError("only single-output RandomForestRegressor is supported")
+    columns, affine, dropped = _column_specs(preprocessor)
+
+    features, thresholds, lefts, rights, values, covers, roots = [], [], [], [], [], [], []
+    offset = 0
+    for est in estimators:
+        tree = est.tree_
+        n = tree.node_count
+        is_leaf = tree.children_left == -1
+        idx = np.arange(n)
+        feat = np.where(is_leaf, 0, tree.feature)
+        thr = np.where(is_leaf, np.inf, tree.threshold)
+        for j, (mean, scale) in enumerate(affine):
+            sel = (feat == j) & ~is_leaf
+            if sel.any():
+                thr[sel] = fold_thresholds(thr[sel], mean, scale)
+        # Leaves point at themselves, so a fixed number of steps is always safe.
+        lefts.append(np.where(is_leaf, idx, tree.children_left) + offset)
+        rights.append(np.where(is_leaf, idx, tree.children_right) + offset)
+        features.append(feat)
+        thresholds.append(thr)
+        values.append(tree.value[:, 0, 0])
+        covers.append(tree.weighted_n_node_samples)
+        roots.append(offset)
+        offset += n
+
+    node_dtype = _index_dtype(offset)
+    child = np.empty(2 * offset, dtype=node_dtype)
+    child[0::2] = np.concatenate(lefts)
+    child[1::2] = np.concatenate(rights)
+    cover = np.concatenate(covers)
+    if np.array_equal(cover, np.round(cover)) and cover.max() <= np.iinfo(np.uint32).max:
+        # Bootstrap counts without sample weights are whole numbers.
+        cover = cover.astype(_index_dtype(int(cover.max())))
+    return CompiledForest(
+        columns,
+        feature=np.concatenate(features).astype(_index_dtype(len(columns))),
+        threshold=np.concatenate(thresholds),
+        child=child,
+        value=np.concatenate(values).astype(np.float64),
+        roots=np.asarray(roots, dtype=node_dtype),
+        max_depth=max(e.tree_.max_depth for e in estimators),
+        dropped=dropped,
+        cover=cover,
+    )
+
@@ -0,0 +1,457 @@
+"""Streaming input and prediction drift monitor.
+
+    python -m insurance_predictor.drift baseline insurance_expense_predictor.pkl
+    python -m insurance_predictor.drift check book.csv -m insurance_expense_predictor.pkl
+
+A baseline profile is captured when the model is trained (the notebook's
+last cell, ``incremental.retrain`` and the ``baseline`` command above all
+write one): a histogram of every input and of the model's own predictions
+on its training rows, saved as ``<model>.drift.json`` next to the model and
+keyed, like the other sidecars, on the model's hash.
+
+At serving time a ``DriftMonitor`` adds every scored profile and its quote
+to the same histograms.  Nothing else is kept, so memory is constant and
+no request is stored.  Numeric inputs use fixed fine grids over the quote
+form's ranges (``FEATURE_RANGES``), predictions a log-spaced grid, and
+categorical inputs one count per category plus "other".  From those:
+
+* PSI over the baseline's decile buckets (categories for categorical
+  inputs), with the usual reading: below 0.1 stable, 0.1-0.25 moderate,
+  above 0.25 major drift;
+* the KS statistic, the largest gap between the two cumulative
+  distributions, exact for age and children and at grid resolution (0.5
+  BMI points, about 2% of a quote) otherwise;
+* the current window's quartiles next to the baseline's.
+
+Scores are computed over a rolling window.  Every ``interval`` seconds,
+once the window holds ``min_count`` rows, the monitor logs one JSON line
+on the ``insurance_predictor.drift`` logger, publishes PSI and KS as
+telemetry gauges and starts a new window; a cumulative profile since
+start-up is kept as well.
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any, Mapping, Sequence
+
+import numpy as np
+
+from .encoder import FEATURE_RANGES
+from .inference import CATEGORICAL_FEATURES, FEATURES, NUMERIC_FEATURES
+from .tabulated import source_sha256
+from .telemetry import Sample, telemetry
+
+log = logging.getLogger(__name__)
+
+BASELINE_SUFFIX = ".drift.json"
+PREDICTION = "prediction"
+# Bin widths of the numeric grids; edges start at the lower end of FEATURE_RANGES.
+GRID_STEPS = {"age": 1.0, "bmi": 0.5, "children": 1.0}
+# Predictions: log-spaced edges from $100 to $1M.
+PREDICTION_EDGES = np.geomspace(100.0, 1e6, 401)
+PSI_BUCKETS = 10
+# Floor for empty buckets in the PSI sum.
+PSI_EPSILON = 1e-4
+PSI_MODERATE, PSI_MAJOR = 0.1, 0.25
+
+
+def baseline_path_for(model_path: str | Path) -> Path:
+    path = Path(model_path)
+    return path.with_name(path.stem + BASELINE_SUFFIX)
+
+
+def grid_edges(name: str) -> np.ndarray:
+    if name == PREDICTION:
+        return PREDICTION_EDGES
+    lo, hi = FEATURE_RANGES[name]
+    step = GRID_STEPS[name]
+    # Cells are [edge, edge + step), centred on the integers for age/children.
+    start = lo - step / 2 if step == 1.0 else lo
+    return start + step * np.arange(int(np.ceil((hi - start) / step)) + 2)
+
+
+class Histogram:
+    """Counts over fixed edges, plus one underflow and one overflow cell."""
+
+    def __init__(self, edges: np.ndarray, counts: np.ndarray | None = None):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self._edges = self.edges.tolist()
+        self.counts = np.zeros(len(edges) + 1, dtype=np.int64) if counts is None else counts
+
+    @property
+    def n(self) -> int:
+        return int(self.counts.sum())
+
+    def add(self, values: np.ndarray) -> None:
+        cells = np.searchsorted(self.edges, values, side="right")
+        self.counts += np.bincount(cells, minlength=len(self.counts))
+
+    def add_one(self, value: float) -> None:
+        self.counts[bisect.bisect_right(self._edges, value)] += 1
+
+    def quantile(self, q: float) -> float:
+        """``q`` quantile, interpolated within its cell."""
+        total = self.counts.sum()
+        if not total:
+            return float("nan")
+        cum = np.cumsum(self.counts)
+        k = int(np.searchsorted(cum, q * total, side="left"))
+        if k == 0:
+            return float(self.edges[0])
+        if k >= len(self.edges):
+            return float(self.edges[-1])
+        lo, hi = self.edges[k - 1], self.edges[k]
+        frac = (q * total - cum[k - 1]) / self.counts[k] if self.counts[k] else 0.0
+        return float(lo + (hi - lo) * min(max(frac, 0.0), 1.0))
+
+
+class Categories:
+    """Counts per known category, plus "other"."""
+
+    def __init__(self, values: Sequence[str], counts: np.ndarray | None = None):
+        self.values = list(values)
+        self._index = {v: i for i, v in enumerate(self.values)}
+        self.counts = np.zeros(len(values) + 1, dtype=np.int64) if counts is None else counts
+
+    @property
+    def n(self) -> int:
+        return int(self.counts.sum())
+
+    def add(self, values: np.ndarray) -> None:
+        """Count raw values; case and surrounding whitespace are ignored."""
+        found, counts = np.unique(np.asarray(values).astype(str), return_counts=True)
+        for v, n in zip(found.tolist(), counts.tolist()):
+            self.counts[self._index.get(v.strip().lower(), len(self.values))] += n
+
+    def add_one(self, value: str) -> None:
+        """Count one normalized value (see ``inference.normalize_profile``)."""
+        self.counts[self._index.get(value, len(self.values))] += 1
+
+
+@dataclass
+class Profile:
+    """One histogram per input and for the predictions."""
+
+    sketches: dict[str, Histogram | Categories]
+
+    @classmethod
+    def empty_like(cls, other: "Profile") -> "Profile":
+        return cls({
+            name: Histogram(s.edges) if isinstance(s, Histogram) else Categories(s.values)
+            for name, s in other.sketches.items()
+        })
+
+    @property
+    def n(self) -> int:
+        return self.sketches[PREDICTION].n
+
+    def add(self, data: Mapping[str, Any], predictions: np.ndarray) -> None:
+        for name, sketch in self.sketches.items():
+            values = predictions if name == PREDICTION else data[name]
+            if isinstance(sketch, Histogram):
+                sketch.add(np.asarray(values, dtype=np.float64))
+            else:
+                sketch.add(np.asarray(values))
+
+    def add_one(self, row: Mapping[str, Any], prediction: float) -> None:
+        for name, sketch in self.sketches.items():
+            sketch.add_one(prediction if name == PREDICTION else row[name])
+
+    def merge(self, other: "Profile") -> None:
+        for name, sketch in self.sketches.items():
+            sketch.counts += other.sketches[name].counts
+
+    def to_dict(self) -> dict[str, Any]:
+        out = {}
+        for name, s in self.sketches.items():
+            if isinstance(s, Histogram):
+                out[name] = {"edges": s.edges.tolist(), "counts": s.counts.tolist()}
+            else:
+                out[name] = {"categories": s.values, "counts": s.counts.tolist()}
+        return out
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "Profile":
+        sketches: dict[str, Histogram | Categories] = {}
+        for name, d in data.items():
+            counts = np.asarray(d["counts"], dtype=np.int64)
+            if "edges" in d:
+                sketches[name] = Histogram(np.asarray(d["edges"]), counts)
+            else:
+                sketches[name] = Categories(d["categories"], counts)
+        return cls(sketches)
+
+
+def new_profile(categories: Mapping[str, Sequence[str]]) -> Profile:
+    sketches: dict[str, Histogram | Categories] = {}
+    for name in FEATURES:
+        if name in NUMERIC_FEATURES:
+            sketches[name] = Histogram(grid_edges(name))
+        else:
+            sketches[name] = Categories(sorted(categories[name]))
+    sketches[PREDICTION] = Histogram(grid_edges(PREDICTION))
+    return Profile(sketches)
+
+
+@dataclass
+class Baseline:
+    profile: Profile
+    source_sha256: str
+    rows: int
+    created: str
+
+    def save(self, path: str | Path) -> None:
+        payload = {"source_sha256": self.source_sha256, "rows": self.rows, "created": self.created,
+                   "profile": self.profile.to_dict()}
+        Path(path).write_text(json.dumps(payload, separators=(",", ":")))
+
+    @classmethod
+    def load(cls, path: str | Path) -> "Baseline":
+        d = json.loads(Path(path).read_text())
+        return cls(Profile.from_dict(d["profile"]), d["source_sha256"], d["rows"], d["created"])
+
+
+def capture_baseline(X: Mapping[str, Any], predictions: np.ndarray, model_path: str | Path) -> Path:
+    """Profile training inputs ``X`` and the model's ``predictions`` on them; write the sidecar."""
+    categories = {f: sorted(set(np.asarray(X[f]).astype(str).tolist())) for f in CATEGORICAL_FEATURES}
+    profile = new_profile(categories)
+    profile.add(X, np.asarray(predictions, dtype=np.float64))
+    path = baseline_path_for(model_path)
+    Baseline(profile, source_sha256(model_path), profile.n, time.strftime("%Y-%m-%dT%H:%M:%S%z")).save(path)
+    return path
+
+
+def _psi_buckets(base: np.ndarray, n_buckets: int = PSI_BUCKETS) -> list[slice]:
+    """Group consecutive cells into buckets of roughly equal baseline mass."""
+    cum = np.cumsum(base) / max(base.sum(), 1)
+    cuts = sorted(set(int(np.searchsorted(cum, q, side="left")) + 1 for q in np.arange(1, n_buckets) / n_buckets))
+    bounds = [0] + [c for c in cuts if 0 < c < len(base)] + [len(base)]
+    return [slice(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+def psi(base: np.ndarray, current: np.ndarray, buckets: list[slice] | None = None) -> float:
+    if buckets is not None:
+        base = np.array([base[b].sum() for b in buckets])
+        current = np.array([current[b].sum() for b in buckets])
+    p = np.maximum(base / max(base.sum(), 1), PSI_EPSILON)
+    q = np.maximum(current / max(current.sum(), 1), PSI_EPSILON)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def ks(base: np.ndarray, current: np.ndarray) -> float:
+    if not base.sum() or not current.sum():
+        return float("nan")
+    return float(np.abs(np.cumsum(base) / base.sum() - np.cumsum(current) / current.sum()).max())
+
+
+def status(psi_value: float) -> str:
+    return "major" if psi_value > PSI_MAJOR else "moderate" if psi_value > PSI_MODERATE else "stable"
+
+
+def compare(baseline: Profile, current: Profile) -> dict[str, Any]:
+    """Per-feature drift scores of ``current`` against ``baseline``."""
+    out: dict[str, Any] = {}
+    for name, base in baseline.sketches.items():
+        cur = current.sketches[name]
+        if isinstance(base, Histogram):
+            score = psi(base.counts, cur.counts, _psi_buckets(base.counts))
+            out[name] = {
+                "psi": score, "ks": ks(base.counts, cur.counts), "status": status(score),
+                "quartiles": [cur.quantile(q) for q in (0.25, 0.5, 0.75)],
+                "baseline_quartiles": [base.quantile(q) for q in (0.25, 0.5, 0.75)],
+            }
+        else:
+            score = psi(base.counts, cur.counts)
+            n = max(cur.n, 1)
+            out[name] = {
+                "psi": score, "status": status(score),
+                "shares": {v: int(c) / n for v, c in zip(base.values + ["other"], cur.counts.tolist())},
+            }
+    return out
+
+
+class DriftMonitor:
+    """Thread-safe rolling drift scores against a training baseline."""
+
+    def __init__(self, baseline: Baseline, interval: float = 60.0, min_count: int = 200):
+        self.baseline = baseline
+        self.interval = interval
+        self.min_count = min_count
+        self._lock = threading.Lock()
+        self.window = Profile.empty_like(baseline.profile)
+        # Finished windows; the cumulative profile is this plus the current window.
+        self._done = Profile.empty_like(baseline.profile)
+        self._window_started = time.monotonic()
+        self.last_report: dict[str, Any] | None = None
+
+    def observe(self, data: Mapping[str, Any], predictions: np.ndarray) -> None:
+        """Add a batch (DataFrame or dict of columns) and its predictions."""
+        predictions = np.asarray(predictions, dtype=np.float64)
+        with self._lock:
+            self.window.add(data, predictions)
+        self._maybe_emit()
+
+    def observe_one(self, row: Mapping[str, Any], prediction: float) -> None:
+        """Add one normalized profile and its quote."""
+        with self._lock:
+            self.window.add_one(row, prediction)
+        self._maybe_emit()
+
+    def report(self, cumulative: bool = False) -> dict[str, Any]:
+        with self._lock:
+            current = self.window
+            if cumulative:
+                current = Profile.empty_like(self.baseline.profile)
+                current.merge(self._done)
+                current.merge(self.window)
+            scores = compare(self.baseline.profile, current)
+            rows = current.n
+        worst = max(scores, key=lambda k: scores[k]["psi"])
+        return {
+            "rows": rows, "baseline_rows": self.baseline.rows, "window": "cumulative" if cumulative else "rolling",
+            "worst": worst, "status": scores[worst]["status"], "features": scores,
+        }
+
+    def _maybe_emit(self) -> None:
+        now = time.monotonic()
+        if now - self._window_started < self.interval or self.window.n < self.min_count:
+            return
+        with self._lock:
+            if now - self._window_started < self.interval:
+                return  # another thread just rotated the window
+            self._window_started = now
+        report = self.report()
+        with self._lock:
+            self._done.merge(self.window)
+            self.window = Profile.empty_like(self.baseline.profile)
+        self.last_report = report
+        log.info(json.dumps({"event": "drift", **report}, default=float))
+
+
+def load_for(model_path: str | Path) -> Baseline | None:
+    """The baseline sidecar for ``model_path`` if present and current."""
+    path = baseline_path_for(model_path)
+    if not path.exists():
+        return None
+    baseline = Baseline.load(path)
+    if baseline.source_sha256 != source_sha256(model_path):
+        log.warning("ignoring %s: captured for a different artifact", path)
+        return None
+    return baseline
+
+
+_monitors: dict[str, tuple[str, DriftMonitor | None]] = {}
+
+
+def monitor_for(model_path: str | os.PathLike, **kwargs: Any) -> DriftMonitor | None:
+    """Process-wide monitor for ``model_path``, or ``None`` without a baseline.
+
+    Recreated when the baseline file changes (e.g. after a retrain).
+    """
+    path = baseline_path_for(Path(model_path).resolve())
+    stamp = f"{path.stat().st_mtime_ns}" if path.exists() else ""
+    cached = _monitors.get(str(path))
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    baseline = load_for(Path(model_path).resolve()) if stamp else None
+    monitor = DriftMonitor(baseline, **kwargs) if baseline else None
+    _monitors[str(path)] = (stamp, monitor)
+    return monitor
+
+
+def _collect_metrics() -> list[Sample]:
+    psi_values, ks_values, rows = [], [], []
+    for path, (_, monitor) in sorted(_monitors.items()):
+        report = monitor.last_report if monitor is not None else None
+        if report is None:
+            continue
+        model = Path(path).name[:-len(BASELINE_SUFFIX)]
+        for name, scores in report["features"].items():
+            psi_values.append(({"model": model, "feature": name}, scores["psi"]))
+            if "ks" in scores:
+                ks_values.append(({"model": model, "feature": name}, scores["ks"]))
+        rows.append(({"model": model}, report["rows"]))
+    if not rows:
+        return []
+    return [
+        ("drift_psi", "Population stability index of the last drift window vs the training baseline.",
+         "gauge", psi_values),
+        ("drift_ks", "KS statistic of the last drift window vs the training baseline.", "gauge", ks_values),
+        ("drift_window_rows", "Rows in the last drift window.", "gauge", rows),
+    ]
+
+
+telemetry.add_collector(_collect_metrics)
+
+
+def print_report(report: dict[str, Any], file: IO[str] = sys.stdout) -> None:
+    print(f"{report['rows']:,} rows vs {report['baseline_rows']:,} training rows; "
+          f"overall {report['status']} (worst: {report['worst']})", file=file)
+    for name, s in report["features"].items():
+        extra = (f"ks {s['ks']:.3f}  median {s['quartiles'][1]:,.1f} (baseline {s['baseline_quartiles'][1]:,.1f})"
+                 if "ks" in s else "  ".join(f"{k} {v:.0%}" for k, v in s["shares"].items() if v))
+        print(f"  {name:<11} psi {s['psi']:6.3f}  {s['status']:<8}  {extra}", file=file)
+
+
+def main(argv: list[str] | None = None) -> int:
+    from . import DEFAULT_MODEL_PATH
+
+    parser = argparse.ArgumentParser(description="training baselines and drift checks")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("baseline", help="capture the baseline profile for a model from its training data")
+    p.add_argument("model")
+    p.add_argument("--data", help="training CSV (default: the notebook's training split of insurance.csv)")
+    p = sub.add_parser("check", help="score a CSV/Parquet file and report its drift against the baseline")
+    p.add_argument("data")
+    p.add_argument("-m", "--model", default=str(DEFAULT_MODEL_PATH))
+    p.add_argument("--chunk-size", type=int, default=100_000)
+    p.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    import warnings
+
+    warnings.simplefilter("ignore")
+    from .inference import get_predictor
+
+    if args.command == "baseline":
+        from .training.pipeline import holdout_split, load_dataset
+
+        if args.data:
+            X, _ = load_dataset(args.data)
+        else:
+            X, y = load_dataset()
+            X, _, _, _ = holdout_split(X, y)
+        path = capture_baseline(X, get_predictor(args.model).predict(X), args.model)
+        print(f"baseline of {len(X):,} rows -> {path}", file=sys.stderr)
+        return 0
+
+    from .batch import PREDICTION_COLUMN, iter_chunks, score_frame
+
+    baseline = load_for(args.model)
+    if baseline is None:
+        parser.error(f"no current baseline for {args.model}; run the baseline command first")
+    monitor = DriftMonitor(baseline, interval=float("inf"))
+    predictor = get_predictor(args.model)
+    for chunk in iter_chunks(args.data, args.chunk_size):
+        scored = score_frame(predictor, chunk)
+        monitor.observe(scored, scored[PREDICTION_COLUMN])
+    report = monitor.report(cumulative=True)
+    if args.json:
+        print(json.dumps(report, indent=2, default=float))
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""Typed input encoder that writes model rows without pandas.
+
+A fitted ``ColumnTransformer`` validates column names, builds intermediate
+frames and concatenates each transformer's output on every call, which
+dominates the cost of scoring a single profile.  ``InputEncoder`` is compiled
+once from the fitted preprocessor (or from a ``CompiledForest``, which keeps
+the same column layout) and then:
+
+* checks age, BMI and children against ``FEATURE_RANGES`` and sex, smoker
+  and region against the vocabulary the one-hot encoder was fitted on;
+* writes each row straight into a preallocated float64 buffer, in exactly
+  the column order the fitted ``StandardScaler``/``OneHotEncoder`` produce.
+
+An encoder built from the preprocessor applies the scaler's ``(x - mean) /
+scale`` and so reproduces ``preprocessor.transform`` bit for bit; one built
+from a ``CompiledForest`` writes raw values, which is what its folded
+thresholds compare against.
+
+Returned matrices are views of a per-thread buffer and are only valid until
+that thread's next ``encode`` call.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Mapping
+
+import numpy as np
+
+from .compiled import Column, CompiledForest, _column_specs
+
+# Accepted input ranges, inclusive.  These are the bounds of the quote form;
+# insurance.csv itself covers ages 18-64, BMI 16-53.1 and 0-5 children, and
+# the forest extends its edge predictions beyond that.
+FEATURE_RANGES: dict[str, tuple[float, float]] = {
+    "age": (18.0, 100.0),
+    "bmi": (10.0, 60.0),
+    "children": (0.0, 10.0),
+}
+
+# Batches up to this many rows reuse the thread's buffer; larger ones get a
+# fresh array so a single huge batch does not pin its memory.
+BUFFER_ROWS = 4096
+
+
+class InputEncoder:
+    """Validates profiles and encodes them into the model's column layout."""
+
+    def __init__(
+        self,
+        columns: list[Column],
+        affine: list[tuple[float, float]] | None = None,
+        dropped: Mapping[str, tuple[str, ...]] | None = None,
+        ranges: Mapping[str, tuple[float, float]] = FEATURE_RANGES,
+    ):
+        self.columns = columns
+        self.n_columns = len(columns)
+        self.ranges = dict(ranges)
+        self._mean = np.array([m for m, _ in affine or [(0.0, 1.0)] * len(columns)])
+        self._scale = np.array([s for _, s in affine or [(0.0, 1.0)] * len(columns)])
+        self._scaled = affine is not None
+        # source -> column index for numeric inputs, and
+        # source -> {category: column index or None if dropped} for categoricals.
+        self.numeric: dict[str, int] = {}
+        self.vocabulary: dict[str, dict[str, int | None]] = {}
+        for j, col in enumerate(columns):
+            if col.kind == "numeric":
+                self.numeric[col.source] = j
+            else:
+                self.vocabulary.setdefault(col.source, {})[col.category] = j
+        for source, cats in (dropped or {}).items():
+            for cat in cats:
+                self.vocabulary.setdefault(source, {})[cat] = None
+        self._indicators = {s: [j for j in v.values() if j is not None] for s, v in self.vocabulary.items()}
+        self._local = threading.local()
+
+    @classmethod
+    def for_preprocessor(cls, preprocessor: Any, **kwargs: Any) -> "InputEncoder":
+        """Encoder producing ``preprocessor.transform`` output (scaled).
+
+        Raises ``NotImplementedError`` for transformers it cannot reproduce.
+        """
+        columns, affine, dropped = _column_specs(preprocessor)
+        return cls(columns, affine, dropped, **kwargs)
+
+    @classmethod
+    def for_forest(cls, forest: CompiledForest, **kwargs: Any) -> "InputEncoder":
+        """Encoder producing the raw column values a ``CompiledForest`` expects."""
+        return cls(forest.columns, None, forest.dropped, **kwargs)
+
+    def _buffer(self, n: int) -> np.ndarray:
+        if n > BUFFER_ROWS:
+            return np.empty((n, self.n_columns))
+        buf = getattr(self._local, "buffer", None)
+        if buf is None:
+            buf = self._local.buffer = np.empty((BUFFER_ROWS, self.n_columns))
+        return buf[:n]
+
+    def _out_of_range(self, name: str, value: float) -> ValueError:
+        if value != value:
+            return ValueError(f"{name} must be a number")
+        lo, hi = self.ranges[name]
+        return ValueError(f"{name} must be between {lo:g} and {hi:g}, got {value:g}")
+
+    def _check_range(self, name: str, values: np.ndarray) -> None:
+        lo, hi = self.ranges.get(name, (-np.inf, np.inf))
+        # NaN fails both comparisons, so it is caught here too.
+        bad = ~((values >= lo) & (values <= hi))
+        if bad.any():
+            raise self._out_of_range(name, float(values[bad][0]))
+
+    def _unknown(self, name: str, value: Any) -> ValueError:
+        known = ", ".join(sorted(self.vocabulary[name]))
+        if isinstance(value, np.generic):
+            value = value.item()
+        return ValueError(f"unknown {name} value {value!r} (expected one of: {known})")
+
+    def encode_one(self, row: Mapping[str, Any]) -> np.ndarray:
+        """Validate one normalized profile and encode it as a 1-row matrix."""
+        out = self._buffer(1)
+        x = out[0]
+        for name, j in self.numeric.items():
+            try:
+                v = float(row[name])
+            except (TypeError, ValueError):
+                raise ValueError(f"{name} must be a number") from None
+            lo, hi = self.ranges.get(name, (-np.inf, np.inf))
+            if not lo <= v <= hi:
+                raise self._out_of_range(name, v)
+            x[j] = v
+        for name, vocab in self.vocabulary.items():
+            value = row[name]
+            if value not in vocab:
+                raise self._unknown(name, value)
+            for j in self._indicators[name]:
+                x[j] = 0.0
+            j = vocab[value]
+            if j is not None:
+                x[j] = 1.0
+        if self._scaled:
+            np.subtract(out, self._mean, out=out)
+            np.divide(out, self._scale, out=out)
+        return out
+
+    def validate(self, data: Mapping[str, Any]) -> None:
+        """Run ``encode``'s checks on a DataFrame or dict of columns without encoding it."""
+        for name in self.numeric:
+            try:
+                values = np.asarray(data[name], dtype=np.float64)
+            except (TypeError, ValueError):
+                raise ValueError(f"{name} must be a number") from None
+            self._check_range(name, values)
+        for name, vocab in self.vocabulary.items():
+            values = np.asarray(data[name])
+            matched = np.zeros(len(values), dtype=bool)
+            for category in vocab:
+                matched |= values == category
+            if not matched.all():
+                raise self._unknown(name, values[~matched][0])
+
+    def encode(self, data: Mapping[str, Any]) -> np.ndarray:
+        """Validate and encode a DataFrame or dict of equal-length columns."""
+        n = len(data[next(iter(self.numeric or self.vocabulary))])
+        out = self._buffer(n)
+        for name, j in self.numeric.items():
+            try:
+                values = np.asarray(data[name], dtype=np.float64)
+            except (TypeError, ValueError):
+                raise ValueError(f"{name} must be a number") from None
+            self._check_range(name, values)
+            out[:, j] = values
+        for name, vocab in self.vocabulary.items():
+            values = np.asarray(data[name])
+            matched = np.zeros(n, dtype=bool)
+            for category, j in vocab.items():
+                hit = values == category
+                matched |= hit
+                if j is not None:
+                    out[:, j] = hit
+            if not matched.all():
+                raise self._unknown(name, values[~matched][0])
+        if self._scaled:
+            np.subtract(out, self._mean, out=out)
+            np.divide(out, self._scale, out=out)
+        return out
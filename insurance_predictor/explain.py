@@ -0,0 +1,331 @@
+"""Exact per-feature contributions (TreeSHAP, path-dependent) for the forest.
+
+Contributions are Shapley values over the six raw inputs, with each one-hot
+group treated as a single player, so "region" gets one number rather than
+one per indicator column.  The value of a coalition ``S`` is the usual
+path-dependent TreeSHAP expectation: walk each tree, follow ``x`` at splits
+on features in ``S`` and average both children by training cover
+everywhere else.  Contributions plus ``expected_value`` add up to the
+prediction.
+
+With six players there are only 64 coalitions, and each coalition's value
+depends on ``x`` only through the inputs in ``S``, on the same discrete grid
+as the lookup table (see ``tabulated.py``).  ``build`` therefore computes
+every ``v_S`` as a table over its own axes, directly from the leaves: each
+leaf is a box on the grid weighted by its value times the cover fractions of
+its splits outside ``S``, and boxes are added with difference arrays.
+Explaining a batch is then 64 gathers and one small matrix product: about
+twice the cost of predicting it with the lookup table (100k rows in ~0.15 s).
+Rows off the grid (non-integral age or children) are explained by walking
+the trees directly.
+
+    python -m insurance_predictor.explain insurance_expense_predictor.pkl --verify
+
+writes ``insurance_expense_predictor.shap.npz`` next to the model, which
+``Predictor.explain`` loads instead of rebuilding the tables.  Results are
+exact up to floating-point rounding (the difference arrays are summed with
+``cumsum``), typically within 1e-9 of the prediction.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import logging
+import math
+import sys
+import time
+from pathlib import Path
+from typing import Any, Mapping
+
+import numpy as np
+
+from .compiled import CompiledForest
+from .tabulated import INTEGER_RANGES, Axis, _axes_for, source_sha256
+
+log = logging.getLogger(__name__)
+
+EXPLAIN_SUFFIX = ".shap.npz"
+# Off-grid rows are walked through the trees this many at a time.
+DIRECT_BLOCK_ROWS = 64
+
+
+def explainer_path_for(model_path: str | Path) -> Path:
+    path = Path(model_path)
+    return path.with_name(path.stem + EXPLAIN_SUFFIX)
+
+
+def shapley_matrix(n_players: int) -> np.ndarray:
+    """``W`` with ``phi = W @ v``, where ``v[mask]`` is the value of coalition ``mask``."""
+    W = np.zeros((n_players, 1 << n_players))
+    for a in range(n_players):
+        bit = 1 << a
+        for mask in range(1 << n_players):
+            if mask & bit:
+                continue
+            k = bin(mask).count("1")
+            w = math.factorial(k) * math.factorial(n_players - k - 1) / math.factorial(n_players)
+            W[a, mask | bit] += w
+            W[a, mask] -= w
+    return W
+
+
+class _Leaves:
+    """Every leaf of the forest as a box on the grid plus per-axis cover fractions."""
+
+    def __init__(self, forest: CompiledForest, axes: list[Axis]):
+        if forest.cover is None:
+            raise ValueError("model has no node cover; re-export it with this version to explain predictions")
+        n_nodes, n_axes = len(forest.left), len(axes)
+        axis_of = {a.name: k for k, a in enumerate(axes)}
+        col_axis = np.array([axis_of[c.source] for c in forest.columns])
+        cover = forest.cover.astype(np.float64)
+        left, right = forest.left.astype(np.intp), forest.right.astype(np.intp)
+
+        # Box bounds in cell-index space: [lo, hi) on numeric axes, a
+        # bitmask of categories on categorical ones (hi unused).
+        lo = np.zeros((n_nodes, n_axes), dtype=np.int64)
+        hi = np.array([[len(a) for a in axes]] * n_nodes, dtype=np.int64)
+        for k, a in enumerate(axes):
+            if a.kind == "categories":
+                lo[:, k] = (1 << len(a)) - 1
+        frac = np.ones((n_nodes, n_axes))
+
+        frontier = forest.roots.astype(np.intp)
+        while len(frontier):
+            internal = frontier[left[frontier] != frontier]
+            if not len(internal):
+                break
+            col = forest.feature[internal].astype(np.intp)
+            ax = col_axis[col]
+            t = forest.threshold[internal]
+            for side, children in ((0, left[internal]), (1, right[internal])):
+                lo[children], hi[children], frac[children] = lo[internal], hi[internal], frac[internal]
+                frac[children, ax] *= cover[children] / cover[internal]
+            for k, a in enumerate(axes):
+                sel = ax == k
+                if not sel.any():
+                    continue
+                nodes, l_child, r_child = internal[sel], left[internal[sel]], right[internal[sel]]
+                if a.kind == "categories":
+                    # Indicator column for one category: 0 goes left, 1 right.
+                    cats = [forest.columns[j].category for j in col[sel]]
+                    bit = np.array([1 << int(np.flatnonzero(a.values == c)[0]) for c in cats], dtype=np.int64)
+                    lo[l_child, k] = lo[nodes, k] & ~bit
+                    lo[r_child, k] = lo[nodes, k] & bit
+                else:
+                    # Cells whose representative value is <= t go left.
+                    cut = np.searchsorted(a.representatives(), t[sel], side="right")
+                    hi[l_child, k] = np.minimum(hi[nodes, k], cut)
+                    lo[r_child, k] = np.maximum(lo[nodes, k], cut)
+            frontier = np.concatenate([left[internal], right[internal]])
+
+        leaves = np.flatnonzero(left == np.arange(n_nodes))
+        self.axes = axes
+        self.lo, self.hi, self.frac = lo[leaves], np.maximum(hi[leaves], lo[leaves]), frac[leaves]
+        self.weight = forest.value[leaves] / forest.n_trees
+
+    def table(self, mask: int) -> np.ndarray:
+        """``v_S`` over the axes in ``mask`` (in axis order)."""
+        members = [k for k in range(len(self.axes)) if mask >> k & 1]
+        weight = self.weight * np.prod(
+            [self.frac[:, k] for k in range(len(self.axes)) if not mask >> k & 1], axis=0, initial=1.0,
+        )
+        rows = np.arange(len(weight))
+        coords: list[np.ndarray] = []
+        # Categorical axes: one entry per (leaf, category in the leaf's set).
+        for k in members:
+            if self.axes[k].kind != "categories":
+                continue
+            keep_rows, keep_cat = [], []
+            for c in range(len(self.axes[k])):
+                hit = (self.lo[rows, k] >> c) & 1 == 1
+                keep_rows.append(np.flatnonzero(hit))
+                keep_cat.append(np.full(int(hit.sum()), c))
+            order = np.concatenate(keep_rows)
+            coords = [x[order] for x in coords] + [np.concatenate(keep_cat)]
+            rows = rows[order]
+        cat_coords = dict(zip([k for k in members if self.axes[k].kind == "categories"], coords))
+
+        numeric = [k for k in members if self.axes[k].kind != "categories"]
+        shape = [len(self.axes[k]) + (1 if k in numeric else 0) for k in members]
+        size = int(np.prod(shape))
+        diff = np.zeros(size)
+        # A box on the numeric axes is 2^d signed corners of a difference array.
+        for corner in itertools.product((0, 1), repeat=len(numeric)):
+            index = []
+            for k in members:
+                if k in cat_coords:
+                    index.append(cat_coords[k])
+                else:
+                    index.append((self.hi if corner[numeric.index(k)] else self.lo)[rows, k])
+            sign = -1.0 if sum(corner) % 2 else 1.0
+            flat = np.ravel_multi_index(index, shape) if members else np.zeros(len(rows), dtype=np.intp)
+            diff += np.bincount(flat, weights=sign * weight[rows], minlength=size)
+        diff = diff.reshape(shape)
+        for pos, k in enumerate(members):
+            if k in numeric:
+                diff = np.cumsum(diff, axis=pos)
+        return diff[tuple(slice(0, len(self.axes[k])) for k in members)].copy(order="C")
+
+
+class Explainer:
+    def __init__(self, axes: list[Axis], tables: list[np.ndarray], source_sha256: str = ""):
+        self.axes = axes
+        self.names = [a.name for a in axes]
+        # ``tables[mask]`` is ``v_S`` for the coalition with bit k set for axes[k].
+        self.tables = tables
+        self.source_sha256 = source_sha256
+        self.expected_value = float(tables[0])
+        self._W = shapley_matrix(len(axes))
+        self._members = [[k for k in range(len(axes)) if m >> k & 1] for m in range(len(tables))]
+        self._forest: CompiledForest | None = None
+
+    @property
+    def nbytes(self) -> int:
+        return sum(t.nbytes for t in self.tables)
+
+    def attach(self, forest: CompiledForest) -> "Explainer":
+        """Use ``forest`` for rows that are off the grid."""
+        self._forest = forest
+        return self
+
+    def explain(self, data: Mapping[str, Any]) -> np.ndarray:
+        """Contributions, one row per input row and one column per ``names``."""
+        idx = []
+        on_grid = None
+        for axis in self.axes:
+            i, ok = axis.index(np.asarray(data[axis.name]))
+            idx.append(i)
+            on_grid = ok if on_grid is None else on_grid & ok
+        values = np.empty((len(self.tables), len(on_grid)))
+        for mask, table in enumerate(self.tables):
+            members = self._members[mask]
+            if not members:
+                values[mask] = table
+            else:
+                values[mask] = table.reshape(-1)[np.ravel_multi_index([idx[k] for k in members], table.shape)]
+        if not on_grid.all():
+            off = np.flatnonzero(~on_grid)
+            if self._forest is None:
+                raise ValueError("input is off the grid (non-integral age or children) and no forest is attached")
+            values[:, off] = self._direct_values({n: np.asarray(data[n])[off] for n in self.names})
+        return (self._W @ values).T
+
+    def _direct_values(self, data: Mapping[str, Any]) -> np.ndarray:
+        """Coalition values by walking every tree; for rows off the grid."""
+        forest = self._forest
+        axis_of = {n: k for k, n in enumerate(self.names)}
+        node_axis = np.array([axis_of[c.source] for c in forest.columns])[forest.feature.astype(np.intp)]
+        left, right = forest.left.astype(np.intp), forest.right.astype(np.intp)
+        n_nodes = len(left)
+        internal = np.flatnonzero(left != np.arange(n_nodes))
+        cover = forest.cover.astype(np.float64)
+        leaves = np.flatnonzero(left == np.arange(n_nodes))
+        X = forest.encode(data)
+        out = np.empty((len(self.tables), len(X)))
+        for start in range(0, len(X), DIRECT_BLOCK_ROWS):
+            block = X[start:start + DIRECT_BLOCK_ROWS]
+            right_taken = block[:, forest.feature[internal].astype(np.intp)] > forest.threshold[internal]
+            for mask in range(len(self.tables)):
+                followed = (mask >> node_axis[internal]) & 1 == 1
+                w = np.zeros((len(block), n_nodes))
+                w[:, forest.roots.astype(np.intp)] = 1.0
+                # Node ids increase from parent to child, so one pass in id
+                # order sees every parent before its children.
+                for lvl_nodes in self._levels(forest, internal):
+                    pos = np.searchsorted(internal, lvl_nodes)
+                    for child, go in ((left[lvl_nodes], ~right_taken[:, pos]), (right[lvl_nodes], right_taken[:, pos])):
+                        share = np.where(followed[pos], go, cover[child] / cover[lvl_nodes])
+                        w[:, child] = w[:, lvl_nodes] * share
+                out[mask, start:start + len(block)] = w[:, leaves] @ forest.value[leaves] / forest.n_trees
+        return out
+
+    @staticmethod
+    def _levels(forest: CompiledForest, internal: np.ndarray) -> list[np.ndarray]:
+        left, right = forest.left.astype(np.intp), forest.right.astype(np.intp)
+        is_internal = np.zeros(len(left), dtype=bool)
+        is_internal[internal] = True
+        levels, frontier = [], forest.roots.astype(np.intp)
+        while len(frontier):
+            frontier = frontier[is_internal[frontier]]
+            if len(frontier):
+                levels.append(frontier)
+                frontier = np.concatenate([left[frontier], right[frontier]])
+        return levels
+
+    def save(self, path: str | Path) -> None:
+        arrays = {"source_sha256": np.array(self.source_sha256)}
+        for k, axis in enumerate(self.axes):
+            arrays[f"axis{k}_values"] = axis.values
+            arrays[f"axis{k}_meta"] = np.array([axis.name, axis.kind])
+        for mask, table in enumerate(self.tables):
+            arrays[f"v{mask}"] = table
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "Explainer":
+        with np.load(path) as data:
+            axes = []
+            while f"axis{len(axes)}_meta" in data.files:
+                k = len(axes)
+                name, kind = data[f"axis{k}_meta"].tolist()
+                axes.append(Axis(name, kind, data[f"axis{k}_values"]))
+            tables = [data[f"v{mask}"] for mask in range(1 << len(axes))]
+            return cls(axes, tables, str(data["source_sha256"]))
+
+
+def build(forest: CompiledForest, source_sha256: str = "") -> Explainer:
+    """Compute ``v_S`` tables for every coalition of the forest's inputs."""
+    leaves = _Leaves(forest, _axes_for(forest, INTEGER_RANGES))
+    tables = [leaves.table(mask) for mask in range(1 << len(leaves.axes))]
+    return Explainer(leaves.axes, tables, source_sha256).attach(forest)
+
+
+def load_for(model_path: str | Path) -> Explainer | None:
+    """Load the sidecar tables for ``model_path`` if present and current."""
+    path = explainer_path_for(model_path)
+    if not path.exists():
+        return None
+    explainer = Explainer.load(path)
+    if explainer.source_sha256 != source_sha256(model_path):
+        log.warning("ignoring %s: built from a different artifact", path)
+        return None
+    return explainer
+
+
+def main(argv: list[str] | None = None) -> int:
+    from .compiled import compile_pipeline
+    from .registry import get_model
+
+    parser = argparse.ArgumentParser(description="precompute exact contribution tables for a fitted forest")
+    parser.add_argument("model", help="fitted pipeline (.pkl) or compiled artifact (.icpf)")
+    parser.add_argument("-o", "--output", help=f"output file (default: <model>{EXPLAIN_SUFFIX})")
+    parser.add_argument("--verify", type=int, nargs="?", const=200, default=0, metavar="N",
+                        help="check N random grid rows against a direct tree walk (default: 200)")
+    args = parser.parse_args(argv)
+
+    model = get_model(args.model)
+    forest = model if isinstance(model, CompiledForest) else compile_pipeline(model)
+    t0 = time.perf_counter()
+    explainer = build(forest, source_sha256(args.model))
+    output = args.output or explainer_path_for(args.model)
+    explainer.save(output)
+    print(f"{len(explainer.tables)} coalition tables, {explainer.nbytes / 1e6:.1f} MB, "
+          f"built in {time.perf_counter() - t0:.1f}s -> {output}", file=sys.stderr)
+    if args.verify:
+        rng = np.random.default_rng(0)
+        rows = {a.name: rng.choice(a.representatives(), args.verify) for a in explainer.axes}
+        fast = explainer.explain(rows)
+        direct = (explainer._W @ explainer._direct_values(rows)).T
+        pred = forest.predict(rows)
+        err = float(np.abs(fast - direct).max())
+        gap = float(np.abs(fast.sum(axis=1) + explainer.expected_value - pred).max())
+        print(f"verified {args.verify} rows: max |table - direct| {err:.3g}, "
+              f"max |sum + expected - prediction| {gap:.3g}", file=sys.stderr)
+        return 0 if err < 1e-6 and gap < 1e-6 else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
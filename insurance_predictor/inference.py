@@ -0,0 +1,255 @@
+"""Server-side scoring of customer profiles against the trained pipeline.
+
+Forest pipelines are lowered to a ``CompiledForest`` (see ``compiled.py``)
+on first use, which predicts the same values as ``model.predict`` without
+going through pandas, ``ColumnTransformer`` validation or the forest's
+joblib dispatch.  For large frames sklearn's native tree traversal is still
+faster than the NumPy walk, so those are encoded once and passed to each
+``tree_`` directly.  Other regressors behind a supported preprocessor get
+the same treatment: rows are encoded by ``InputEncoder`` and handed to the
+regressor's ``predict``.  Anything else is scored with the pipeline's own
+``predict``.
+
+If an exact lookup table has been built next to the artifact (see
+``tabulated.py``), it answers every on-grid row with a binary search and an
+array lookup, and only the rest fall through to the forest.
+
+``Predictor.explain`` returns exact per-feature contributions (see
+``explain.py``).  Its tables (about 90 MB) are loaded from a sidecar file or
+built the first time ``Predictor.explainer`` is read, so callers that
+explain should read it when they load the model, not inside a request.  ``Predictor.predict_distribution`` returns the mean together with
+quantiles of the per-tree estimates (see ``intervals.py``).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from typing import TYPE_CHECKING, Any, Iterator, Mapping, Sequence
+
+import numpy as np
+
+from . import DEFAULT_MODEL_PATH
+from .compiled import CompiledForest, compile_pipeline
+from .encoder import InputEncoder
+from .intervals import DEFAULT_QUANTILES, DistributionBuilder, ForestDistribution
+from .telemetry import telemetry
+
+if TYPE_CHECKING:
+    # Imported where used: a process that only scores (see ``runtime.py``)
+    # never needs the registry, the lookup table or the explainer.
+    from .explain import Explainer
+    from .registry import Fingerprint
+    from .tabulated import TabulatedModel
+
+log = logging.getLogger(__name__)
+
+NUMERIC_FEATURES = ["age", "bmi", "children"]
+CATEGORICAL_FEATURES = ["sex", "smoker", "region"]
+FEATURES = ["age", "sex", "bmi", "children", "smoker", "region"]
+
+# Frames at least this long go through sklearn's native tree traversal.
+NATIVE_BATCH_ROWS = 2048
+# Rows per block when per-tree values are kept (trees x rows float64).
+NATIVE_BLOCK_ROWS = 32768
+
+
+def normalize_profile(raw: Mapping[str, Any]) -> dict[str, Any]:
+    """Coerce a profile posted by the UI into the training data's schema."""
+    missing = [f for f in FEATURES if raw.get(f) in (None, "")]
+    if missing:
+        raise ValueError(f"missing fields: {', '.join(missing)}")
+    return {
+        "age": float(raw["age"]),
+        "sex": str(raw["sex"]).strip().lower(),
+        "bmi": float(raw["bmi"]),
+        "children": float(raw["children"]),
+        "smoker": str(raw["smoker"]).strip().lower(),
+        "region": str(raw["region"]).strip().lower(),
+    }
+
+
+class Predictor:
+    """Fast prediction wrapper around a fitted sklearn pipeline."""
+
+    def __init__(
+        self,
+        pipeline: Any,
+        table: TabulatedModel | None = None,
+        fingerprint: Fingerprint | None = None,
+    ):
+        self.table = table
+        # Identifies the artifact this predictor was built from, if any.
+        self.fingerprint = fingerprint
+        self.trees: list[Any] = []
+        # ``encoder`` feeds the compiled forest (raw values); ``design`` feeds
+        # the fitted regressor (preprocessor output).
+        self.encoder: InputEncoder | None = None
+        self.design: InputEncoder | None = None
+        self._explainer: Explainer | None = None
+        if isinstance(pipeline, CompiledForest):
+            # Loaded from a pickle-free artifact: there is no sklearn object.
+            self.pipeline = None
+            self.compiled: CompiledForest | None = pipeline
+            self.encoder = InputEncoder.for_forest(pipeline)
+            return
+        self.pipeline = pipeline
+        try:
+            self.compiled = compile_pipeline(pipeline)
+        except NotImplementedError:
+            self.compiled = None
+        else:
+            self.encoder = InputEncoder.for_forest(self.compiled)
+            self.trees = [e.tree_ for e in pipeline.steps[-1][1].estimators_]
+        steps = getattr(pipeline, "steps", None)
+        if steps and len(steps) == 2:
+            try:
+                self.design = InputEncoder.for_preprocessor(steps[0][1])
+            except (NotImplementedError, AttributeError):
+                self.design = None
+            self.regressor = steps[1][1]
+
+    def _predict_native(self, frame: Any) -> np.ndarray:
+        with telemetry.stage("transform"):
+            X = self.design.encode(frame).astype(np.float32)
+        with telemetry.stage("traversal"):
+            total = np.zeros(X.shape[0])
+            for tree in self.trees:
+                total += tree.predict(X)[:, 0]
+            return total / len(self.trees)
+
+    def _predict_forest(self, frame: Any) -> np.ndarray:
+        if self.compiled is None:
+            if self.design is not None:
+                with telemetry.stage("transform"):
+                    X = self.design.encode(frame)
+                with telemetry.stage("traversal"):
+                    return np.asarray(self.regressor.predict(X), dtype=float)
+            with telemetry.stage("traversal"):
+                return np.asarray(self.pipeline.predict(frame), dtype=float)
+        if self.trees and self.design is not None and len(frame[FEATURES[0]]) >= NATIVE_BATCH_ROWS:
+            return self._predict_native(frame)
+        with telemetry.stage("encode"):
+            X = self.encoder.encode(frame)
+        with telemetry.stage("traversal"):
+            return self.compiled.predict_encoded(X)
+
+    def predict(self, frame: Any) -> np.ndarray:
+        if self.table is None:
+            return self._predict_forest(frame)
+        # The table clamps out-of-range inputs to its edges, so reject them
+        # here exactly as the forest path would.
+        with telemetry.stage("encode"):
+            (self.encoder or self.design).validate(frame)
+        with telemetry.stage("traversal"):
+            out, on_grid = self.table.lookup(frame)
+        if not on_grid.all():
+            off = np.flatnonzero(~on_grid)
+            if hasattr(frame, "iloc"):
+                rest = frame.iloc[off]
+            else:
+                rest = {f: np.asarray(frame[f])[off] for f in FEATURES}
+            out[off] = self._predict_forest(rest)
+        return out
+
+    def predict_one(self, profile: Mapping[str, Any]) -> float:
+        row = normalize_profile(profile)
+        if self.table is None:
+            if self.encoder is not None:
+                with telemetry.stage("encode"):
+                    X = self.encoder.encode_one(row)
+                with telemetry.stage("traversal"):
+                    return float(self.compiled.predict_encoded(X)[0])
+            if self.design is not None:
+                with telemetry.stage("transform"):
+                    X = self.design.encode_one(row)
+                with telemetry.stage("traversal"):
+                    return float(self.regressor.predict(X)[0])
+            import pandas as pd
+
+            with telemetry.stage("traversal"):
+                return float(self.pipeline.predict(pd.DataFrame({f: [row[f]] for f in FEATURES}))[0])
+        # Validate before the lookup: the table clamps out-of-range inputs.
+        with telemetry.stage("encode"):
+            (self.encoder or self.design).encode_one(row)
+        return float(self.predict({f: [row[f]] for f in FEATURES})[0])
+
+    def _tree_values(self, frame: Any) -> Iterator[tuple[int, np.ndarray]]:
+        if self.trees and self.design is not None and len(frame[FEATURES[0]]) >= NATIVE_BATCH_ROWS:
+            X = self.design.encode(frame).astype(np.float32)
+            for start in range(0, len(X), NATIVE_BLOCK_ROWS):
+                block = X[start:start + NATIVE_BLOCK_ROWS]
+                values = np.empty((len(self.trees), len(block)))
+                for i, tree in enumerate(self.trees):
+                    values[i] = tree.predict(block)[:, 0]
+                yield start, values
+        else:
+            yield from self.compiled.iter_tree_values(self.encoder.encode(frame))
+
+    def predict_distribution(
+        self, frame: Any, quantiles: Sequence[float] = DEFAULT_QUANTILES, std: bool = False,
+    ) -> ForestDistribution:
+        """Mean, quantiles and optionally the spread of the per-tree predictions.
+
+        Always walks the trees (the lookup table only stores means); the mean
+        equals ``predict``.
+        """
+        if self.compiled is None:
+            raise ValueError("prediction intervals are only available for compiled forests")
+        builder = DistributionBuilder(len(frame[FEATURES[0]]), quantiles, std)
+        for start, values in self._tree_values(frame):
+            builder.add(start, values)
+        return builder.result
+
+    def predict_distribution_one(
+        self, profile: Mapping[str, Any], quantiles: Sequence[float] = DEFAULT_QUANTILES, std: bool = False,
+    ) -> dict[str, float]:
+        row = normalize_profile(profile)
+        return self.predict_distribution({f: [row[f]] for f in FEATURES}, quantiles, std).row()
+
+    @property
+    def explainer(self) -> Explainer:
+        if self._explainer is None:
+            if self.compiled is None:
+                raise ValueError("explanations are only available for compiled forests")
+            from .explain import build, load_for
+
+            t0 = time.perf_counter()
+            explainer = load_for(self.fingerprint.path) if self.fingerprint else None
+            how = "loaded" if explainer is not None else "built"
+            self._explainer = (explainer or build(self.compiled)).attach(self.compiled)
+            log.info("explanation tables %s in %.1f s (%.1f MB)",
+                     how, time.perf_counter() - t0, self._explainer.nbytes / 1e6)
+        return self._explainer
+
+    def explain(self, frame: Any) -> np.ndarray:
+        """Per-feature contributions, columns in ``explainer.names`` order."""
+        return self.explainer.explain(frame)
+
+    def explain_one(self, profile: Mapping[str, Any]) -> dict[str, Any]:
+        """Contributions for one profile, keyed by feature in ``FEATURES`` order."""
+        row = normalize_profile(profile)
+        (self.encoder or self.design).encode_one(row)
+        explainer = self.explainer
+        phi = explainer.explain({f: [row[f]] for f in FEATURES})[0]
+        by_name = dict(zip(explainer.names, phi.tolist()))
+        return {"expected_value": explainer.expected_value, "contributions": {f: by_name[f] for f in FEATURES}}
+
+
+_predictors: dict[str, tuple[Fingerprint, Predictor]] = {}
+
+
+def get_predictor(path: str | os.PathLike = DEFAULT_MODEL_PATH) -> Predictor:
+    """Return a ``Predictor`` for the registry's current copy of ``path``."""
+    from .registry import registry
+    from .tabulated import load_for as load_table_for
+
+    pipeline, info = registry.get_with_info(path)
+    cached = _predictors.get(info.fingerprint.path)
+    if cached is not None and cached[0] == info.fingerprint:
+        return cached[1]
+    with telemetry.stage("compile"):
+        predictor = Predictor(pipeline, load_table_for(info.fingerprint.path), info.fingerprint)
+    _predictors[info.fingerprint.path] = (info.fingerprint, predictor)
+    return predictor
@@ -0,0 +1,110 @@
+"""Prediction intervals from the forest's per-tree estimates.
+
+    dist = get_predictor().predict_distribution(frame, quantiles=(0.05, 0.5, 0.95), std=True)
+    dist.mean, dist.quantiles[0.05], dist.quantiles[0.95], dist.std
+
+A random forest's prediction is the mean of its trees' leaf values, so the
+traversal that computes it already has a per-row sample of 100 estimates.
+``Predictor.predict_distribution`` keeps that sample for each block of rows
+instead of only its sum and reduces it to the mean (bit-identical to
+``predict``), any set of quantiles and, optionally, the standard deviation
+across trees.  Quantiles use NumPy's default linear interpolation.
+
+The band describes disagreement between trees, not a calibrated interval
+for the claim itself: it is narrow where the training data is dense and
+consistent and widens where it is sparse or noisy.
+
+Quantiles come from one sort of each row's tree values (NumPy's vectorized
+sort is several times faster on 100-element rows than ``np.quantile``'s
+partition), which adds a few percent to the cost of a batch prediction.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Sequence
+
+import numpy as np
+
+DEFAULT_QUANTILES = (0.05, 0.95)
+# Rows summarized at a time: keeps the transposed, sorted copy in cache.
+REDUCE_BLOCK_ROWS = 2048
+
+
+def check_quantiles(quantiles: Sequence[float]) -> tuple[float, ...]:
+    qs = tuple(float(q) for q in quantiles)
+    bad = [q for q in qs if not 0.0 <= q <= 1.0]
+    if bad:
+        raise ValueError(f"quantiles must be between 0 and 1, got {bad[0]:g}")
+    return qs
+
+
+def quantile_label(q: float) -> str:
+    """Column suffix for a quantile: 0.05 -> ``q05``, 0.975 -> ``q97.5``."""
+    return "q" + f"{q * 100:g}".zfill(2)
+
+
+@dataclass
+class ForestDistribution:
+    mean: np.ndarray
+    quantiles: dict[float, np.ndarray] = field(default_factory=dict)
+    std: np.ndarray | None = None
+
+    def columns(self, prefix: str) -> dict[str, np.ndarray]:
+        """The summaries as named columns (``prefix_q05``, ``prefix_std``...)."""
+        out = {f"{prefix}_{quantile_label(q)}": v for q, v in self.quantiles.items()}
+        if self.std is not None:
+            out[f"{prefix}_std"] = self.std
+        return out
+
+    def row(self, i: int = 0) -> dict[str, float]:
+        out = {"mean": float(self.mean[i])}
+        out.update({quantile_label(q): float(v[i]) for q, v in self.quantiles.items()})
+        if self.std is not None:
+            out["std"] = float(self.std[i])
+        return out
+
+
+class DistributionBuilder:
+    """Fills a ``ForestDistribution`` from blocks of per-tree values."""
+
+    def __init__(self, n_rows: int, quantiles: Sequence[float] = DEFAULT_QUANTILES, std: bool = False):
+        self.quantiles = check_quantiles(quantiles)
+        self.result = ForestDistribution(
+            np.empty(n_rows),
+            {q: np.empty(n_rows) for q in self.quantiles},
+            np.empty(n_rows) if std else None,
+        )
+
+    def add(self, start: int, values: np.ndarray) -> None:
+        """Summarize ``values`` (trees x rows) into rows ``start:start + rows``."""
+        for offset in range(0, values.shape[1], REDUCE_BLOCK_ROWS):
+            self._add(start + offset, values[:, offset:offset + REDUCE_BLOCK_ROWS])
+
+    def _add(self, start: int, values: np.ndarray) -> None:
+        n_trees, k = values.shape
+        rows = slice(start, start + k)
+        res = self.result
+        # Tree by tree, in estimator order, as the forest sums them, so the
+        # mean is exactly what ``predict`` returns.
+        total = res.mean[rows]
+        total[:] = values[0]
+        for i in range(1, n_trees):
+            total += values[i]
+        total /= n_trees
+        if res.std is not None:
+            var = np.zeros(k)
+            for i in range(n_trees):
+                d = values[i] - total
+                var += d * d
+            np.sqrt(var / n_trees, out=res.std[rows])
+        if self.quantiles:
+            ordered = np.sort(values.T, axis=1)
+            for q, out in res.quantiles.items():
+                pos = q * (n_trees - 1)
+                lo = int(np.floor(pos))
+                hi = min(lo + 1, n_trees - 1)
+                t = pos - lo
+                a, b = ordered[:, lo], ordered[:, hi]
+                # np.quantile's lerp, which is exact at both ends.
+                out[rows] = b - (b - a) * (1 - t) if t >= 0.5 else a + (b - a) * t
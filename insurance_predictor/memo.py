@@ -0,0 +1,140 @@
+"""Memoized single-quote predictions.
+
+The UI only produces integer ages, one-decimal BMIs and a handful of
+categorical values, so live traffic repeats the same quotes constantly.
+``PredictionCache`` is a bounded LRU map from the normalized input tuple to
+the predicted cost, with an optional TTL.  Entries are tagged with the
+artifact fingerprint they were computed from; when the registry reloads a
+retrained pickle, every entry for that path is dropped on the next lookup.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Mapping
+
+from . import DEFAULT_MODEL_PATH
+from .inference import FEATURES, Predictor, get_predictor, normalize_profile
+from .registry import Fingerprint
+from .telemetry import Sample, telemetry
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    invalidations: int
+    size: int
+    maxsize: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class PredictionCache:
+    """Thread-safe LRU + TTL cache, invalidated per artifact fingerprint."""
+
+    def __init__(self, maxsize: int = 4096, ttl: float | None = None, clock: Callable[[], float] = time.monotonic):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, Hashable], tuple[float, float]] = OrderedDict()
+        self._generations: dict[str, Fingerprint] = {}
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def _check_generation(self, fingerprint: Fingerprint) -> None:
+        current = self._generations.get(fingerprint.path)
+        if current == fingerprint:
+            return
+        if current is not None:
+            stale = [k for k in self._entries if k[0] == fingerprint.path]
+            for k in stale:
+                del self._entries[k]
+            self.invalidations += len(stale)
+        self._generations[fingerprint.path] = fingerprint
+
+    def get_or_compute(self, fingerprint: Fingerprint, key: Hashable, compute: Callable[[], float]) -> float:
+        full_key = (fingerprint.path, key)
+        now = self._clock()
+        with self._lock:
+            self._check_generation(fingerprint)
+            entry = self._entries.get(full_key)
+            if entry is not None:
+                value, expires = entry
+                if expires >= now:
+                    self._entries.move_to_end(full_key)
+                    self.hits += 1
+                    return value
+                del self._entries[full_key]
+                self.expirations += 1
+            self.misses += 1
+        # Computed outside the lock; a concurrent miss on the same key just
+        # computes the same value twice.
+        value = compute()
+        expires = now + self.ttl if self.ttl is not None else float("inf")
+        with self._lock:
+            if self._generations.get(fingerprint.path) == fingerprint:
+                self._entries[full_key] = (value, expires)
+                self._entries.move_to_end(full_key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                self.hits, self.misses, self.evictions, self.expirations,
+                self.invalidations, len(self._entries), self.maxsize,
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+
+quote_cache = PredictionCache(maxsize=4096, ttl=3600.0)
+
+
+def _cache_metrics() -> list[Sample]:
+    s = quote_cache.stats()
+    return [
+        ("quote_cache_hits_total", "Quote cache hits.", "counter", [({}, s.hits)]),
+        ("quote_cache_misses_total", "Quote cache misses.", "counter", [({}, s.misses)]),
+        ("quote_cache_evictions_total", "Quote cache entries evicted, expired or invalidated.", "counter",
+         [({"reason": "lru"}, s.evictions), ({"reason": "ttl"}, s.expirations),
+          ({"reason": "reload"}, s.invalidations)]),
+        ("quote_cache_entries", "Entries currently cached.", "gauge", [({}, s.size)]),
+    ]
+
+
+telemetry.add_collector(_cache_metrics)
+
+
+def predict_one(
+    profile: Mapping[str, Any],
+    path: str | os.PathLike = DEFAULT_MODEL_PATH,
+    cache: PredictionCache = quote_cache,
+    predictor: Predictor | None = None,
+) -> float:
+    """``Predictor.predict_one`` through ``cache``.
+
+    ``predictor`` scores instead of the registry's copy of ``path``, e.g. a
+    model served from a ``serving.ModelPool``.
+    """
+    predictor = predictor or get_predictor(path)
+    row = normalize_profile(profile)
+    key = tuple(row[f] for f in FEATURES)
+    return cache.get_or_compute(predictor.fingerprint, key, lambda: predictor.predict_one(row))
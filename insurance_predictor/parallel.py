@@ -0,0 +1,118 @@
+"""Process-pool scoring for bulk repricing.
+
+The forest's own ``n_jobs`` only parallelises inside one ``predict`` call;
+for large books it is cheaper to cut the input into shards and score them
+in separate worker processes, each running single-threaded.
+
+Workers never unpickle the artifact themselves where ``fork`` is available:
+the parent loads the pipeline once and the pool is forked from it, so the
+tree node buffers are shared copy-on-write between all workers (they are
+only ever read).  On spawn-only platforms each worker loads the artifact
+once in its initializer instead.  Results are concatenated in input order.
+"""
+
+from __future__ import annotations
+
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Sequence
+
+import numpy as np
+
+from . import DEFAULT_MODEL_PATH
+from .inference import Predictor, get_predictor
+from .intervals import ForestDistribution
+
+_worker_predictor: Predictor | None = None
+
+
+def _init_worker(model_path: str) -> None:
+    global _worker_predictor
+    if _worker_predictor is None:
+        _worker_predictor = get_predictor(model_path)
+
+
+def _predict_shard(shard: Any) -> np.ndarray:
+    return _worker_predictor.predict(shard)
+
+
+def _distribution_shard(shard: Any, quantiles: Sequence[float], std: bool) -> ForestDistribution:
+    return _worker_predictor.predict_distribution(shard, quantiles, std)
+
+
+def default_workers() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+class ParallelScorer:
+    """Shards frames across a pool of worker processes.
+
+    Use as a context manager, or call ``close()`` when done; the pool is
+    created lazily on the first call that needs more than one shard.
+    """
+
+    def __init__(
+        self,
+        model_path: str | Path = DEFAULT_MODEL_PATH,
+        workers: int | None = None,
+        shard_size: int = 50_000,
+    ):
+        self.model_path = str(model_path)
+        self.workers = workers or default_workers()
+        self.shard_size = shard_size
+        self.predictor = get_predictor(self.model_path)
+        self._pool: ProcessPoolExecutor | None = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            global _worker_predictor
+            if "fork" in mp.get_all_start_methods():
+                # Set before forking so children inherit the loaded pipeline.
+                _worker_predictor = self.predictor
+                ctx = mp.get_context("fork")
+            else:
+                ctx = mp.get_context()
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=ctx,
+                initializer=_init_worker, initargs=(self.model_path,),
+            )
+        return self._pool
+
+    def _shards(self, frame: Any) -> list[Any]:
+        # Never use fewer shards than workers, so every core gets a slice.
+        n = len(frame)
+        size = min(self.shard_size, -(-n // self.workers))
+        return [frame.iloc[i:i + size] for i in range(0, n, size)]
+
+    def predict(self, frame: Any) -> np.ndarray:
+        if self.workers <= 1 or len(frame) <= self.shard_size:
+            return self.predictor.predict(frame)
+        return np.concatenate(list(self._get_pool().map(_predict_shard, self._shards(frame))))
+
+    def predict_distribution(self, frame: Any, quantiles: Sequence[float], std: bool = False) -> ForestDistribution:
+        if self.workers <= 1 or len(frame) <= self.shard_size:
+            return self.predictor.predict_distribution(frame, quantiles, std)
+        parts = list(self._get_pool().map(partial(_distribution_shard, quantiles=quantiles, std=std),
+                                          self._shards(frame)))
+        return ForestDistribution(
+            np.concatenate([p.mean for p in parts]),
+            {q: np.concatenate([p.quantiles[q] for p in parts]) for q in parts[0].quantiles},
+            np.concatenate([p.std for p in parts]) if std else None,
+        )
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self) -> "ParallelScorer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,205 @@
+"""Quantized, reduced-precision form of the compiled forest.
+
+A ``CompiledForest`` node holds a float64 threshold, two 32-bit child
+indices and a float64 value: about 30 bytes, most of which a traversal
+never needs.  The forest only ever compares an input against a few hundred
+distinct split values per column (every whole age, a few hundred BMIs,
+a handful of child counts, 0.5 for each indicator), so ``quantize`` replaces
+each threshold by its index in that column's sorted table of split values
+and stores:
+
+* the split column as ``uint8``;
+* the threshold index as ``uint16`` (``uint8`` when every column has fewer
+  than 256 splits);
+* child indices relative to the tree's root, as ``uint16``;
+* leaf values as ``float32``.
+
+That is 11 bytes a node.  At prediction time each input is bucketed once
+per column with a binary search (how many split values lie below it), and
+``x > threshold`` becomes ``bucket > index``.  This comparison is exact, so
+every row reaches the same leaf as in the full-precision forest.  The only
+loss is rounding each leaf value to float32 (about 1e-7 relative).  Trees
+are still accumulated in float64.
+
+``accuracy`` reports ``r2_score`` of both forests against observed expenses.
+``artifact export --quantize`` records it for the notebook's held-out test
+rows in the artifact header;
+``python -m benchmarks.bench_quantized`` also measures memory and latency
+on the benchmark grid.
+"""
+
+from __future__ import annotations
+
+from functools import cached_property
+from typing import Any, Iterator, Mapping
+
+import numpy as np
+
+from .compiled import BLOCK_ROWS, Column, CompiledForest, _index_dtype
+
+
+class QuantizedForest(CompiledForest):
+    """``CompiledForest`` with indexed thresholds, tree-local children and float32 leaves.
+
+    ``threshold``, ``left`` and ``right`` are rebuilt at full width on first
+    access, so the lookup table and explanations can still be built from a
+    quantized forest; prediction never touches them.
+    """
+
+    kind = "quantized_random_forest"
+
+    def __init__(
+        self,
+        columns: list[Column],
+        feature: np.ndarray,
+        code: np.ndarray,
+        cuts: np.ndarray,
+        cut_start: np.ndarray,
+        child: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        max_depth: int,
+        dropped: Mapping[str, tuple[str, ...]] | None = None,
+        cover: np.ndarray | None = None,
+    ):
+        self._set_schema(columns, dropped)
+        self.feature = feature
+        # Index of each split's threshold in its column's slice of ``cuts``:
+        # ``cuts[cut_start[j]:cut_start[j + 1]]`` are column ``j``'s sorted
+        # distinct thresholds.
+        self.code = code
+        self.cuts = cuts
+        self.cut_start = cut_start
+        # As in ``CompiledForest``, but relative to the tree's root.
+        self.child = child
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.cover = cover
+        self._roots = roots.astype(np.intp)
+
+    @cached_property
+    def _node_base(self) -> np.ndarray:
+        """Root of the tree each node belongs to."""
+        sizes = np.diff(np.append(self._roots, len(self.value)))
+        return np.repeat(self._roots, sizes)
+
+    @cached_property
+    def threshold(self) -> np.ndarray:
+        start = self.cut_start.astype(np.intp)
+        # Leaves carry index 0 of column 0, which may have no splits at all.
+        thr = np.append(self.cuts, np.inf)[start[self.feature] + self.code]
+        is_leaf = self.child[0::2] == np.arange(len(self.value)) - self._node_base
+        return np.where(is_leaf, np.inf, thr)
+
+    @property
+    def left(self) -> np.ndarray:
+        return self.child[0::2] + self._node_base
+
+    @property
+    def right(self) -> np.ndarray:
+        return self.child[1::2] + self._node_base
+
+    @cached_property
+    def _column_cuts(self) -> list[np.ndarray]:
+        start = self.cut_start.tolist()
+        return [self.cuts[a:b] for a, b in zip(start[:-1], start[1:])]
+
+    def bucketize(self, X: np.ndarray) -> np.ndarray:
+        """Per column, the number of that column's split values below each input."""
+        B = np.empty(X.shape, dtype=self.code.dtype)
+        for j, cuts in enumerate(self._column_cuts):
+            B[:, j] = np.searchsorted(cuts, X[:, j], side="left")
+        return B
+
+    def iter_tree_values(self, X: np.ndarray) -> Iterator[tuple[int, np.ndarray]]:
+        B = self.bucketize(X)
+        n, n_cols = B.shape
+        row_base = np.arange(min(n, BLOCK_ROWS), dtype=np.intp)[:, None] * n_cols
+        for start in range(0, n, BLOCK_ROWS):
+            block = np.ascontiguousarray(B[start:start + BLOCK_ROWS]).ravel()
+            k = len(block) // n_cols
+            base = row_base[:k]
+            node = np.broadcast_to(self._roots, (k, self.n_trees))
+            for _ in range(self.max_depth):
+                b = np.take(block, base + np.take(self.feature, node))
+                go_right = b > np.take(self.code, node)
+                node = np.take(self.child, 2 * node + go_right) + self._roots
+            yield start, np.take(self.value, node).T
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        arrays = {
+            "feature": self.feature,
+            "code": self.code,
+            "cuts": self.cuts,
+            "cut_start": self.cut_start,
+            "child": self.child,
+            "value": self.value,
+            "roots": self.roots,
+        }
+        if self.cover is not None:
+            arrays["cover"] = self.cover
+        return arrays
+
+    @classmethod
+    def from_parts(cls, schema: Mapping[str, Any], arrays: Mapping[str, np.ndarray]) -> "QuantizedForest":
+        columns = [Column(c["source"], c["kind"], c.get("category")) for c in schema["columns"]]
+        return cls(
+            columns,
+            arrays["feature"], arrays["code"], arrays["cuts"], arrays["cut_start"],
+            arrays["child"], arrays["value"], arrays["roots"],
+            int(schema["max_depth"]), {k: tuple(v) for k, v in schema.get("dropped", {}).items()},
+            arrays.get("cover"),
+        )
+
+
+def quantize(forest: CompiledForest) -> QuantizedForest:
+    """Reduced-precision copy of ``forest`` that reaches the same leaves for every input."""
+    if isinstance(forest, QuantizedForest):
+        return forest
+    n_nodes, n_cols = len(forest.value), len(forest.columns)
+    left = forest.left.astype(np.intp)
+    feature = forest.feature.astype(np.intp)
+    split = left != np.arange(n_nodes)
+    cuts = [np.unique(forest.threshold[split & (feature == j)]) for j in range(n_cols)]
+    code = np.zeros(n_nodes, dtype=_index_dtype(max(len(c) for c in cuts)))
+    for j, column_cuts in enumerate(cuts):
+        sel = split & (feature == j)
+        code[sel] = np.searchsorted(column_cuts, forest.threshold[sel])
+
+    roots = forest.roots.astype(np.intp)
+    sizes = np.diff(np.append(roots, n_nodes))
+    child = forest.child.astype(np.intp) - np.repeat(np.repeat(roots, sizes), 2)
+    cut_start = np.concatenate([[0], np.cumsum([len(c) for c in cuts])])
+    return QuantizedForest(
+        forest.columns,
+        feature=forest.feature,
+        code=code,
+        cuts=np.concatenate(cuts).astype(np.float64),
+        cut_start=cut_start.astype(_index_dtype(int(cut_start[-1]))),
+        child=child.astype(_index_dtype(int(sizes.max()) - 1)),
+        value=forest.value.astype(np.float32),
+        roots=forest.roots,
+        max_depth=forest.max_depth,
+        dropped=forest.dropped,
+        cover=forest.cover,
+    )
+
+
+def accuracy(
+    forest: CompiledForest, quantized: QuantizedForest, data: Mapping[str, Any], target: Any,
+) -> dict[str, float]:
+    """``r2_score`` of both forests on ``data`` and how far their predictions differ."""
+    from sklearn.metrics import r2_score
+
+    X = forest.encode(data)
+    full, reduced = forest.predict_encoded(X), quantized.predict_encoded(X)
+    r2, r2_quantized = r2_score(target, full), r2_score(target, reduced)
+    return {
+        "rows": len(full),
+        "r2": float(r2),
+        "r2_quantized": float(r2_quantized),
+        "r2_delta": float(r2_quantized - r2),
+        "max_abs_diff": float(np.abs(reduced - full).max()),
+        "max_rel_diff": float((np.abs(reduced - full) / np.maximum(np.abs(full), 1e-9)).max()),
+    }
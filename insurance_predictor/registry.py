@@ -0,0 +1,183 @@
+"""Process-wide cache of loaded model artifacts.
+
+Streamlit re-executes ``main.py`` on every interaction and for every new
+browser session, but imported modules survive, so keeping the loaded
+pipelines here means each artifact is unpickled once per process.  Entries
+are keyed on the resolved path and invalidated when the file's mtime or size
+changes, so a retrained pickle dropped in place is picked up on the next
+request without restarting the server.
+"""
+
+from __future__ import annotations
+
+import logging
+import mmap
+import os
+import shutil
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+from . import DEFAULT_MODEL_PATH
+from .telemetry import telemetry
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    path: str
+    mtime_ns: int
+    size: int
+
+    @classmethod
+    def of(cls, path: str | os.PathLike) -> "Fingerprint":
+        resolved = str(Path(path).resolve())
+        st = os.stat(resolved)
+        return cls(resolved, st.st_mtime_ns, st.st_size)
+
+
+@dataclass(frozen=True)
+class LoadInfo:
+    fingerprint: Fingerprint
+    load_seconds: float
+    memory_bytes: int
+    loaded_at: float
+
+
+def load_artifact(path: str) -> Any:
+    """Load a pickle-free ``.icpf`` artifact, or a joblib pickle otherwise."""
+    from .artifact import SUFFIX, load
+
+    if path.endswith(SUFFIX):
+        return load(path)
+    import joblib
+
+    return joblib.load(path)
+
+
+def estimate_nbytes(obj: Any) -> int:
+    """Approximate resident size of a fitted estimator.
+
+    Walks attributes, containers and numpy buffers; sklearn ``Tree`` objects
+    are measured through their pickled state, which holds the node arrays.
+    Views are charged to the buffer they share, so each buffer (or memory
+    map) is counted once.
+    """
+    # Holds a reference to everything visited so that ids of temporary
+    # ``__getstate__`` dicts are not recycled mid-walk.
+    seen: dict[int, Any] = {}
+    stack = [obj]
+    total = 0
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen[id(o)] = o
+        if isinstance(o, mmap.mmap):
+            total += len(o)
+            continue
+        if isinstance(o, memoryview):
+            stack.append(o.obj)
+            continue
+        base = getattr(o, "base", None)
+        if hasattr(o, "dtype") and (hasattr(base, "dtype") or isinstance(base, (memoryview, mmap.mmap))):
+            total += sys.getsizeof(o)
+            stack.append(base)
+            continue
+        nbytes = getattr(o, "nbytes", None)
+        if isinstance(nbytes, int) and hasattr(o, "dtype"):
+            total += nbytes
+            if o.dtype.hasobject:
+                stack.extend(o.ravel().tolist())
+            continue
+        total += sys.getsizeof(o)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        elif type(o).__name__ == "Tree" and hasattr(o, "__getstate__"):
+            stack.append(o.__getstate__())
+        elif hasattr(o, "__dict__"):
+            stack.append(vars(o))
+    return total
+
+
+class ModelRegistry:
+    """Thread-safe, fingerprint-keyed cache of loaded artifacts."""
+
+    def __init__(self, loader: Callable[[str], Any] = load_artifact):
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._path_locks: dict[str, threading.Lock] = {}
+        self._entries: dict[str, tuple[Any, LoadInfo]] = {}
+
+    def _path_lock(self, path: str) -> threading.Lock:
+        with self._lock:
+            return self._path_locks.setdefault(path, threading.Lock())
+
+    def get(self, path: str | os.PathLike = DEFAULT_MODEL_PATH) -> Any:
+        return self.get_with_info(path)[0]
+
+    def get_with_info(self, path: str | os.PathLike = DEFAULT_MODEL_PATH) -> tuple[Any, LoadInfo]:
+        fp = Fingerprint.of(path)
+        entry = self._entries.get(fp.path)
+        if entry is not None and entry[1].fingerprint == fp:
+            return entry
+        # Only one thread loads a given path; the others wait and reuse it.
+        with self._path_lock(fp.path):
+            entry = self._entries.get(fp.path)
+            if entry is not None and entry[1].fingerprint == fp:
+                return entry
+            t0 = time.perf_counter()
+            obj = self._loader(fp.path)
+            elapsed = time.perf_counter() - t0
+            telemetry.observe("load", elapsed)
+            info = LoadInfo(fp, elapsed, estimate_nbytes(obj), time.time())
+            log.info(
+                "loaded %s in %.1f ms (~%.1f MB in memory)",
+                fp.path, elapsed * 1e3, info.memory_bytes / 1e6,
+            )
+            entry = (obj, info)
+            self._entries[fp.path] = entry
+            return entry
+
+    def info(self, path: str | os.PathLike = DEFAULT_MODEL_PATH) -> LoadInfo | None:
+        entry = self._entries.get(str(Path(path).resolve()))
+        return entry[1] if entry else None
+
+    def loaded(self) -> list[LoadInfo]:
+        return [info for _, info in self._entries.values()]
+
+    def evict(self, path: str | os.PathLike) -> None:
+        self._entries.pop(str(Path(path).resolve()), None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+registry = ModelRegistry()
+
+
+def publish(model_path: str | os.PathLike, target: str | os.PathLike) -> None:
+    """Atomically replace ``target``; the serving registry reloads on mtime.
+
+    The drift baseline is copied along: it is keyed on the pickle's hash,
+    which the copy shares.
+    """
+    from .drift import baseline_path_for
+
+    for src, dst in ((baseline_path_for(model_path), baseline_path_for(target)), (Path(model_path), Path(target))):
+        if not src.exists():
+            continue
+        tmp = dst.with_name(dst.name + ".tmp")
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+
+
+def get_model(path: str | os.PathLike = DEFAULT_MODEL_PATH) -> Any:
+    return registry.get(path)
@@ -0,0 +1,118 @@
+"""Slim scoring runtime for exported ``.icpf`` models: NumPy only.
+
+    python -m insurance_predictor.artifact export insurance_expense_predictor.pkl
+    echo '{"age": 30, "sex": "male", "bmi": 27.5, "children": 1, "smoker": "no", "region": "southwest"}' \\
+        | python -m insurance_predictor.runtime insurance_expense_predictor.icpf
+
+A worker started from the joblib pickle spends most of its first second
+importing pandas and scikit-learn and unpickling the object graph.  This
+runtime memory-maps the pickle-free artifact instead and imports nothing
+beyond NumPy and the few modules prediction needs (``compiled``,
+``encoder``, ``artifact``, ``inference``); it checks that on start-up.  The
+first quote is answered by the compiled forest.
+
+If the artifact's source pickle has a lookup table (``tabulated.py``),
+the table is loaded on a background thread after start-up (decompressing
+it takes longer than the first few quotes) and used once it is ready.  The
+table is matched on the source pickle's sha256 recorded in the artifact
+header (see ``tabulated.source_sha256``), so nothing is hashed at start-up.
+
+The CLI reads one JSON profile per line on stdin and writes one JSON line
+per profile to stdout (``{"cost": ...}`` or ``{"error": ...}``), flushing
+after each, so it can sit behind a pipe or a process pool.  ``--timing``
+reports start-up time on stderr; ``benchmarks/bench_startup.py`` measures
+it against the pickle-based paths.
+"""
+
+from __future__ import annotations
+
+import time
+
+# Before the imports below, so --timing includes NumPy and our modules.
+_T0 = time.perf_counter()
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import sys  # noqa: E402
+import threading  # noqa: E402
+from pathlib import Path  # noqa: E402
+
+from .artifact import load_with_header  # noqa: E402
+from .inference import Predictor  # noqa: E402
+
+# Must not be imported by the scoring path.
+HEAVY_MODULES = ("pandas", "sklearn", "scipy", "joblib")
+
+
+def _attach_table(predictor: Predictor, path: Path, source_sha256: str) -> None:
+    from .tabulated import TabulatedModel
+
+    try:
+        table = TabulatedModel.load(path)
+    except (OSError, ValueError, KeyError):
+        return
+    if table.source_sha256 == source_sha256:
+        predictor.table = table
+
+
+def load_runtime(path: str | Path, table: str = "background") -> Predictor:
+    """A ``Predictor`` over the artifact at ``path``.
+
+    ``table`` is ``"background"`` (attach the source pickle's lookup table
+    once it has loaded), ``"sync"`` (load it before returning) or ``"none"``.
+    """
+    from .tabulated import TABLE_SUFFIX
+
+    path = Path(path)
+    forest, header = load_with_header(path)
+    predictor = Predictor(forest)
+    source = header.get("source_artifact") or {}
+    candidates = [path.with_name(path.stem + TABLE_SUFFIX)]
+    if source.get("name"):
+        candidates.append(path.with_name(Path(source["name"]).stem + TABLE_SUFFIX))
+    table_path = next((c for c in candidates if c.exists()), None)
+    if table != "none" and table_path is not None and source.get("sha256"):
+        if table == "sync":
+            _attach_table(predictor, table_path, source["sha256"])
+        else:
+            threading.Thread(
+                target=_attach_table, args=(predictor, table_path, source["sha256"]), daemon=True,
+            ).start()
+    return predictor
+
+
+def heavy_imports() -> list[str]:
+    return [m for m in HEAVY_MODULES if m in sys.modules]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="NumPy-only quote runtime for .icpf artifacts (JSON lines)")
+    parser.add_argument("artifact", help="model exported with `python -m insurance_predictor.artifact export`")
+    parser.add_argument("--table", choices=("background", "sync", "none"), default="background",
+                        help="when to load the source pickle's lookup table (default: background)")
+    parser.add_argument("--timing", action="store_true", help="report start-up and first-quote time on stderr")
+    args = parser.parse_args(argv)
+
+    predictor = load_runtime(args.artifact, args.table)
+    t_ready = time.perf_counter()
+    first = True
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            out = {"cost": predictor.predict_one(json.loads(line))}
+        except (ValueError, TypeError, AttributeError) as exc:
+            out = {"error": str(exc)}
+        sys.stdout.write(json.dumps(out) + "\n")
+        sys.stdout.flush()
+        if first and args.timing:
+            first = False
+            heavy = heavy_imports()
+            print(f"ready in {(t_ready - _T0) * 1e3:.1f} ms, first quote after "
+                  f"{(time.perf_counter() - _T0) * 1e3:.1f} ms"
+                  + (f"; imported {', '.join(heavy)}" if heavy else ""), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,491 @@
+"""Standalone asyncio HTTP/JSON prediction service with micro-batching.
+
+    python -m insurance_predictor.server --port 8000
+    curl -s localhost:8000/predict -d '{"age": 30, "sex": "male", "bmi": 27.5,
+                                         "children": 1, "smoker": "no", "region": "southwest"}'
+
+Endpoints:
+
+* ``POST /predict`` - one profile in, ``{"cost": ...}`` out;
+* ``POST /sweep`` - ``{"base": profile, "axes": [...]}`` in, a cost curve or
+  surface out (see ``sweep.py``);
+* ``GET /metrics`` - queue depth, batch-size histogram and request counters,
+  plus per-stage timings when telemetry is on (see ``telemetry.py``);
+* ``GET /metrics/prometheus`` - the same in the Prometheus text format;
+* ``POST /telemetry`` - ``{"enabled": true|false}`` switches instrumentation
+  on or off without a restart;
+* ``GET /drift`` - input and prediction drift against the model's training
+  baseline, for the current window and since start-up (see ``drift.py``);
+* ``GET /healthz`` - liveness and the default model's artifact;
+* ``GET /models`` - every routed model: its artifact, content hash, the IDs
+  it is deduplicated with and its memory (see ``serving.py``);
+* ``GET /shadow`` - live-vs-candidate comparison while a candidate is
+  shadowed (see ``shadow.py``); ``POST /shadow`` with
+  ``{"action": "promote"|"rollback"}`` decides by hand;
+* ``POST /models/<id>/predict``, ``POST /models/<id>/sweep``,
+  ``GET /models/<id>/drift`` and ``/models/<id>/shadow`` - the routes above
+  for one model; the unprefixed routes serve the default model.
+
+``--models models.json`` hosts every model in a manifest, with a memory
+budget; ``-m`` serves a single artifact.  ``--workers N`` forks N server
+processes sharing the port (``SO_REUSEPORT``), after compiling every model
+into the shared cache, so that all of them memory-map the same tree arrays.
+``--candidate new.pkl --shadow-fraction 0.1`` mirrors a tenth of the
+default model's (or ``--shadow-model``'s) traffic to a candidate off the
+response path, and promotes or rolls it back without a restart.
+
+Concurrent requests are not scored one by one.  Each validated row is put
+on a queue; a single batcher task takes the first waiting row, keeps
+collecting until ``max_batch`` rows or ``max_wait`` seconds have passed,
+and scores the whole batch with one vectorized ``Predictor.predict`` call
+per model on a worker thread, so the event loop keeps accepting requests
+meanwhile.  Uses only the standard library and runs entirely locally.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextvars
+import json
+import logging
+import multiprocessing as mp
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any
+
+import numpy as np
+
+from . import DEFAULT_MODEL_PATH
+from .drift import log as drift_log, monitor_for
+from .inference import FEATURES, normalize_profile
+from .serving import DEFAULT_CACHE_DIR, ModelPool, single
+from .shadow import Policy, ShadowDeployment, log as shadow_log, shadow_for
+from .sweep import sweep
+from .telemetry import Histogram, Sample, log_json_to, telemetry
+
+log = logging.getLogger(__name__)
+
+MAX_BODY = 64 * 1024
+# Upper bounds of the batch-size histogram; larger batches count in +Inf.
+BATCH_SIZE_BUCKETS = tuple(float(1 << k) for k in range(13))
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+@dataclass
+class BatchStats:
+    requests: int = 0
+    errors: int = 0
+    batches: int = 0
+    rows: int = 0
+    max_queue_depth: int = 0
+    batch_sizes: Histogram = field(default_factory=lambda: Histogram(BATCH_SIZE_BUCKETS))
+
+    def observe_batch(self, size: int) -> None:
+        self.batches += 1
+        self.rows += size
+        self.batch_sizes.observe(size)
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-row predictions into vectorized batches.
+
+    Rows for different models can share a batch; they are scored in one
+    call per model.
+    """
+
+    def __init__(self, models: ModelPool, max_batch: int = 64, max_wait: float = 0.002):
+        self.models = models
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.stats = BatchStats()
+        # Candidates shadowing a model, by model ID (see ``shadow.py``).
+        self.shadows: dict[str, ShadowDeployment] = {}
+        self._queue: asyncio.Queue[tuple[str, dict[str, Any], asyncio.Future]] | None = None
+        self._task: asyncio.Task | None = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="predict")
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=False)
+
+    async def predict(self, row: dict[str, Any], model_id: str | None = None) -> float:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((self.models.resolve(model_id), row, future))
+        self.stats.max_queue_depth = max(self.stats.max_queue_depth, self._queue.qsize())
+        return await future
+
+    async def _collect(self) -> list[tuple[str, dict[str, Any], asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _score(self, model_id: str, rows: list[dict[str, Any]]) -> list[float | Exception]:
+        predictor = self.models.predictor(model_id)
+        columns = {f: np.array([r[f] for r in rows]) for f in FEATURES}
+        try:
+            costs = predictor.predict(columns)
+        except ValueError:
+            # One bad row fails the vectorized call; score individually so
+            # only that request gets the error.
+            out: list[float | Exception] = []
+            for r in rows:
+                try:
+                    out.append(predictor.predict_one(r))
+                except ValueError as exc:
+                    out.append(exc)
+            # Rebuilt from the good rows alone: a bad value can change a column's dtype.
+            scored = [i for i, cost in enumerate(out) if not isinstance(cost, Exception)]
+            if scored:
+                self._observe(model_id, {f: np.array([rows[i][f] for i in scored]) for f in FEATURES},
+                              np.array([out[i] for i in scored]))
+            return out
+        self._observe(model_id, columns, costs)
+        return costs.tolist()
+
+    def _observe(self, model_id: str, columns: dict[str, np.ndarray], costs: np.ndarray) -> None:
+        """Feed scored rows to the drift monitor and the shadow candidate, if any."""
+        monitor = monitor_for(self.models.path(model_id))
+        if monitor is not None:
+            monitor.observe(columns, costs)
+        shadow = self.shadows.get(model_id)
+        if shadow is not None:
+            shadow.mirror(columns, costs)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            self.stats.observe_batch(len(batch))
+            by_model: dict[str, list[tuple[dict[str, Any], asyncio.Future]]] = {}
+            for model_id, row, future in batch:
+                by_model.setdefault(model_id, []).append((row, future))
+            for model_id, group in by_model.items():
+                try:
+                    results = await loop.run_in_executor(self._executor, self._score, model_id,
+                                                         [r for r, _ in group])
+                except Exception as exc:  # keep serving; fail this group's requests
+                    log.exception("batch prediction failed for model %s", model_id)
+                    results = [exc] * len(group)
+                for (_, future), result in zip(group, results):
+                    if future.done():
+                        continue
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+
+
+class PredictionServer:
+    def __init__(self, batcher: MicroBatcher):
+        self.batcher = batcher
+        self.started = time.time()
+        telemetry.add_collector(self._collect_metrics)
+
+    def close(self) -> None:
+        """Stop exporting this server's metrics."""
+        telemetry.remove_collector(self._collect_metrics)
+
+    def _collect_metrics(self) -> list[Sample]:
+        s = self.batcher.stats
+        return [
+            ("queue_depth", "Rows waiting to be batched.", "gauge", [({}, self.batcher.queue_depth)]),
+            ("batches_total", "Batches scored.", "counter", [({}, s.batches)]),
+            ("batch_rows_total", "Rows scored in batches.", "counter", [({}, s.rows)]),
+            ("batch_size", "Rows per scored batch.", "histogram", [({}, s.batch_sizes)]),
+        ]
+
+    def metrics(self) -> dict[str, Any]:
+        s = self.batcher.stats
+        return {
+            "queue_depth": self.batcher.queue_depth,
+            "max_queue_depth": s.max_queue_depth,
+            "requests": s.requests,
+            "errors": s.errors,
+            "batches": s.batches,
+            "rows": s.rows,
+            "mean_batch_size": s.rows / s.batches if s.batches else 0.0,
+            "batch_size_histogram": {f"le_{b:g}": n for b, n in
+                                     zip(s.batch_sizes.buckets + (float("inf"),), s.batch_sizes.counts) if n},
+            "uptime_s": time.time() - self.started,
+            "telemetry": telemetry.snapshot() if telemetry.enabled else {"enabled": False},
+        }
+
+    async def dispatch(self, method: str, path: str, body: bytes) -> tuple[int, Any]:
+        models = self.batcher.models
+        model_id = None
+        if path.startswith("/models/"):
+            model_id, _, rest = path[len("/models/"):].partition("/")
+            if model_id not in models.ids():
+                return 404, {"error": f"unknown model {model_id!r}", "models": models.ids()}
+            if rest not in ("predict", "sweep", "drift", "shadow"):
+                return 404, {"error": f"no route for {method} {path}"}
+            path = "/" + rest
+        if path == "/predict":
+            if method != "POST":
+                return 405, {"error": "use POST"}
+            with telemetry.request("predict"):
+                return await self._predict(body, model_id)
+        if path == "/sweep":
+            if method != "POST":
+                return 405, {"error": "use POST"}
+            with telemetry.request("sweep"):
+                try:
+                    request = json.loads(body or b"{}")
+                    run = partial(sweep, models.predictor(model_id),
+                                  request.get("base") or {}, request.get("axes") or [])
+                    # Carry the request context over so its stages are attributed to it.
+                    ctx = contextvars.copy_context()
+                    surface = await asyncio.get_running_loop().run_in_executor(None, ctx.run, run)
+                except (ValueError, TypeError, AttributeError) as exc:
+                    telemetry.error("sweep", str(exc))
+                    return 400, {"error": str(exc)}
+                return 200, surface.to_dict()
+        if path == "/metrics" and method == "GET":
+            return 200, self.metrics()
+        if path == "/metrics/prometheus" and method == "GET":
+            return 200, telemetry.prometheus_text()
+        if path == "/telemetry" and method == "POST":
+            try:
+                enabled = bool(json.loads(body or b"{}")["enabled"])
+            except (ValueError, TypeError, KeyError) as exc:
+                return 400, {"error": f"expected {{\"enabled\": true|false}}: {exc}"}
+            telemetry.enable() if enabled else telemetry.disable()
+            return 200, {"enabled": telemetry.enabled}
+        if path == "/drift" and method == "GET":
+            monitor = monitor_for(models.path(model_id))
+            if monitor is None:
+                return 404, {"error": f"no drift baseline for {models.path(model_id)}"}
+            return 200, {"window": monitor.report(), "cumulative": monitor.report(cumulative=True)}
+        if path == "/shadow":
+            shadow = self.batcher.shadows.get(models.resolve(model_id))
+            if shadow is None:
+                return 404, {"error": f"no candidate is shadowing {models.resolve(model_id)}"}
+            if method == "GET":
+                return 200, shadow.report()
+            try:
+                action = json.loads(body or b"{}")["action"]
+            except (ValueError, TypeError, KeyError) as exc:
+                return 400, {"error": f"expected {{\"action\": \"promote\"|\"rollback\"}}: {exc}"}
+            if action not in ("promote", "rollback"):
+                return 400, {"error": f"unknown action {action!r}"}
+            # Promotion copies files; keep it off the event loop.
+            await asyncio.get_running_loop().run_in_executor(
+                None, shadow.promote if action == "promote" else shadow.rollback)
+            return 200, shadow.report()
+        if path == "/models" and method == "GET":
+            return 200, {**models.summary(), "default": models.default, "routes": models.status()}
+        if path == "/healthz" and method == "GET":
+            return 200, {"status": "ok", "model": models.path(), "models": len(models.ids())}
+        return 404, {"error": f"no route for {method} {path}"}
+
+    async def _predict(self, body: bytes, model_id: str | None = None) -> tuple[int, Any]:
+        self.batcher.stats.requests += 1
+        try:
+            row = normalize_profile(json.loads(body or b"{}"))
+        except (ValueError, TypeError, AttributeError) as exc:
+            return self._bad_request(exc)
+        try:
+            cost = await self.batcher.predict(row, model_id)
+        except ValueError as exc:
+            return self._bad_request(exc)
+        return 200, {"cost": cost}
+
+    def _bad_request(self, exc: Exception) -> tuple[int, Any]:
+        self.batcher.stats.errors += 1
+        telemetry.error("predict", str(exc))
+        return 400, {"error": str(exc)}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 413, {"error": "headers too large"}, keep_alive=False)
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "bad request line"}, keep_alive=False)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        k, v = line.split(":", 1)
+                        headers[k.strip().lower()] = v.strip()
+                try:
+                    length = int(headers.get("content-length", "0") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {"error": "bad content-length"}, keep_alive=False)
+                    break
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {"error": "body too large"}, keep_alive=False)
+                    break
+                try:
+                    body = await reader.readexactly(length) if length else b""
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                try:
+                    status, payload = await self.dispatch(method, target.split("?", 1)[0], body)
+                except Exception:
+                    log.exception("request failed")
+                    status, payload = 500, {"error": "internal error"}
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool) -> None:
+        # Strings go out as-is (the Prometheus exposition); everything else as JSON.
+        if isinstance(payload, str):
+            body, content_type = payload.encode(), "text/plain; version=0.0.4"
+        else:
+            body, content_type = json.dumps(payload).encode(), "application/json"
+        head = (
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode() + body)
+        await writer.drain()
+
+
+async def serve(host: str, port: int, batcher: MicroBatcher, reuse_port: bool = False) -> None:
+    batcher.models.predictor()  # load the default model before accepting traffic
+    batcher.start()
+    app = PredictionServer(batcher)
+    server = await asyncio.start_server(app.handle, host, port, reuse_port=reuse_port or None)
+    log.info("serving %d model(s) on http://%s:%d (default: %s)",
+             len(batcher.models.ids()), host, port, batcher.models.default)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        app.close()
+        await batcher.stop()
+
+
+def _run_worker(
+    host: str, port: int, models: ModelPool, max_batch: int, max_wait: float, reuse_port: bool,
+    shadow: tuple[str, ShadowDeployment] | None = None,
+) -> None:
+    batcher = MicroBatcher(models, max_batch=max_batch, max_wait=max_wait)
+    if shadow is not None:
+        batcher.shadows[shadow[0]] = shadow[1]
+    try:
+        asyncio.run(serve(host, port, batcher, reuse_port))
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="micro-batching HTTP prediction service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("-m", "--model", default=str(DEFAULT_MODEL_PATH), help="fitted pipeline (.pkl) or .icpf")
+    parser.add_argument("--models", metavar="MANIFEST",
+                        help="serve every model in a manifest (see serving.py) instead of --model")
+    parser.add_argument("--memory-budget-mb", type=float,
+                        help="unload least recently used models beyond this (default: the manifest's, or none)")
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR),
+                        help="shared compiled-model cache (default: .model-cache)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="server processes sharing the port via SO_REUSEPORT (default: 1)")
+    parser.add_argument("--candidate", help="shadow this candidate artifact against the live model")
+    parser.add_argument("--shadow-model", help="model ID the candidate would replace (default: the default model)")
+    parser.add_argument("--shadow-fraction", type=float, default=0.1,
+                        help="share of requests mirrored to the candidate (default: 0.1)")
+    parser.add_argument("--shadow-min-samples", type=int, default=Policy.min_samples,
+                        help=f"mirrored rows before deciding (default: {Policy.min_samples})")
+    parser.add_argument("--shadow-manual", action="store_true",
+                        help="only report; promote or roll back with POST /shadow")
+    parser.add_argument("--max-batch", type=int, default=64, help="rows per batch (default: 64)")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="batching window (default: 2 ms)")
+    parser.add_argument("--telemetry", action="store_true",
+                        help="start with per-stage timing and JSON request logs on (see POST /telemetry)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    log_json_to(sys.stderr)
+    log_json_to(sys.stderr, drift_log)
+    log_json_to(sys.stderr, shadow_log)
+    if args.telemetry:
+        telemetry.enable()
+    options: dict[str, Any] = {"cache_dir": args.cache_dir}
+    if args.memory_budget_mb:
+        options["memory_budget_bytes"] = int(args.memory_budget_mb * 1e6)
+    models = ModelPool.from_manifest(args.models, **options) if args.models else single(args.model, **options)
+    max_wait = args.max_wait_ms / 1e3
+    shadow = None
+    if args.candidate:
+        # Started before forking, so every worker mirrors into one evaluator
+        # and there is a single promote-or-roll-back decision.
+        model_id = models.resolve(args.shadow_model)
+        shadow = (model_id, shadow_for(
+            models.path(model_id), args.candidate, fraction=args.shadow_fraction,
+            policy=Policy(min_samples=args.shadow_min_samples), auto=not args.shadow_manual,
+        ))
+    if args.workers <= 1:
+        _run_worker(args.host, args.port, models, args.max_batch, max_wait, reuse_port=False, shadow=shadow)
+        return 0
+    if "fork" not in mp.get_all_start_methods():
+        parser.error("--workers needs a platform with fork")
+    # Compile everything once here, so each worker only maps the cache.
+    models.prepare()
+    ctx = mp.get_context("fork")
+    workers = [ctx.Process(target=_run_worker,
+                           args=(args.host, args.port, models, args.max_batch, max_wait, True, shadow))
+               for _ in range(args.workers)]
+    for w in workers:
+        w.start()
+    try:
+        for w in workers:
+            w.join()
+    except KeyboardInterrupt:
+        for w in workers:
+            w.join()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
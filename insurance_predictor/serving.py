@@ -0,0 +1,487 @@
+"""Many pricing models served side by side from one process.
+
+Models are registered under an ID (one per product line and region, say)
+and routed to by that ID; a manifest lists them::
+
+    {
+      "default": "insurance_expense_predictor",
+      "memory_budget_mb": 256,
+      "models": {
+        "insurance_expense_predictor": "insurance_expense_predictor.pkl",
+        "insurance_model": "insurance_model.pkl"
+      }
+    }
+
+Relative paths are resolved against the manifest's directory.  Models are
+loaded on first use, and three things keep a box with dozens of them from
+multiplying RAM:
+
+* Deduplication.  Loaded models are keyed on the content hash of their
+  artifact (``tabulated.source_sha256``, so a pickle and its ``.icpf``
+  export count as the same model), and every ID whose file hashes the same
+  is served by one ``Predictor``.
+* Shared tree arrays.  A forest pickle is compiled once and written to the
+  shared cache directory as ``<sha256>.icpf``; every process then
+  memory-maps that file, so the node arrays live once in the page cache
+  however many workers serve them, and a worker that needs a model another
+  one already compiled maps it in milliseconds instead of unpickling it.
+  ``.icpf`` artifacts are mapped in place.  Pipelines that cannot be
+  compiled are unpickled privately, as ``get_predictor`` would.
+* An LRU memory budget.  After each load, least recently used models are
+  unloaded until the resident total fits ``memory_budget_bytes``; they are
+  loaded again on their next request.  Mapped arrays count towards the
+  budget even though they are shared between processes.
+
+Files are re-checked on every lookup, as in the registry, so an artifact
+replaced in place is re-hashed and reloaded on its next request.
+
+    python -m insurance_predictor.serving prepare models.json   # compile into the shared cache
+    python -m insurance_predictor.serving status models.json    # load everything, report memory
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import mmap
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Mapping
+
+import numpy as np
+
+from . import DEFAULT_MODEL_PATH, ROOT
+from .artifact import SUFFIX, load as load_forest, save as save_forest
+from .compiled import CompiledForest, compile_pipeline
+from .inference import Predictor
+from .registry import Fingerprint, estimate_nbytes, load_artifact
+from .telemetry import Sample, telemetry
+
+if TYPE_CHECKING:
+    from .tabulated import TabulatedModel
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = ROOT / ".model-cache"
+MANIFEST_PATH = ROOT / "models.json"
+# Lookup-table cells (see ``tabulated.py``), stored raw so they can be mapped.
+TABLE_SUFFIX = ".table.npy"
+
+
+@dataclass
+class Route:
+    """A model ID and the artifact it currently resolves to."""
+
+    model_id: str
+    path: str
+    fingerprint: Fingerprint | None = None
+    digest: str | None = None
+    requests: int = 0
+
+
+@dataclass
+class Resident:
+    """A loaded model, shared by every route whose artifact hashes to ``digest``."""
+
+    digest: str
+    predictor: Predictor
+    source: str
+    memory_bytes: int
+    mapped_bytes: int
+    load_seconds: float
+    loaded_at: float
+    last_used: float
+
+
+def _mapped_nbytes(predictor: Predictor) -> int:
+    """Bytes of the memory maps behind the predictor's forest and table arrays."""
+    arrays = list(predictor.compiled.to_arrays().values()) if predictor.compiled is not None else []
+    if predictor.table is not None:
+        arrays.append(predictor.table.table)
+    maps = {}
+    for base in arrays:
+        while isinstance(base, np.ndarray) and base.base is not None:
+            base = base.base
+        if isinstance(base, memoryview):
+            base = base.obj
+        if isinstance(base, mmap.mmap):
+            maps[id(base)] = len(base)
+    return sum(maps.values())
+
+
+def load_manifest(path: str | os.PathLike) -> dict[str, Any]:
+    """Read a manifest, resolving model paths against its directory."""
+    path = Path(path)
+    manifest = json.loads(path.read_text())
+    models = manifest.get("models")
+    if not isinstance(models, dict) or not models:
+        raise ValueError(f"{path}: expected a non-empty \"models\" object")
+    manifest["models"] = {str(k): str((path.parent / v).resolve()) for k, v in models.items()}
+    if manifest.get("default") is not None and manifest["default"] not in manifest["models"]:
+        raise ValueError(f"{path}: default model {manifest['default']!r} is not in \"models\"")
+    return manifest
+
+
+class ModelPool:
+    """Thread-safe set of routed models with content dedup and LRU unloading."""
+
+    def __init__(
+        self,
+        models: Mapping[str, str | os.PathLike] | None = None,
+        default: str | None = None,
+        memory_budget_bytes: int | None = None,
+        cache_dir: str | os.PathLike | None = DEFAULT_CACHE_DIR,
+    ):
+        if memory_budget_bytes is not None and memory_budget_bytes <= 0:
+            raise ValueError("memory_budget_bytes must be positive")
+        self.memory_budget_bytes = memory_budget_bytes
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self._lock = threading.Lock()
+        self._route_locks: dict[str, threading.Lock] = {}
+        self._load_locks: dict[str, threading.Lock] = {}
+        self._routes: dict[str, Route] = {}
+        self._resident: OrderedDict[str, Resident] = OrderedDict()
+        self.default: str | None = None
+        self.loads = self.evictions = self.shared_hits = 0
+        for model_id, path in (models or {}).items():
+            self.add(model_id, path)
+        if default is not None:
+            self.resolve(default)
+            self.default = default
+        _pools.add(self)
+
+    @classmethod
+    def from_manifest(cls, path: str | os.PathLike, **kwargs: Any) -> "ModelPool":
+        """Pool for a manifest; keyword arguments override its settings."""
+        manifest = load_manifest(path)
+        budget_mb = manifest.get("memory_budget_mb")
+        kwargs.setdefault("memory_budget_bytes", int(budget_mb * 1e6) if budget_mb else None)
+        return cls(manifest["models"], manifest.get("default"), **kwargs)
+
+    def add(self, model_id: str, path: str | os.PathLike) -> None:
+        """Route ``model_id`` to ``path``; the first model added is the default."""
+        with self._lock:
+            self._routes[model_id] = Route(model_id, str(Path(path).resolve()))
+            if self.default is None:
+                self.default = model_id
+
+    def remove(self, model_id: str) -> None:
+        with self._lock:
+            route = self._routes.pop(model_id, None)
+            if route is None:
+                return
+            if self.default == model_id:
+                self.default = next(iter(self._routes), None)
+            if route.digest and not any(r.digest == route.digest for r in self._routes.values()):
+                self._resident.pop(route.digest, None)
+
+    def ids(self) -> list[str]:
+        return list(self._routes)
+
+    def resolve(self, model_id: str | None = None) -> str:
+        """The routed ID for ``model_id`` (the default for ``None``); ``KeyError`` if unknown."""
+        model_id = self.default if model_id is None else model_id
+        if model_id not in self._routes:
+            raise KeyError(model_id)
+        return model_id
+
+    def path(self, model_id: str | None = None) -> str:
+        return self._routes[self.resolve(model_id)].path
+
+    def _refresh(self, route: Route) -> str:
+        # Hashing is only redone when the file's mtime or size changes.
+        fp = Fingerprint.of(route.path)
+        if route.fingerprint == fp and route.digest is not None:
+            return route.digest
+        from .tabulated import source_sha256
+
+        with self._lock:
+            lock = self._route_locks.setdefault(route.model_id, threading.Lock())
+        with lock:
+            if route.fingerprint != fp or route.digest is None:
+                route.digest = source_sha256(route.path)
+                route.fingerprint = fp
+        return route.digest
+
+    def predictor(self, model_id: str | None = None) -> Predictor:
+        """The ``Predictor`` serving ``model_id``, loading it if needed."""
+        route = self._routes[self.resolve(model_id)]
+        digest = self._refresh(route)
+        route.requests += 1
+        with self._lock:
+            resident = self._resident.get(digest)
+            if resident is not None:
+                self._resident.move_to_end(digest)
+                resident.last_used = time.time()
+                return resident.predictor
+            lock = self._load_locks.setdefault(digest, threading.Lock())
+        # Only one thread loads a given artifact; the others wait and reuse it.
+        with lock:
+            with self._lock:
+                resident = self._resident.get(digest)
+            if resident is None:
+                resident = self._load(route, digest)
+                with self._lock:
+                    self._resident[digest] = resident
+                    self.loads += 1
+                    self._enforce_budget(keep=digest)
+        return resident.predictor
+
+    def _shared_path(self, digest: str) -> Path:
+        return self.cache_dir / f"{digest}{SUFFIX}"
+
+    def _export_shared(self, route: Route, digest: str, pipeline: Any) -> Path | None:
+        """Compile ``pipeline`` into the shared cache; ``None`` if it is not a forest."""
+        import sklearn
+
+        from .inference import FEATURES
+
+        try:
+            forest = compile_pipeline(pipeline)
+        except NotImplementedError:
+            return None
+        shared = self._shared_path(digest)
+        shared.parent.mkdir(parents=True, exist_ok=True)
+        # Several workers may export the same model at once: each writes its
+        # own file and the last rename wins (the contents are identical).
+        tmp = shared.with_name(f"{shared.name}.{os.getpid()}-{threading.get_ident()}")
+        metadata = {
+            "features": FEATURES,
+            "sklearn_version": sklearn.__version__,
+            "source_artifact": {"name": Path(route.path).name, "sha256": digest},
+            "training_data": None,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        }
+        save_forest(forest, tmp, metadata)
+        os.replace(tmp, shared)
+        log.info("compiled %s into %s", route.path, shared)
+        return shared
+
+    def _open(self, route: Route, digest: str) -> tuple[Any, str]:
+        if route.path.endswith(SUFFIX):
+            return load_forest(route.path), route.path
+        if self.cache_dir is None:
+            return load_artifact(route.path), route.path
+        shared = self._shared_path(digest)
+        if shared.exists():
+            try:
+                forest = load_forest(shared)
+            except ValueError as exc:  # written by an incompatible version
+                log.warning("recompiling %s: %s", shared, exc)
+            else:
+                with self._lock:
+                    self.shared_hits += 1
+                return forest, str(shared)
+        pipeline = load_artifact(route.path)
+        shared = self._export_shared(route, digest, pipeline)
+        if shared is None:
+            return pipeline, route.path
+        return load_forest(shared), str(shared)
+
+    def _open_table(self, route: Route, digest: str) -> TabulatedModel | None:
+        from .tabulated import TabulatedModel, load_for as load_table_for, table_path_for
+
+        sidecar = table_path_for(route.path)
+        if self.cache_dir is None or not sidecar.exists():
+            return load_table_for(route.path)
+        shared = self.cache_dir / f"{digest}{TABLE_SUFFIX}"
+        if not shared.exists():
+            table = load_table_for(route.path)
+            if table is None:
+                return None
+            shared.parent.mkdir(parents=True, exist_ok=True)
+            tmp = shared.with_name(f"{shared.name}.{os.getpid()}-{threading.get_ident()}")
+            with open(tmp, "wb") as fh:
+                np.save(fh, np.ascontiguousarray(table.table))
+            os.replace(tmp, shared)
+        # Only the small axes are read from the sidecar; the cells are mapped.
+        table = TabulatedModel.load(sidecar, np.load(shared, mmap_mode="r"))
+        if table.source_sha256 != digest:
+            log.warning("ignoring %s: built from a different artifact", sidecar)
+            return None
+        return table
+
+    def _load(self, route: Route, digest: str) -> Resident:
+        t0 = time.perf_counter()
+        obj, source = self._open(route, digest)
+        predictor = Predictor(obj, self._open_table(route, digest), route.fingerprint)
+        elapsed = time.perf_counter() - t0
+        telemetry.observe("load", elapsed)
+        mapped = _mapped_nbytes(predictor)
+        resident = Resident(digest, predictor, source, estimate_nbytes(predictor), mapped,
+                            elapsed, time.time(), time.time())
+        log.info(
+            "loaded model %s from %s in %.1f ms (~%.1f MB, %.1f MB mapped)",
+            route.model_id, source, elapsed * 1e3, resident.memory_bytes / 1e6, mapped / 1e6,
+        )
+        return resident
+
+    def _enforce_budget(self, keep: str) -> None:
+        # Called with the lock held.  The model just loaded is never evicted,
+        # so a single model larger than the budget still serves.
+        if self.memory_budget_bytes is None:
+            return
+        while self.resident_bytes > self.memory_budget_bytes and len(self._resident) > 1:
+            digest = next(iter(self._resident))
+            if digest == keep:
+                self._resident.move_to_end(digest)
+                continue
+            evicted = self._resident.pop(digest)
+            self.evictions += 1
+            log.info("unloaded %s (~%.1f MB) to stay within the %.1f MB budget",
+                     evicted.source, evicted.memory_bytes / 1e6, self.memory_budget_bytes / 1e6)
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(r.memory_bytes for r in self._resident.values())
+
+    def unload(self, model_id: str) -> None:
+        """Drop the loaded copy behind ``model_id`` (and every ID sharing it)."""
+        digest = self._routes[self.resolve(model_id)].digest
+        with self._lock:
+            self._resident.pop(digest, None)
+
+    def prepare(self) -> None:
+        """Hash every model and write compiled forests and tables to the shared cache.
+
+        Run once before forking workers so that none of them has to unpickle.
+        """
+        if self.cache_dir is None:
+            return
+        for route in list(self._routes.values()):
+            digest = self._refresh(route)
+            if not route.path.endswith(SUFFIX) and not self._shared_path(digest).exists():
+                self._export_shared(route, digest, load_artifact(route.path))
+            self._open_table(route, digest)
+
+    def status(self) -> list[dict[str, Any]]:
+        with self._lock:
+            resident = dict(self._resident)
+            routes = list(self._routes.values())
+        sharing: dict[str, list[str]] = {}
+        for route in routes:
+            if route.digest:
+                sharing.setdefault(route.digest, []).append(route.model_id)
+        out = []
+        for route in routes:
+            r = resident.get(route.digest) if route.digest else None
+            out.append({
+                "id": route.model_id,
+                "path": route.path,
+                "default": route.model_id == self.default,
+                "sha256": route.digest,
+                "shared_with": [i for i in sharing.get(route.digest, []) if i != route.model_id],
+                "requests": route.requests,
+                "loaded": r is not None,
+                "source": r.source if r else None,
+                "memory_bytes": r.memory_bytes if r else 0,
+                "mapped_bytes": r.mapped_bytes if r else 0,
+                "load_ms": r.load_seconds * 1e3 if r else None,
+                "idle_s": time.time() - r.last_used if r else None,
+            })
+        return out
+
+    def summary(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "models": len(self._routes),
+                "loaded": len(self._resident),
+                "resident_bytes": self.resident_bytes,
+                "mapped_bytes": sum(r.mapped_bytes for r in self._resident.values()),
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "loads": self.loads,
+                "shared_cache_hits": self.shared_hits,
+                "evictions": self.evictions,
+            }
+
+
+_pools: weakref.WeakSet[ModelPool] = weakref.WeakSet()
+_manifest_pools: dict[str, tuple[int, ModelPool]] = {}
+
+
+def pool_for(manifest: str | os.PathLike = MANIFEST_PATH) -> ModelPool:
+    """Process-wide pool for ``manifest``, rebuilt when the file changes."""
+    path = str(Path(manifest).resolve())
+    mtime = os.stat(path).st_mtime_ns
+    cached = _manifest_pools.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    pool = ModelPool.from_manifest(path)
+    _manifest_pools[path] = (mtime, pool)
+    return pool
+
+
+def single(path: str | os.PathLike = DEFAULT_MODEL_PATH, **kwargs: Any) -> ModelPool:
+    """Pool serving one artifact, routed under its file stem."""
+    return ModelPool({Path(path).stem: path}, **kwargs)
+
+
+def _collect_metrics() -> list[Sample]:
+    pools = list(_pools)
+    if not pools:
+        return []
+    requests, loaded, memory = [], [], []
+    for pool in pools:
+        for s in pool.status():
+            labels = {"model": s["id"]}
+            requests.append((labels, s["requests"]))
+            loaded.append((labels, int(s["loaded"])))
+        summary = pool.summary()
+        memory.append(({"kind": "private"}, summary["resident_bytes"] - summary["mapped_bytes"]))
+        memory.append(({"kind": "mapped"}, summary["mapped_bytes"]))
+    return [
+        ("model_requests_total", "Predictor lookups per routed model.", "counter", requests),
+        ("model_loaded", "Whether the model is currently loaded.", "gauge", loaded),
+        ("model_pool_resident_bytes", "Estimated memory held by loaded models.", "gauge", memory),
+        ("model_pool_loads_total", "Models loaded.", "counter", [({}, sum(p.loads for p in pools))]),
+        ("model_pool_evictions_total", "Models unloaded to stay within the memory budget.", "counter",
+         [({}, sum(p.evictions for p in pools))]),
+    ]
+
+
+telemetry.add_collector(_collect_metrics)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="multi-model pool: shared cache and memory report")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_ in (("prepare", "compile every pickle into the shared cache"),
+                        ("status", "load every model and report dedup and memory")):
+        p = sub.add_parser(name, help=help_)
+        p.add_argument("manifest", nargs="?", default=str(MANIFEST_PATH))
+        p.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR),
+                       help="shared compiled-model cache (default: .model-cache)")
+    args = parser.parse_args(argv)
+
+    import warnings
+
+    warnings.simplefilter("ignore")
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    pool = ModelPool.from_manifest(args.manifest, cache_dir=args.cache_dir)
+    t0 = time.perf_counter()
+    if args.command == "prepare":
+        pool.prepare()
+        print(f"{len(pool.ids())} models ready in {args.cache_dir} ({time.perf_counter() - t0:.2f}s)",
+              file=sys.stderr)
+        return 0
+    for model_id in pool.ids():
+        pool.predictor(model_id)
+    print(f"{'model':<32} {'sha256':<14} {'memory':>10} {'mapped':>10} {'load':>9}  shared with")
+    for s in pool.status():
+        print(f"{s['id']:<32} {(s['sha256'] or '')[:12]:<14} {s['memory_bytes'] / 1e6:>8.2f}MB "
+              f"{s['mapped_bytes'] / 1e6:>8.2f}MB {s['load_ms'] or 0:>7.1f}ms  {', '.join(s['shared_with'])}")
+    summary = pool.summary()
+    print(f"{summary['models']} models, {summary['loaded']} loaded, "
+          f"{summary['resident_bytes'] / 1e6:.2f} MB resident ({summary['mapped_bytes'] / 1e6:.2f} MB mapped)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
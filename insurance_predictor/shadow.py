@@ -0,0 +1,584 @@
+"""Shadow evaluation of a candidate model on live traffic.
+
+A retrained pipeline is loaded next to the live one.  A configurable
+fraction of the profiles the live model scores is copied onto a bounded
+queue, and a separate evaluator process scores them with the candidate.
+Because it is a process, not a thread, it never competes with requests
+for the interpreter lock.  The response path only draws a random number
+and does a non-blocking put.  When the evaluator falls behind, mirrored
+rows are dropped (and counted) rather than queued, so the candidate never
+delays a quote.  The served quote always comes from the live model.
+Server processes forked after the deployment is created (``server
+--workers N``) share its queue, statistics and state, so there is one
+evaluator and one decision however many processes serve.
+
+The evaluator keeps streaming statistics in constant memory:
+
+* disagreement with the live model: the distribution of
+  ``|candidate - live| / live`` (p50/p95/p99), the overall bias, and the
+  share of rows past ``tolerance``, with the worst rows kept;
+* latency per row of both models, timed back to back on the same rows in
+  the evaluator, so the delta is like for like (cache hits on the
+  response path do not skew it);
+* candidate errors.
+
+Once ``min_samples`` rows are in, ``Policy`` decides.  If every limit
+holds, the candidate is promoted: it is published over the live artifact
+(the previous one is kept as ``<name>.previous<suffix>``), and every
+process serving that file reloads it on its next request, as after a
+retrain.  Otherwise it is rolled back: mirroring stops and the live model
+is untouched.  The live file is fingerprinted when the deployment starts;
+if it has changed by the time of promotion, nothing is published.  The
+decision and the final statistics are written next to the candidate as
+``<name>.shadow.json``.  ``auto=False`` only reports;
+``promote()`` and ``rollback()`` act by hand.
+
+    python -m insurance_predictor.shadow evaluate models/v0002/model.pkl \\
+        -m insurance_expense_predictor.pkl --data insurance.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import itertools
+import json
+import logging
+import multiprocessing as mp
+import os
+import queue
+import sys
+import time
+import weakref
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Mapping
+
+import numpy as np
+
+from . import DEFAULT_MODEL_PATH
+from .drift import Histogram
+from .inference import FEATURES, get_predictor
+from .registry import Fingerprint, publish
+from .telemetry import Sample, telemetry
+
+log = logging.getLogger(__name__)
+
+SHADOWING, PROMOTED, ROLLED_BACK, STOPPED = "shadowing", "promoted", "rolled_back", "stopped"
+STATES = (SHADOWING, PROMOTED, ROLLED_BACK, STOPPED)
+REPORT_SUFFIX = ".shadow.json"
+# |candidate - live| / live, from 0.001% to 1000%, plus an exact-zero cell.
+REL_DIFF_EDGES = np.concatenate([[0.0], np.geomspace(1e-5, 10.0, 301)])
+# Seconds per row, 100 ns to 10 s.
+LATENCY_EDGES = np.geomspace(1e-7, 10.0, 361)
+QUANTILES = (0.5, 0.95, 0.99)
+# Shared buffer for the evaluator's latest report (JSON).
+REPORT_BYTES = 1 << 16
+
+
+@dataclass
+class Policy:
+    """Limits a candidate must stay within to be promoted."""
+
+    min_samples: int = 1000
+    # A row whose quotes differ by more than this (relative) is a disagreement.
+    tolerance: float = 0.10
+    max_disagreement_rate: float = 0.05
+    max_p99_rel_diff: float = 0.5
+    # |mean candidate quote / mean live quote - 1|.
+    max_bias: float = 0.05
+    max_error_rate: float = 0.001
+    # Candidate p95 latency per row over the live model's; None only reports it.
+    max_latency_ratio: float | None = None
+
+    def evaluate(self, report: Mapping[str, Any]) -> tuple[str | None, list[str]]:
+        """``(PROMOTED | ROLLED_BACK | None, reasons)`` for a ``Comparison`` report."""
+        seen = report["rows"] + report["errors"]
+        # Failures can end the evaluation early; everything else needs the full sample.
+        if report["errors"] > self.max_error_rate * max(seen, self.min_samples):
+            return ROLLED_BACK, [f"candidate failed on {report['errors']} of {seen} rows"]
+        if report["rows"] < self.min_samples:
+            return None, []
+        reasons = []
+        if report["disagreement_rate"] > self.max_disagreement_rate:
+            reasons.append(f"{report['disagreement_rate']:.1%} of quotes differ by more than "
+                           f"{self.tolerance:.0%} (limit {self.max_disagreement_rate:.1%})")
+        if report["rel_diff"]["p99"] > self.max_p99_rel_diff:
+            reasons.append(f"p99 relative difference {report['rel_diff']['p99']:.1%} "
+                           f"(limit {self.max_p99_rel_diff:.0%})")
+        if abs(report["bias"]) > self.max_bias:
+            reasons.append(f"mean quote shifted {report['bias']:+.1%} (limit {self.max_bias:.0%})")
+        ratio = report["latency"]["p95_ratio"]
+        if self.max_latency_ratio is not None and ratio > self.max_latency_ratio:
+            reasons.append(f"p95 latency {ratio:.2f}x the live model's (limit {self.max_latency_ratio:.2f}x)")
+        return (ROLLED_BACK, reasons) if reasons else (PROMOTED, ["all limits met"])
+
+
+def _scalar(value: Any) -> Any:
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class Comparison:
+    """Streaming live-vs-candidate statistics in constant memory."""
+
+    def __init__(self, tolerance: float = 0.10, keep_worst: int = 10):
+        self.tolerance = tolerance
+        self.keep_worst = keep_worst
+        self.rows = self.errors = self.disagreements = 0
+        self.sum_live = self.sum_candidate = self.sum_abs_diff = 0.0
+        self.rel_diff = Histogram(REL_DIFF_EDGES)
+        self.live_latency = Histogram(LATENCY_EDGES)
+        self.candidate_latency = Histogram(LATENCY_EDGES)
+        self.max_rel_diff = 0.0
+        self._worst: list[tuple[float, int, dict[str, Any]]] = []
+        self._seq = itertools.count()
+
+    def add(
+        self,
+        data: Mapping[str, np.ndarray],
+        live: np.ndarray,
+        candidate: np.ndarray,
+        live_seconds: float,
+        candidate_seconds: float,
+    ) -> None:
+        """One scored block: quotes from both models and each model's time per row."""
+        n = len(live)
+        diff = candidate - live
+        rel = np.abs(diff) / np.maximum(np.abs(live), 1e-9)
+        self.rows += n
+        self.sum_live += float(live.sum())
+        self.sum_candidate += float(candidate.sum())
+        self.sum_abs_diff += float(np.abs(diff).sum())
+        self.disagreements += int((rel > self.tolerance).sum())
+        self.rel_diff.add(rel)
+        self.max_rel_diff = max(self.max_rel_diff, float(rel.max()))
+        self.live_latency.counts[np.searchsorted(LATENCY_EDGES, live_seconds, side="right")] += n
+        self.candidate_latency.counts[np.searchsorted(LATENCY_EDGES, candidate_seconds, side="right")] += n
+        floor = self._worst[0][0] if len(self._worst) == self.keep_worst else 0.0
+        for i in np.flatnonzero(rel > floor):
+            record = {
+                "profile": {f: _scalar(np.asarray(data[f])[i]) for f in FEATURES},
+                "live": float(live[i]), "candidate": float(candidate[i]), "rel_diff": float(rel[i]),
+            }
+            item = (float(rel[i]), next(self._seq), record)
+            if len(self._worst) < self.keep_worst:
+                heapq.heappush(self._worst, item)
+            elif item[0] > self._worst[0][0]:
+                heapq.heapreplace(self._worst, item)
+
+    def report(self) -> dict[str, Any]:
+        def quantiles(h: Histogram, scale: float = 1.0, cap: float = np.inf) -> dict[str, float]:
+            # Interpolating within a cell can overshoot the largest value seen.
+            return {f"p{round(q * 100)}": min(h.quantile(q), cap) * scale for q in QUANTILES}
+
+        live_ms = quantiles(self.live_latency, 1e3)
+        candidate_ms = quantiles(self.candidate_latency, 1e3)
+        return {
+            "rows": self.rows,
+            "errors": self.errors,
+            "bias": self.sum_candidate / self.sum_live - 1.0 if self.sum_live else 0.0,
+            "mean_abs_diff": self.sum_abs_diff / self.rows if self.rows else 0.0,
+            "rel_diff": {**quantiles(self.rel_diff, cap=self.max_rel_diff), "max": self.max_rel_diff},
+            "tolerance": self.tolerance,
+            "disagreement_rate": self.disagreements / self.rows if self.rows else 0.0,
+            "latency": {
+                "live_ms_per_row": live_ms,
+                "candidate_ms_per_row": candidate_ms,
+                "p95_ratio": candidate_ms["p95"] / live_ms["p95"] if self.rows else 1.0,
+            },
+            "worst": [r for _, _, r in sorted(self._worst, reverse=True)],
+        }
+
+
+def previous_path_for(model_path: str | Path) -> Path:
+    path = Path(model_path)
+    return path.with_name(path.stem + ".previous" + path.suffix)
+
+
+def report_path_for(candidate_path: str | Path) -> Path:
+    path = Path(candidate_path)
+    return path.with_name(path.stem + REPORT_SUFFIX)
+
+
+def _transition(state: Any, to: str) -> bool:
+    """Move a shared state value out of ``SHADOWING``; only the first caller wins."""
+    with state.get_lock():
+        if state.value != STATES.index(SHADOWING):
+            return False
+        state.value = STATES.index(to)
+        return True
+
+
+def _record(report: dict[str, Any]) -> None:
+    if report["state"] != STOPPED:
+        report_path_for(report["candidate"]).write_text(json.dumps(report, indent=2, default=float))
+    log.info(json.dumps({"event": "shadow", **{k: v for k, v in report.items() if k != "worst"}}, default=float))
+
+
+def _conclude(
+    state: Any, to: str, reasons: list[str], report: dict[str, Any], live_fingerprint: Fingerprint,
+) -> list[str] | None:
+    """Take the decision unless another was taken first; the reasons recorded, or ``None``."""
+    if not _transition(state, to):
+        return None
+    if to == PROMOTED and Fingerprint.of(report["live"]) != live_fingerprint:
+        # Retrained or promoted by something else since shadowing began.
+        state.value = STATES.index(STOPPED)
+        to, reasons = STOPPED, ["the live model was replaced"]
+    if to == PROMOTED:
+        try:
+            publish(report["live"], previous_path_for(report["live"]))
+            publish(report["candidate"], report["live"])
+        except OSError as exc:
+            log.exception("could not promote %s", report["candidate"])
+            state.value = STATES.index(ROLLED_BACK)
+            to, reasons = ROLLED_BACK, [f"promotion failed: {exc}"]
+    _record({**report, "state": to, "reasons": reasons, "decided": time.time()})
+    return reasons
+
+
+def _read(snapshot: Any) -> dict[str, Any] | None:
+    with snapshot.get_lock():
+        raw = snapshot.value
+    return json.loads(raw) if raw else None
+
+
+def _send(snapshot: Any, message: dict[str, Any]) -> None:
+    """Replace the shared report; every serving process reads the latest one."""
+    with snapshot.get_lock():
+        if not message["reasons"] and snapshot.value:
+            # A decision taken by hand in a server process keeps its reasons.
+            message = {**message, "reasons": json.loads(snapshot.value)["reasons"]}
+        data = json.dumps(message, default=float).encode()
+        if len(data) >= REPORT_BYTES:
+            data = json.dumps({**message, "worst": []}, default=float).encode()
+        snapshot.value = data
+
+
+def _evaluate(
+    live_path: str, candidate_path: str, policy: Policy, auto: bool,
+    inbox: Any, snapshot: Any, state: Any, live_fingerprint: Fingerprint,
+) -> None:
+    """Evaluator process: scores mirrored rows with both models and decides."""
+    from .telemetry import log_json_to
+
+    log_json_to(sys.stderr, log)
+    comparison = Comparison(policy.tolerance)
+    header = {"live": live_path, "candidate": candidate_path, "policy": asdict(policy), "reasons": []}
+
+    def report() -> dict[str, Any]:
+        return {**header, **comparison.report()}
+
+    def conclude(to: str, reasons: list[str]) -> None:
+        recorded = _conclude(state, to, reasons, report(), live_fingerprint)
+        if recorded is not None:
+            header["reasons"] = recorded
+
+    try:
+        candidate = get_predictor(candidate_path)
+    except Exception as exc:
+        log.exception("could not load candidate %s", candidate_path)
+        conclude(ROLLED_BACK, [f"candidate failed to load: {exc}"])
+        return
+    last_sent = 0.0
+    try:
+        while STATES[state.value] == SHADOWING:
+            try:
+                item = inbox.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if item is None:  # ShadowDeployment.finish()
+                break
+            rows, served = item
+            if Fingerprint.of(live_path) != live_fingerprint:
+                conclude(STOPPED, ["the live model was replaced"])
+                break
+            # Both models are timed here, back to back on the same rows; the
+            # comparison itself is against the quotes that were served.
+            live = get_predictor(live_path)
+            t0 = time.perf_counter()
+            live.predict(rows)
+            live_seconds = time.perf_counter() - t0
+            try:
+                t0 = time.perf_counter()
+                predicted = candidate.predict(rows)
+                candidate_seconds = time.perf_counter() - t0
+            except Exception:
+                log.exception("candidate %s failed", candidate_path)
+                comparison.errors += len(served)
+            else:
+                n = len(served)
+                comparison.add(rows, served, predicted, live_seconds / n, candidate_seconds / n)
+            if auto:
+                decision, reasons = policy.evaluate(comparison.report())
+                if decision is not None:
+                    conclude(decision, reasons)
+                    break
+            if time.monotonic() - last_sent > 0.5:
+                _send(snapshot, report())
+                last_sent = time.monotonic()
+    except Exception as exc:  # never promote on a broken evaluation
+        log.exception("shadow evaluation of %s failed", candidate_path)
+        conclude(STOPPED, [f"evaluation failed: {exc}"])
+    _send(snapshot, report())
+
+
+class ShadowDeployment:
+    """Mirrors live traffic to a candidate scored in a separate process.
+
+    The evaluator runs in its own process, so it never holds the serving
+    process's GIL; mirroring costs a random draw and a non-blocking put.
+    Processes forked from the one that created the deployment mirror into
+    the same evaluator.
+    """
+
+    def __init__(
+        self,
+        live_path: str | os.PathLike,
+        candidate_path: str | os.PathLike,
+        fraction: float = 0.1,
+        policy: Policy | None = None,
+        auto: bool = True,
+        queue_size: int = 256,
+        seed: int | None = None,
+    ):
+        if not 0.0 < fraction <= 1.0:
+            raise ValueError("fraction must be in (0, 1]")
+        self.live_path = str(Path(live_path).resolve())
+        self.candidate_path = str(Path(candidate_path).resolve())
+        if Path(self.live_path).suffix != Path(self.candidate_path).suffix:
+            raise ValueError("the candidate must be the same kind of artifact as the live model "
+                             f"({Path(self.live_path).suffix}), since promotion replaces the file")
+        if self.live_path == self.candidate_path:
+            raise ValueError("the candidate is the live model")
+        self.fraction = fraction
+        self.policy = policy or Policy()
+        self.auto = auto
+        self.started = time.time()
+        self._live_fingerprint = Fingerprint.of(self.live_path)
+        # Spawned rather than forked: the serving process has threads.
+        ctx = mp.get_context("spawn")
+        self._inbox = ctx.Queue(queue_size)
+        # Mirrored rows still queued when the process exits are discarded.
+        self._inbox.cancel_join_thread()
+        self._snapshot = ctx.Array("c", REPORT_BYTES)
+        self._state = ctx.Value("b", STATES.index(SHADOWING))
+        # Shared with forked server processes, like everything above.
+        self._mirrored = ctx.Value("q", 0)
+        self._dropped = ctx.Value("q", 0)
+        self._process = ctx.Process(
+            target=_evaluate, name="shadow", daemon=True,
+            args=(self.live_path, self.candidate_path, self.policy, self.auto,
+                  self._inbox, self._snapshot, self._state, self._live_fingerprint),
+        )
+        self._seed = seed
+        self._rng = np.random.default_rng(seed)
+        self._empty: dict[str, Any] = {"reasons": [], **Comparison(self.policy.tolerance).report()}
+        _deployments.add(self)
+
+    def _reseed(self) -> None:
+        # Forked server processes would otherwise mirror the same rows.
+        self._rng = np.random.default_rng(None if self._seed is None else [self._seed, os.getpid()])
+
+    def start(self) -> "ShadowDeployment":
+        if self._process.pid is None:
+            self._process.start()
+        return self
+
+    @property
+    def state(self) -> str:
+        return STATES[self._state.value]
+
+    @property
+    def active(self) -> bool:
+        return self.state == SHADOWING
+
+    @property
+    def mirrored(self) -> int:
+        return self._mirrored.value
+
+    @property
+    def dropped(self) -> int:
+        return self._dropped.value
+
+    # The two methods below run on the response path.
+
+    def mirror(self, data: Mapping[str, Any], predictions: np.ndarray) -> None:
+        """Offer a scored batch (DataFrame or dict of columns) for mirroring."""
+        if self._state.value:
+            return
+        keep = self._rng.random(len(predictions)) < self.fraction
+        if not keep.any():
+            return
+        rows = {f: np.asarray(data[f])[keep] for f in FEATURES}
+        self._offer(rows, np.asarray(predictions, dtype=np.float64)[keep])
+
+    def mirror_one(self, row: Mapping[str, Any], prediction: float) -> None:
+        """Offer one normalized profile and its served quote."""
+        if self._state.value or self._rng.random() >= self.fraction:
+            return
+        self._offer({f: np.array([row[f]]) for f in FEATURES}, np.array([prediction], dtype=np.float64))
+
+    def _offer(self, rows: dict[str, np.ndarray], live: np.ndarray, block: bool = False) -> None:
+        try:
+            self._inbox.put((rows, live), block=block)
+            counter = self._mirrored
+        except queue.Full:
+            counter = self._dropped
+        with counter.get_lock():
+            counter.value += len(live)
+
+    def comparison_report(self) -> dict[str, Any]:
+        """The evaluator's latest statistics (refreshed about twice a second)."""
+        return _read(self._snapshot) or self._empty
+
+    def report(self) -> dict[str, Any]:
+        latest = self.comparison_report()
+        return {
+            **latest,
+            "state": self.state,
+            "live": self.live_path,
+            "candidate": self.candidate_path,
+            "fraction": self.fraction,
+            "auto": self.auto,
+            "mirrored": self.mirrored,
+            "dropped": self.dropped,
+            "started": self.started,
+            "policy": asdict(self.policy),
+        }
+
+    def _decide(self, to: str, reasons: list[str]) -> None:
+        recorded = _conclude(self._state, to, reasons, self.report(), self._live_fingerprint)
+        if recorded is not None:
+            _send(self._snapshot, {**self.comparison_report(), "reasons": recorded})
+
+    def promote(self, reasons: list[str] | None = None) -> None:
+        """Publish the candidate over the live artifact, keeping the old one."""
+        self._decide(PROMOTED, reasons or ["promoted by hand"])
+
+    def rollback(self, reasons: list[str] | None = None) -> None:
+        """Stop mirroring and leave the live model in place."""
+        self._decide(ROLLED_BACK, reasons or ["rolled back by hand"])
+
+    def stop(self) -> None:
+        _transition(self._state, STOPPED)
+
+    def finish(self, timeout: float | None = None) -> dict[str, Any]:
+        """Wait until every row mirrored so far is scored (or a decision is made)."""
+        if self._process.pid is not None:
+            self._inbox.put(None)
+            self._process.join(timeout)
+        return self.report()
+
+
+_deployments: weakref.WeakSet[ShadowDeployment] = weakref.WeakSet()
+os.register_at_fork(after_in_child=lambda: [d._reseed() for d in list(_deployments)])
+_shadows: dict[tuple[str, str], tuple[Fingerprint, ShadowDeployment]] = {}
+
+
+def shadow_for(
+    live_path: str | os.PathLike, candidate_path: str | os.PathLike, **kwargs: Any,
+) -> ShadowDeployment:
+    """Process-wide, started deployment for the pair; recreated when the candidate file changes."""
+    key = (str(Path(live_path).resolve()), str(Path(candidate_path).resolve()))
+    fp = Fingerprint.of(key[1])
+    cached = _shadows.get(key)
+    if cached is not None and cached[0] == fp:
+        return cached[1]
+    if cached is not None:
+        cached[1].stop()
+    deployment = ShadowDeployment(*key, **kwargs).start()
+    _shadows[key] = (fp, deployment)
+    return deployment
+
+
+def _collect_metrics() -> list[Sample]:
+    rows, rel, rate, latency, state = [], [], [], [], []
+    for d in list(_deployments):
+        r = d.report()
+        model = {"model": Path(d.live_path).stem, "candidate": Path(d.candidate_path).stem}
+        rows.append(({**model, "outcome": "compared"}, r["rows"]))
+        rows.append(({**model, "outcome": "error"}, r["errors"]))
+        rows.append(({**model, "outcome": "dropped"}, r["dropped"]))
+        for q, v in r["rel_diff"].items():
+            if q != "max":
+                rel.append(({**model, "quantile": q}, v))
+        rate.append((model, r["disagreement_rate"]))
+        for side in ("live", "candidate"):
+            for q, v in r["latency"][f"{side}_ms_per_row"].items():
+                latency.append(({**model, "side": side, "quantile": q}, v / 1e3))
+        state.append(({**model, "state": d.state}, 1))
+    if not rows:
+        return []
+    return [
+        ("shadow_rows_total", "Rows mirrored to a candidate, by outcome.", "counter", rows),
+        ("shadow_rel_diff", "Relative difference between candidate and live quotes.", "gauge", rel),
+        ("shadow_disagreement_rate", "Share of mirrored rows whose quotes differ beyond tolerance.",
+         "gauge", rate),
+        ("shadow_latency_seconds", "Seconds per row, live vs candidate, timed on the same rows.",
+         "gauge", latency),
+        ("shadow_state", "Current state of the shadow deployment.", "gauge", state),
+    ]
+
+
+telemetry.add_collector(_collect_metrics)
+
+
+def print_report(report: Mapping[str, Any], file=sys.stdout) -> None:
+    rel, lat = report["rel_diff"], report["latency"]
+    print(f"{report['state']}: {'; '.join(report['reasons']) or 'undecided'}", file=file)
+    print(f"  {report['rows']:,} rows compared, {report['errors']} errors, {report['dropped']} dropped", file=file)
+    print(f"  relative difference p50 {rel['p50']:.2%}  p95 {rel['p95']:.2%}  p99 {rel['p99']:.2%}  "
+          f"max {rel['max']:.2%}; bias {report['bias']:+.2%}; "
+          f"{report['disagreement_rate']:.2%} beyond {report['tolerance']:.0%}", file=file)
+    for side in ("live", "candidate"):
+        ms = lat[f"{side}_ms_per_row"]
+        print(f"  {side:<9} ms/row p50 {ms['p50']:.4f}  p95 {ms['p95']:.4f}  p99 {ms['p99']:.4f}", file=file)
+    print(f"  candidate p95 latency {lat['p95_ratio']:.2f}x live", file=file)
+    for w in report["worst"][:5]:
+        print(f"  worst: {w['live']:>10.2f} -> {w['candidate']:>10.2f} ({w['rel_diff']:+.1%})  {w['profile']}",
+              file=file)
+
+
+def main(argv: list[str] | None = None) -> int:
+    from . import ROOT
+
+    parser = argparse.ArgumentParser(description="evaluate a candidate model against the live one")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("evaluate", help="replay a data file through a shadow deployment")
+    p.add_argument("candidate")
+    p.add_argument("-m", "--model", default=str(DEFAULT_MODEL_PATH), help="live model (default: %(default)s)")
+    p.add_argument("--data", default=str(ROOT / "insurance.csv"), help="profiles to replay (CSV)")
+    p.add_argument("--batch-rows", type=int, default=1, help="rows per simulated request (default: 1)")
+    p.add_argument("--min-samples", type=int, default=Policy.min_samples)
+    p.add_argument("--tolerance", type=float, default=Policy.tolerance)
+    p.add_argument("--apply", action="store_true", help="promote or roll back according to the decision")
+    args = parser.parse_args(argv)
+
+    import warnings
+
+    import pandas as pd
+
+    warnings.simplefilter("ignore")
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+    frame = pd.read_csv(args.data)
+    policy = Policy(min_samples=min(args.min_samples, len(frame)), tolerance=args.tolerance)
+    shadow = ShadowDeployment(args.model, args.candidate, fraction=1.0, policy=policy, auto=args.apply).start()
+    live = get_predictor(shadow.live_path)
+    for start in range(0, len(frame), args.batch_rows):
+        if not shadow.active:
+            break
+        batch = frame.iloc[start:start + args.batch_rows]
+        # Replays wait for the evaluator instead of dropping rows.
+        shadow._offer({f: batch[f].to_numpy() for f in FEATURES}, live.predict(batch), block=True)
+    report = shadow.finish()
+    decision = report["state"]
+    if not args.apply:
+        decision, reasons = policy.evaluate(report)
+        report.update(state=f"would be {decision}" if decision else SHADOWING, reasons=reasons)
+    print_report(report)
+    return 1 if decision == ROLLED_BACK else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
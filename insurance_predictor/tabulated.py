@@ -0,0 +1,329 @@
+"""Exact lookup-table ("tabulated") form of the forest.
+
+Every input except BMI is discrete in practice: sex, smoker and region are
+categorical, and age and children are whole numbers.  BMI is continuous,
+but the forest only ever compares it against a finite set of thresholds, so
+between two consecutive thresholds the prediction cannot change.  The model
+is therefore a dense table indexed by (age, sex, bmi interval, children,
+smoker, region), and a prediction is a binary search on BMI plus one array
+lookup.
+
+The table is built by pushing grid boxes down each tree rather than by
+scoring millions of rows: a split on a column cuts the box in two, and a
+leaf adds its value to every cell of its box.  Leaves are accumulated tree
+by tree in estimator order, so cells hold exactly what ``model.predict``
+returns.  Integer axes are widened to cover every threshold, which makes
+clamping out-of-range ages/children to the ends of the axis exact as well;
+only non-integral ages or children are off the grid.
+
+    python -m insurance_predictor.tabulated insurance_expense_predictor.pkl --verify
+
+writes ``insurance_expense_predictor.table.npz`` next to the pickle, which
+``get_predictor`` then picks up automatically.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import logging
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Mapping
+
+import numpy as np
+
+from .compiled import CompiledForest
+
+log = logging.getLogger(__name__)
+
+# Whole-number inputs enumerated as values rather than split intervals.
+INTEGER_RANGES = {"age": (18, 64), "children": (0, 5)}
+TABLE_SUFFIX = ".table.npz"
+
+
+def table_path_for(model_path: str | Path) -> Path:
+    path = Path(model_path)
+    return path.with_name(path.stem + TABLE_SUFFIX)
+
+
+def file_sha256(path: str | Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def source_sha256(model_path: str | Path) -> str:
+    """Hash that sidecar files built for ``model_path`` are keyed on.
+
+    That is the file's own sha256, except for exported ``.icpf`` artifacts,
+    which use the hash of the pickle they were exported from (recorded in
+    their header), so a pickle and its export share one table.
+    """
+    from .artifact import SUFFIX, read_header
+
+    if str(model_path).endswith(SUFFIX):
+        source = read_header(model_path).get("source_artifact") or {}
+        if source.get("sha256"):
+            return source["sha256"]
+    return file_sha256(model_path)
+
+
+@dataclass
+class Axis:
+    """One table dimension.
+
+    ``kind`` is ``"intervals"`` (``values`` are split thresholds, cell ``i``
+    is ``(values[i-1], values[i]]``), ``"integers"`` (``values`` are the
+    integers ``lo..hi``) or ``"categories"`` (``values`` are the labels).
+    """
+
+    name: str
+    kind: str
+    values: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.values) + (1 if self.kind == "intervals" else 0)
+
+    def representatives(self) -> np.ndarray:
+        """One input value per cell (the inclusive upper edge for intervals)."""
+        if self.kind != "intervals":
+            return self.values
+        last = self.values[-1] + 1.0 if len(self.values) else 0.0
+        return np.append(self.values, last)
+
+    def lower_edges(self) -> np.ndarray:
+        """Smallest input value per interval cell (the other boundary)."""
+        lows = np.nextafter(self.values, np.inf)
+        first = self.values[0] - 1.0 if len(self.values) else 0.0
+        return np.insert(lows, 0, first)
+
+    def index(self, raw: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Cell index per value, and a mask of values that are on the grid."""
+        if self.kind == "intervals":
+            x = raw.astype(np.float64)
+            return np.searchsorted(self.values, x, side="left"), ~np.isnan(x)
+        if self.kind == "integers":
+            x = raw.astype(np.float64)
+            on_grid = x == np.round(x)
+            lo, hi = self.values[0], self.values[-1]
+            idx = (np.clip(np.where(on_grid, x, lo), lo, hi) - lo).astype(np.intp)
+            return idx, on_grid
+        order = np.argsort(self.values)
+        pos = np.searchsorted(self.values[order], raw)
+        pos = np.minimum(pos, len(self.values) - 1)
+        idx = order[pos]
+        known = self.values[idx] == raw
+        if not known.all():
+            unknown = sorted(set(np.asarray(raw)[~known].tolist()))
+            raise ValueError(f"unknown {self.name} value(s): {', '.join(map(str, unknown))}")
+        return idx, known
+
+
+class TabulatedModel:
+    def __init__(self, axes: list[Axis], table: np.ndarray, source_sha256: str = ""):
+        self.axes = axes
+        self.table = table.reshape(tuple(len(a) for a in axes))
+        self.source_sha256 = source_sha256
+        self._flat = self.table.reshape(-1)
+
+    @property
+    def nbytes(self) -> int:
+        return self.table.nbytes + sum(a.values.nbytes for a in self.axes)
+
+    def lookup(self, data: Mapping[str, Any]) -> tuple[np.ndarray, np.ndarray]:
+        """Predictions for ``data`` and a mask of rows that were on the grid.
+
+        Rows outside the grid (non-integral age or children) get NaN.
+        """
+        idx = []
+        on_grid = None
+        for axis in self.axes:
+            i, ok = axis.index(np.asarray(data[axis.name]))
+            idx.append(i)
+            on_grid = ok if on_grid is None else on_grid & ok
+        out = self._flat[np.ravel_multi_index(idx, self.table.shape)]
+        if not on_grid.all():
+            out = np.where(on_grid, out, np.nan)
+        return out, on_grid
+
+    def predict(self, data: Mapping[str, Any]) -> np.ndarray:
+        out, on_grid = self.lookup(data)
+        if not on_grid.all():
+            raise ValueError("input is off the table grid (non-integral age or children)")
+        return out
+
+    def save(self, path: str | Path) -> None:
+        arrays = {"table": self.table, "source_sha256": np.array(self.source_sha256)}
+        for k, axis in enumerate(self.axes):
+            arrays[f"axis{k}_values"] = axis.values
+            arrays[f"axis{k}_meta"] = np.array([axis.name, axis.kind])
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str | Path, table: np.ndarray | None = None) -> "TabulatedModel":
+        """Load a saved table; ``table`` replaces the stored cells (e.g. a memory-mapped copy)."""
+        with np.load(path) as data:
+            axes = []
+            k = 0
+            while f"axis{k}_meta" in data.files:
+                name, kind = data[f"axis{k}_meta"].tolist()
+                axes.append(Axis(name, kind, data[f"axis{k}_values"]))
+                k += 1
+            return cls(axes, data["table"] if table is None else table, str(data["source_sha256"]))
+
+
+def _axes_for(forest: CompiledForest, integer_ranges: Mapping[str, tuple[int, int]]) -> list[Axis]:
+    internal = forest.left != np.arange(len(forest.left))
+    axes = []
+    for source in forest.sources:
+        cols = [j for j, c in enumerate(forest.columns) if c.source == source]
+        if forest.columns[cols[0]].kind == "indicator":
+            labels = sorted(set(forest.categories[source]) | set(forest.dropped.get(source, ())))
+            axes.append(Axis(source, "categories", np.array(labels)))
+            continue
+        thresholds = np.unique(forest.threshold[internal & (forest.feature == cols[0])])
+        if source in integer_ranges:
+            lo, hi = integer_ranges[source]
+            if len(thresholds):
+                # Widen so every threshold falls strictly inside: then clamping
+                # an out-of-range integer to an end cell is exact.
+                lo = min(lo, int(np.floor(thresholds[0])))
+                hi = max(hi, int(np.floor(thresholds[-1])) + 1)
+            axes.append(Axis(source, "integers", np.arange(lo, hi + 1, dtype=np.float64)))
+        else:
+            axes.append(Axis(source, "intervals", thresholds))
+    return axes
+
+
+def tabulate(
+    forest: CompiledForest,
+    integer_ranges: Mapping[str, tuple[int, int]] = INTEGER_RANGES,
+    source_sha256: str = "",
+) -> TabulatedModel:
+    """Enumerate ``forest`` over its whole discrete/interval input grid."""
+    axes = _axes_for(forest, integer_ranges)
+    axis_of = {a.name: k for k, a in enumerate(axes)}
+    # Encoded value of each column at every cell along its source's axis.
+    column_values = []
+    for col in forest.columns:
+        axis = axes[axis_of[col.source]]
+        if col.kind == "numeric":
+            column_values.append(axis.representatives())
+        else:
+            column_values.append((axis.values == col.category).astype(np.float64))
+
+    table = np.zeros(tuple(len(a) for a in axes))
+    full = tuple(np.arange(len(a)) for a in axes)
+    for root in forest.roots:
+        stack = [(int(root), full)]
+        while stack:
+            node, box = stack.pop()
+            left, right = int(forest.left[node]), int(forest.right[node])
+            if left == node:
+                table[np.ix_(*box)] += forest.value[node]
+                continue
+            j = int(forest.feature[node])
+            k = axis_of[forest.columns[j].source]
+            goes_left = column_values[j][box[k]] <= forest.threshold[node]
+            for child, mask in ((left, goes_left), (right, ~goes_left)):
+                if mask.any():
+                    stack.append((child, box[:k] + (box[k][mask],) + box[k + 1:]))
+    table /= forest.n_trees
+    return TabulatedModel(axes, table, source_sha256)
+
+
+def grid_frames(model: TabulatedModel, boundary: str = "upper", chunk_cells: int = 200_000):
+    """Yield the full grid, one cell per row, as dicts of columns.
+
+    ``boundary`` picks which edge of each BMI interval to use: ``"upper"``
+    (the threshold itself) or ``"lower"`` (just above the previous one).
+    """
+    values = [
+        a.lower_edges() if boundary == "lower" and a.kind == "intervals" else a.representatives()
+        for a in model.axes
+    ]
+    n = model.table.size
+    for start in range(0, n, chunk_cells):
+        flat = np.arange(start, min(n, start + chunk_cells))
+        idx = np.unravel_index(flat, model.table.shape)
+        yield {a.name: v[i] for a, v, i in zip(model.axes, values, idx)}, flat
+
+
+@dataclass
+class VerifyReport:
+    cells: int
+    rows_checked: int
+    mismatches: int
+    max_abs_diff: float
+    seconds: float
+
+    @property
+    def ok(self) -> bool:
+        return self.mismatches == 0
+
+
+def verify(model: TabulatedModel, pipeline: Any, boundaries: tuple[str, ...] = ("upper", "lower")) -> VerifyReport:
+    """Check every table cell against ``pipeline.predict`` at both interval edges."""
+    import pandas as pd
+
+    t0 = time.perf_counter()
+    flat_table = model.table.reshape(-1)
+    rows = mismatches = 0
+    max_diff = 0.0
+    for boundary in boundaries:
+        for columns, flat in grid_frames(model, boundary):
+            expected = pipeline.predict(pd.DataFrame(columns))
+            diff = np.abs(expected - flat_table[flat])
+            rows += len(flat)
+            mismatches += int(np.count_nonzero(diff))
+            max_diff = max(max_diff, float(diff.max()))
+    return VerifyReport(model.table.size, rows, mismatches, max_diff, time.perf_counter() - t0)
+
+
+def load_for(model_path: str | Path) -> TabulatedModel | None:
+    """Load the sidecar table for ``model_path`` if present and current."""
+    path = table_path_for(model_path)
+    if not path.exists():
+        return None
+    table = TabulatedModel.load(path)
+    if table.source_sha256 != source_sha256(model_path):
+        log.warning("ignoring %s: built from a different artifact", path)
+        return None
+    return table
+
+
+def main(argv: list[str] | None = None) -> int:
+    from .compiled import compile_pipeline
+    from .registry import get_model
+
+    parser = argparse.ArgumentParser(description="build the exact lookup table for a fitted pipeline")
+    parser.add_argument("model", help="fitted pipeline (.pkl) or compiled artifact (.icpf)")
+    parser.add_argument("-o", "--output", help=f"output file (default: <model>{TABLE_SUFFIX})")
+    parser.add_argument("--verify", action="store_true",
+                        help="check every cell against model.predict at both BMI interval edges")
+    args = parser.parse_args(argv)
+
+    pipeline = get_model(args.model)
+    t0 = time.perf_counter()
+    forest = pipeline if isinstance(pipeline, CompiledForest) else compile_pipeline(pipeline)
+    model = tabulate(forest, source_sha256=source_sha256(args.model))
+    output = args.output or table_path_for(args.model)
+    model.save(output)
+    shape = " x ".join(f"{a.name}[{len(a)}]" for a in model.axes)
+    print(f"{model.table.size:,} cells ({shape}), {model.nbytes / 1e6:.1f} MB, "
+          f"built in {time.perf_counter() - t0:.1f}s -> {output}", file=sys.stderr)
+    if args.verify:
+        report = verify(model, pipeline)
+        print(f"verified {report.rows_checked:,} grid points in {report.seconds:.1f}s: "
+              f"{report.mismatches} mismatches, max |diff| {report.max_abs_diff:.3g}", file=sys.stderr)
+        return 0 if report.ok else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
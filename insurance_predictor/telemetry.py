@@ -0,0 +1,334 @@
+"""Per-stage timings, counters and latency histograms for inference.
+
+    from insurance_predictor.telemetry import telemetry
+    telemetry.enable()
+    with telemetry.request("quote"):
+        with telemetry.stage("encode"):
+            ...
+    print(telemetry.prometheus_text())
+
+Instrumentation is off by default, or on at start-up when the
+``INSURANCE_TELEMETRY`` environment variable is set to ``1``, and can be
+switched at any time with ``enable()``/``disable()``.  While it is off,
+``stage`` and ``request`` hand back one shared no-op context manager, so the
+instrumented code pays an attribute check and an empty ``with`` block
+(well under a microsecond) per stage.
+
+The stages are ``load`` (unpickling an artifact), ``compile`` (building the
+predictor and its tables), ``encode`` (validating and encoding inputs for
+the compiled forest), ``transform`` (preprocessor output for sklearn
+regressors), ``traversal`` (tree walk or table lookup) and ``render``
+(building the app's response).  Each gets a latency histogram, and so does
+each request kind as a whole.  Counters cover requests and errors per kind;
+other components (the quote cache, the prediction service) contribute
+their own counters, gauges and ``Histogram``s through ``add_collector``
+when metrics are exported, at no cost on the request path.
+
+Metrics are exported as Prometheus text (``prometheus_text``, or
+``write_prometheus`` for node_exporter's textfile collector) or as one
+JSON-serialisable dict (``snapshot``).  Every finished request is also
+logged as one JSON line on the ``insurance_predictor.telemetry`` logger,
+with its kind, total and per-stage milliseconds and error, if any;
+``log_json_to`` attaches a plain handler for processes (like Streamlit)
+that do not configure logging themselves.
+"""
+
+from __future__ import annotations
+
+import bisect
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import IO, Any, Callable, Iterable
+
+log = logging.getLogger(__name__)
+
+ENV_VAR = "INSURANCE_TELEMETRY"
+PREFIX = "insurance"
+# Upper bounds in seconds, from 25 µs to 10 s.
+LATENCY_BUCKETS = (
+    25e-6, 50e-6, 100e-6, 250e-6, 500e-6,
+    1e-3, 2.5e-3, 5e-3, 10e-3, 25e-3, 50e-3, 100e-3, 250e-3, 500e-3,
+    1.0, 2.5, 5.0, 10.0,
+)
+
+# (name, help, type, [(labels, value), ...]) as returned by a collector;
+# for type "histogram" each value is a ``Histogram``.
+Sample = tuple[str, str, str, list[tuple[dict[str, str], Any]]]
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout (latencies by default)."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile (inf past the last)."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum_s": self.sum,
+            "mean_ms": self.sum / self.count * 1e3 if self.count else 0.0,
+            "p50_ms": self.quantile(0.5) * 1e3,
+            "p99_ms": self.quantile(0.99) * 1e3,
+        }
+
+
+class _Stage:
+    __slots__ = ("owner", "name", "t0")
+
+    def __init__(self, owner: "Telemetry", name: str):
+        self.owner = owner
+        self.name = name
+
+    def __enter__(self) -> "_Stage":
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.owner.observe(self.name, time.perf_counter() - self.t0)
+
+
+class _Request:
+    __slots__ = ("owner", "kind", "t0", "stages", "error", "token")
+
+    def __init__(self, owner: "Telemetry", kind: str):
+        self.owner = owner
+        self.kind = kind
+        self.stages: dict[str, float] = {}
+        self.error: str | None = None
+
+    def __enter__(self) -> "_Request":
+        self.token = _current.set(self)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        elapsed = time.perf_counter() - self.t0
+        _current.reset(self.token)
+        self.owner._finish(self, elapsed, exc)
+
+
+_NOOP = contextlib.nullcontext()
+# The request being handled, per thread and per asyncio task.
+_current: contextvars.ContextVar[_Request | None] = contextvars.ContextVar("telemetry_request", default=None)
+
+
+class Telemetry:
+    """Process-wide metrics store; see the module docstring."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._collectors: list[Callable[[], Iterable[Sample]]] = []
+        self.reset()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stages: dict[str, Histogram] = {}
+            self.latency: dict[str, Histogram] = {}
+            self.requests: dict[str, int] = {}
+            self.errors: dict[str, int] = {}
+            self.started = time.time()
+
+    def stage(self, name: str) -> contextlib.AbstractContextManager:
+        """Time a block as stage ``name``."""
+        return _Stage(self, name) if self.enabled else _NOOP
+
+    def request(self, kind: str) -> contextlib.AbstractContextManager:
+        """Count and time one request; exceptions inside count as errors and propagate."""
+        return _Request(self, kind) if self.enabled else _NOOP
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Record an externally timed stage (no-op while disabled)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self.stages.get(stage)
+            if hist is None:
+                hist = self.stages[stage] = Histogram()
+            hist.observe(seconds)
+        current = _current.get()
+        if current is not None:
+            current.stages[stage] = current.stages.get(stage, 0.0) + seconds
+
+    def error(self, kind: str, message: str = "") -> None:
+        """Count an error reported without an exception (e.g. a 400 response)."""
+        if not self.enabled:
+            return
+        current = _current.get()
+        if current is not None and current.kind == kind:
+            current.error = message
+            return
+        with self._lock:
+            self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def _finish(self, req: _Request, elapsed: float, exc: BaseException | None) -> None:
+        error = req.error
+        if exc is not None:
+            error = f"{type(exc).__name__}: {exc}"
+        with self._lock:
+            hist = self.latency.get(req.kind)
+            if hist is None:
+                hist = self.latency[req.kind] = Histogram()
+            hist.observe(elapsed)
+            self.requests[req.kind] = self.requests.get(req.kind, 0) + 1
+            if error is not None:
+                self.errors[req.kind] = self.errors.get(req.kind, 0) + 1
+        if log.isEnabledFor(logging.INFO):
+            record = {
+                "event": "request",
+                "kind": req.kind,
+                "ms": round(elapsed * 1e3, 3),
+                "stages_ms": {k: round(v * 1e3, 3) for k, v in req.stages.items()},
+            }
+            if error is not None:
+                record["error"] = error
+            log.info(json.dumps(record))
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        """Register a callable that reports extra metrics at export time."""
+        self._collectors.append(collector)
+
+    def remove_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        """Undo ``add_collector``; unknown collectors are ignored."""
+        try:
+            self._collectors.remove(collector)
+        except ValueError:
+            pass
+
+    def _collected(self) -> list[Sample]:
+        samples: list[Sample] = []
+        for collector in self._collectors:
+            try:
+                samples.extend(collector())
+            except Exception:
+                log.exception("metrics collector failed")
+        return samples
+
+    def snapshot(self) -> dict[str, Any]:
+        """All metrics as one JSON-serialisable dict."""
+        with self._lock:
+            out: dict[str, Any] = {
+                "enabled": self.enabled,
+                "uptime_s": time.time() - self.started,
+                "requests": dict(self.requests),
+                "errors": dict(self.errors),
+                "latency": {k: h.to_dict() for k, h in self.latency.items()},
+                "stages": {k: h.to_dict() for k, h in self.stages.items()},
+            }
+        for name, _, kind, values in self._collected():
+            for labels, value in values:
+                key = name + "".join(f"_{v}" for v in labels.values())
+                if kind == "histogram":
+                    value = {"count": value.count, "sum": value.sum}
+                out.setdefault("collected", {})[key] = value
+        return out
+
+    def log_snapshot(self) -> None:
+        log.info(json.dumps({"event": "metrics", **self.snapshot()}))
+
+    def prometheus_text(self) -> str:
+        """Metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines: list[str] = []
+
+        def family(name: str, help_text: str, kind: str) -> None:
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+
+        def histogram(name: str, labels: dict[str, str], h: Histogram) -> None:
+            tags = "".join(f'{k}="{v}",' for k, v in labels.items())
+            seen = 0
+            for bound, n in zip(h.buckets, h.counts):
+                seen += n
+                lines.append(f'{PREFIX}_{name}_bucket{{{tags}le="{bound:g}"}} {seen}')
+            lines.append(f'{PREFIX}_{name}_bucket{{{tags}le="+Inf"}} {h.count}')
+            tags = tags.rstrip(",")
+            lines.append(f"{PREFIX}_{name}_sum{{{tags}}} {h.sum!r}" if tags else f"{PREFIX}_{name}_sum {h.sum!r}")
+            lines.append(f"{PREFIX}_{name}_count{{{tags}}} {h.count}" if tags else f"{PREFIX}_{name}_count {h.count}")
+
+        def histograms(name: str, label: str, hists: dict[str, Histogram]) -> None:
+            for key, h in sorted(hists.items()):
+                histogram(name, {label: key}, h)
+
+        with self._lock:
+            family("requests_total", "Requests handled, by kind.", "counter")
+            lines.extend(f'{PREFIX}_requests_total{{kind="{k}"}} {v}' for k, v in sorted(self.requests.items()))
+            family("errors_total", "Requests that failed, by kind.", "counter")
+            lines.extend(f'{PREFIX}_errors_total{{kind="{k}"}} {v}' for k, v in sorted(self.errors.items()))
+            family("request_seconds", "End-to-end request latency, by kind.", "histogram")
+            histograms("request_seconds", "kind", self.latency)
+            family("stage_seconds", "Time spent per pipeline stage.", "histogram")
+            histograms("stage_seconds", "stage", self.stages)
+        for name, help_text, kind, values in self._collected():
+            family(name, help_text, kind)
+            for labels, value in values:
+                if kind == "histogram":
+                    histogram(name, labels, value)
+                    continue
+                tags = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"{PREFIX}_{name}{{{tags}}} {value!r}" if tags else f"{PREFIX}_{name} {value!r}")
+        return "\n".join(lines) + "\n"
+
+
+    def write_prometheus(self, path: str | os.PathLike) -> None:
+        """Atomically write ``prometheus_text()`` to ``path``."""
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(self.prometheus_text())
+        os.replace(tmp, path)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MiB (Unix only)."""
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def log_json_to(stream: IO[str] = sys.stderr, logger: logging.Logger = log) -> None:
+    """Send the JSON lines of ``logger`` (the request log) to ``stream``, once per process."""
+    if any(getattr(h, "_telemetry", False) for h in logger.handlers):
+        return
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    handler._telemetry = True  # type: ignore[attr-defined]
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    # Keep the lines machine-readable rather than prefixed by the root format.
+    logger.propagate = False
+
+
+telemetry = Telemetry(enabled=os.environ.get(ENV_VAR, "") == "1")
@@ -0,0 +1,5 @@
+"""Training entry points that replace the one-off notebook fit.
+
+Importing this package pulls in scikit-learn and pandas; the serving side
+never needs it.
+"""
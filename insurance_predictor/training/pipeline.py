@@ -0,0 +1,54 @@
+"""The notebook's preprocessing and model, as reusable builders."""
+
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from .. import ROOT
+from ..inference import CATEGORICAL_FEATURES, NUMERIC_FEATURES
+
+DATA_PATH = ROOT / "insurance.csv"
+TARGET = "expenses"
+# Matches train_model.ipynb.
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+FOREST_PARAMS = {"n_estimators": 100, "max_depth": 15, "min_samples_split": 5, "random_state": RANDOM_STATE}
+
+
+def make_preprocessor() -> ColumnTransformer:
+    return ColumnTransformer(transformers=[
+        ("num", StandardScaler(), NUMERIC_FEATURES),
+        ("cat", OneHotEncoder(drop="first", sparse_output=False), CATEGORICAL_FEATURES),
+    ])
+
+
+def make_pipeline(regressor: Any = None, preprocessor: Any = None) -> Pipeline:
+    if regressor is None:
+        regressor = RandomForestRegressor(**FOREST_PARAMS, n_jobs=-1)
+    return Pipeline(steps=[("preprocessor", preprocessor or make_preprocessor()), ("regressor", regressor)])
+
+
+def load_dataset(path: str | Path = DATA_PATH) -> tuple[pd.DataFrame, pd.Series]:
+    df = pd.read_csv(path)
+    return df.drop(TARGET, axis=1), df[TARGET]
+
+
+def holdout_split(X: pd.DataFrame, y: pd.Series):
+    return train_test_split(X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+
+
+def frame_hash(*frames: pd.DataFrame | pd.Series) -> str:
+    """Content hash of one or more frames, stable across processes."""
+    h = hashlib.sha256()
+    for frame in frames:
+        h.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return h.hexdigest()
@@ -0,0 +1,200 @@
+"""Out-of-core training on files too large to load at once.
+
+    python -m insurance_predictor.training.streaming policies.parquet -o model.pkl --max-memory-mb 512
+
+The file (CSV or Parquet with the ``insurance.csv`` columns) is read twice,
+one chunk at a time:
+
+1. a statistics pass fits the ``StandardScaler`` with ``partial_fit`` and
+   collects each categorical column's vocabulary, so the preprocessor ends
+   up exactly as if it had been fitted on the whole file;
+2. a training pass fits a small forest on each chunk and keeps its trees.
+
+The trees are pooled into one ``RandomForestRegressor``, so the result is an
+ordinary fitted pipeline: it predicts the average of all per-chunk trees and
+works with everything that takes the notebook's pickle (the compiled forest,
+the ``.icpf`` export, the lookup table, batch scoring).
+
+``--max-memory-mb`` bounds the training pass by sizing chunks from an
+estimate of per-row cost (``bytes_per_row``) and the number of trees fitted
+in parallel; the estimate is deliberately conservative.  The budget is on
+top of the interpreter and libraries (about 200 MB) and of the pooled trees,
+whose size depends on chunk size and depth rather than on the number of
+rows and is reported at the end.  Every chunk gets at least one tree, so
+files with more chunks than ``--trees`` end up with one tree per chunk.
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import sys
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+
+from ..batch import iter_chunks
+from ..inference import CATEGORICAL_FEATURES, NUMERIC_FEATURES
+from ..parallel import default_workers
+from ..telemetry import peak_rss_mb
+from .pipeline import FOREST_PARAMS, RANDOM_STATE, TARGET, make_pipeline, make_preprocessor
+
+# Rough training-pass cost of one row: the parsed chunk (three string
+# columns dominate), its float64 and float32 encodings, plus per-job sample
+# weights and index buffers while a tree is being grown.
+ROW_BYTES = 512
+ROW_BYTES_PER_JOB = 64
+STATS_CHUNK_ROWS = 100_000
+
+
+def bytes_per_row(n_jobs: int) -> int:
+    return ROW_BYTES + ROW_BYTES_PER_JOB * n_jobs
+
+
+def chunk_rows_for(max_memory_mb: float, n_jobs: int) -> int:
+    return max(1000, int(max_memory_mb * (1 << 20) // bytes_per_row(n_jobs)))
+
+
+def scan(path: str | Path, chunk_rows: int = STATS_CHUNK_ROWS) -> tuple[StandardScaler, dict[str, list[str]], int]:
+    """Streaming pass: fitted scaler, sorted vocabularies and the row count."""
+    scaler = StandardScaler()
+    vocab: dict[str, set[str]] = {f: set() for f in CATEGORICAL_FEATURES}
+    rows = 0
+    for chunk in iter_chunks(path, chunk_rows):
+        scaler.partial_fit(chunk[NUMERIC_FEATURES])
+        for f in CATEGORICAL_FEATURES:
+            vocab[f].update(chunk[f].dropna().astype(str).unique().tolist())
+        rows += len(chunk)
+    if rows == 0:
+        raise ValueError(f"{path} has no rows")
+    return scaler, {f: sorted(v) for f, v in vocab.items()}, rows
+
+
+def build_preprocessor(scaler: StandardScaler, vocab: dict[str, list[str]], columns: list[str]) -> Any:
+    """A fitted ``make_preprocessor()`` whose statistics come from ``scan``.
+
+    The ``ColumnTransformer`` is fitted on a tiny frame holding every
+    category (which is all ``OneHotEncoder`` learns), then its scaler is
+    swapped for the streamed one.
+    """
+    width = max(len(v) for v in vocab.values())
+    seed = pd.DataFrame({
+        c: [vocab[c][i % len(vocab[c])] for i in range(width)] if c in vocab else np.zeros(width)
+        for c in columns
+    })
+    preprocessor = make_preprocessor().fit(seed)
+    preprocessor.transformers_ = [
+        (name, scaler if name == "num" else fitted, cols) for name, fitted, cols in preprocessor.transformers_
+    ]
+    return preprocessor
+
+
+def train(
+    path: str | Path,
+    max_memory_mb: float = 1024,
+    n_trees: int = FOREST_PARAMS["n_estimators"],
+    n_jobs: int = -1,
+    chunk_rows: int | None = None,
+    log=print,
+) -> tuple[Any, dict[str, Any]]:
+    """Fit a pipeline on ``path`` without loading it whole; returns (pipeline, report)."""
+    jobs = default_workers() if n_jobs == -1 else n_jobs
+    t0 = time.perf_counter()
+    scaler, vocab, rows = scan(path)
+    with closing(iter_chunks(path, 1)) as probe:
+        columns = [c for c in next(probe).columns if c != TARGET]
+    preprocessor = build_preprocessor(scaler, vocab, columns)
+    t_scan = time.perf_counter()
+    log(f"statistics pass: {rows:,} rows in {t_scan - t0:.1f}s; "
+        + "; ".join(f"{f}: {len(v)} values" for f, v in vocab.items()))
+
+    chunk_rows = chunk_rows or chunk_rows_for(max_memory_mb, jobs)
+    n_chunks = math.ceil(rows / chunk_rows)
+    # Spread the tree budget over the chunks; a final short chunk still gets
+    # its share so every row contributes.
+    per_chunk = max(1, math.ceil(n_trees / n_chunks))
+    params = {k: v for k, v in FOREST_PARAMS.items() if k not in ("n_estimators", "random_state")}
+    estimators: list[Any] = []
+    forest = None
+    for k, chunk in enumerate(iter_chunks(path, chunk_rows)):
+        Xt = preprocessor.transform(chunk[columns])
+        forest = RandomForestRegressor(
+            n_estimators=per_chunk, random_state=RANDOM_STATE + k, n_jobs=jobs, **params,
+        ).fit(Xt, chunk[TARGET].to_numpy())
+        estimators.extend(forest.estimators_)
+        del Xt, chunk
+        log(f"chunk {k + 1}/{n_chunks}: {per_chunk} trees ({len(estimators)} total)")
+    t_fit = time.perf_counter()
+
+    # Pool the trees into the last chunk's forest so every fitted attribute
+    # (n_features_in_, n_outputs_, ...) is already set.
+    forest.estimators_ = estimators
+    forest.n_estimators = len(estimators)
+    forest.set_params(random_state=RANDOM_STATE)
+    pipeline = make_pipeline(forest, preprocessor)
+
+    from ..registry import estimate_nbytes
+
+    report = {
+        "rows": rows,
+        "chunk_rows": chunk_rows,
+        "chunks": n_chunks,
+        "trees": len(estimators),
+        "estimated_training_mb": chunk_rows * bytes_per_row(jobs) / (1 << 20),
+        "model_mb": estimate_nbytes(forest) / 1e6,
+        "seconds": {"scan": t_scan - t0, "fit": t_fit - t_scan, "total": t_fit - t0},
+    }
+    return pipeline, report
+
+
+def evaluate(pipeline: Any, path: str | Path, chunk_rows: int = STATS_CHUNK_ROWS) -> float:
+    """r2 of ``pipeline`` on ``path``, accumulated chunk by chunk."""
+    n = 0
+    sum_y = sum_y2 = sse = 0.0
+    for chunk in iter_chunks(path, chunk_rows):
+        y = chunk[TARGET].to_numpy(dtype=np.float64)
+        pred = pipeline.predict(chunk.drop(columns=TARGET))
+        n += len(y)
+        sum_y += float(y.sum())
+        sum_y2 += float((y * y).sum())
+        sse += float(((y - pred) ** 2).sum())
+    return 1.0 - sse / (sum_y2 - sum_y * sum_y / n)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="out-of-core forest training from CSV/Parquet chunks")
+    parser.add_argument("data", help="CSV or Parquet file with the insurance.csv columns")
+    parser.add_argument("-o", "--output", required=True, help="where to dump the fitted pipeline")
+    parser.add_argument("--max-memory-mb", type=float, default=1024,
+                        help="memory budget for the training pass (default: 1024)")
+    parser.add_argument("--chunk-rows", type=int, help="override the chunk size derived from the budget")
+    parser.add_argument("--trees", type=int, default=FOREST_PARAMS["n_estimators"],
+                        help="total trees across all chunks (default: %(default)s)")
+    parser.add_argument("-j", "--jobs", type=int, default=-1)
+    parser.add_argument("--eval", help="file to report r2 on after training (streamed)")
+    args = parser.parse_args(argv)
+
+    import joblib
+
+    log = lambda msg: print(msg, file=sys.stderr)  # noqa: E731
+    pipeline, report = train(args.data, args.max_memory_mb, args.trees, args.jobs, args.chunk_rows, log=log)
+    joblib.dump(pipeline, args.output)
+
+    s = report["seconds"]
+    log(f"{report['rows']:,} rows in {report['chunks']} chunks of {report['chunk_rows']:,} "
+        f"(~{report['estimated_training_mb']:.0f} MB each), {report['trees']} trees, "
+        f"model {report['model_mb']:.1f} MB; scan {s['scan']:.1f}s + fit {s['fit']:.1f}s; "
+        f"peak RSS {peak_rss_mb():.0f} MB -> {args.output}")
+    if args.eval:
+        log(f"r2 on {args.eval}: {evaluate(pipeline, args.eval):.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""Shared fixtures: the shipped pipeline and predictors built from it."""
+
+from __future__ import annotations
+
+import warnings
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+pd = pytest.importorskip("pandas")
+
+from insurance_predictor import DEFAULT_MODEL_PATH, ROOT  # noqa: E402
+from insurance_predictor.compiled import compile_pipeline  # noqa: E402
+from insurance_predictor.inference import FEATURES, Predictor  # noqa: E402
+
+# Out-of-range or unknown inputs that every scoring path must reject.
+INVALID_ROWS = [
+    {"age": 150, "sex": "male", "bmi": 27.5, "children": 1, "smoker": "no", "region": "southwest"},
+    {"age": -5, "sex": "male", "bmi": 27.5, "children": 1, "smoker": "no", "region": "southwest"},
+    {"age": 30, "sex": "male", "bmi": 500, "children": 1, "smoker": "no", "region": "southwest"},
+    {"age": 30, "sex": "male", "bmi": 2, "children": 1, "smoker": "no", "region": "southwest"},
+    {"age": 30, "sex": "male", "bmi": 27.5, "children": 40, "smoker": "no", "region": "southwest"},
+    {"age": 30, "sex": "male", "bmi": float("nan"), "children": 1, "smoker": "no", "region": "southwest"},
+    {"age": 30, "sex": "other", "bmi": 27.5, "children": 1, "smoker": "no", "region": "southwest"},
+    {"age": 30, "sex": "male", "bmi": 27.5, "children": 1, "smoker": "no", "region": "mars"},
+]
+# The numeric rows above: the form rejects them, but the pipeline scores them.
+OUT_OF_RANGE_ROWS = INVALID_ROWS[:5]
+
+
+@pytest.fixture(scope="session")
+def pipeline():
+    import joblib
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return joblib.load(DEFAULT_MODEL_PATH)
+
+
+@pytest.fixture(scope="session")
+def compiled(pipeline):
+    return compile_pipeline(pipeline)
+
+
+@pytest.fixture(scope="session")
+def quantized(compiled):
+    from insurance_predictor.quantized import quantize
+
+    return quantize(compiled)
+
+
+@pytest.fixture(scope="session")
+def table(compiled):
+    from insurance_predictor.tabulated import load_for, tabulate
+
+    # The sidecar is not committed; build it when it is missing or stale.
+    return load_for(DEFAULT_MODEL_PATH) or tabulate(compiled)
+
+
+@pytest.fixture(scope="session")
+def forest_predictor(pipeline):
+    return Predictor(pipeline)
+
+
+@pytest.fixture(scope="session")
+def table_predictor(pipeline, table):
+    return Predictor(pipeline, table)
+
+
+@pytest.fixture(scope="session")
+def book():
+    """``insurance.csv`` plus off-grid and edge-of-range rows."""
+    data = pd.read_csv(ROOT / "insurance.csv").drop(columns="expenses")
+    rng = np.random.default_rng(0)
+    n = 2000
+    extra = pd.DataFrame({
+        "age": np.concatenate([rng.uniform(18, 100, n // 2), rng.integers(18, 101, n // 2)]),
+        "sex": rng.choice(["male", "female"], n),
+        "bmi": np.round(rng.uniform(10, 60, n), 2),
+        "children": rng.integers(0, 11, n).astype(float),
+        "smoker": rng.choice(["yes", "no"], n),
+        "region": rng.choice(["southwest", "southeast", "northwest", "northeast"], n),
+    })
+    edges = pd.DataFrame([
+        {"age": 18, "sex": "female", "bmi": 10, "children": 0, "smoker": "no", "region": "northeast"},
+        {"age": 100, "sex": "male", "bmi": 60, "children": 10, "smoker": "yes", "region": "southeast"},
+    ])
+    return pd.concat([data, extra, edges], ignore_index=True)[FEATURES]
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from insurance_predictor.artifact import SUFFIX, load, load_with_header, save
+from insurance_predictor.inference import FEATURES, Predictor
+
+from .conftest import INVALID_ROWS
+
+
+@pytest.mark.parametrize("compress", [False, True], ids=["mmap", "zlib"])
+@pytest.mark.parametrize("kind", ["compiled", "quantized"])
+def test_round_trip(request, tmp_path, pipeline, book, kind, compress):
+    forest = request.getfixturevalue(kind)
+    path = tmp_path / f"model{SUFFIX}"
+    save(forest, path, {"features": FEATURES}, compress=compress)
+    loaded, header = load_with_header(path)
+
+    assert type(loaded) is type(forest)
+    assert header["model"] == forest.kind and header["features"] == FEATURES
+    arrays = loaded.to_arrays()
+    assert arrays.keys() == forest.to_arrays().keys()
+    for name, array in forest.to_arrays().items():
+        assert arrays[name].dtype == array.dtype
+        np.testing.assert_array_equal(arrays[name], array)
+    np.testing.assert_array_equal(loaded.predict(book), forest.predict(book))
+    if kind == "compiled":
+        np.testing.assert_array_equal(Predictor(loaded).predict(book), pipeline.predict(book))
+
+
+@pytest.mark.parametrize("row", INVALID_ROWS)
+def test_loaded_predictor_rejects_invalid_rows(tmp_path, compiled, row):
+    path = tmp_path / f"model{SUFFIX}"
+    save(compiled, path)
+    predictor = Predictor(load(path))
+    with pytest.raises(ValueError):
+        predictor.predict_one(row)
+    with pytest.raises(ValueError):
+        predictor.predict(pd.DataFrame([row])[FEATURES])
+
+
+def test_rejects_other_files(tmp_path, compiled):
+    path = tmp_path / f"model{SUFFIX}"
+    path.write_bytes(b"ICP")
+    with pytest.raises(ValueError, match="too short"):
+        load(path)
+    path.write_bytes(b"\x80\x04" + bytes(64))
+    with pytest.raises(ValueError, match="bad magic"):
+        load(path)
+
+
+def test_quantized_export_scores_the_held_out_rows(tmp_path, pipeline):
+    from sklearn.metrics import r2_score
+
+    from insurance_predictor import DEFAULT_MODEL_PATH
+    from insurance_predictor.artifact import export
+    from insurance_predictor.training.pipeline import DATA_PATH, holdout_split, load_dataset
+
+    header = export(DEFAULT_MODEL_PATH, tmp_path / f"model.q{SUFFIX}", DATA_PATH, quantize=True)
+    _, X_test, _, y_test = holdout_split(*load_dataset(DATA_PATH))
+    q = header["quantization"]
+    assert q["rows"] == len(y_test) < len(load_dataset(DATA_PATH)[1])
+    assert q["r2"] == pytest.approx(r2_score(y_test, pipeline.predict(X_test)))
+    assert abs(q["r2_delta"]) < 1e-6
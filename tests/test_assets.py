@@ -0,0 +1,172 @@
+import json
+import re
+import shutil
+import subprocess
+
+import pytest
+
+from insurance_predictor import assets
+
+NODE = shutil.which("node")
+needs_node = pytest.mark.skipif(NODE is None, reason="node is not installed")
+
+# Each case prints what it computed; the bundle must print the same.
+JS_CASES = {
+    "regex_literals": r"""
+var out = [];
+var re = /\/\/[^\n]*|\/\*.*?\*\//g;
+out.push("a//b/*c*/".replace(re, ""));
+out.push(/[/]/.test("/"), /a\/b/.source, /\//g.flags, [/x/][0].source);
+function pick(s) {
+  return /\/\/ k/.test(s) ? "comment-like" : "plain";
+}
+out.push(pick("// k"), pick("k"));
+function quoted(s) {
+  return /["'`]/.test(s) ? typeof /'/ : "none";
+}
+out.push(quoted("it's"), quoted("x"));
+var ok = true, hits = 0;
+if (ok) /\/\/x/.test("//x") && hits++;
+out.push(hits);
+console.log(JSON.stringify(out));
+""",
+    "division": r"""
+var a = 8, g = 2, i = 1, xs = [4];
+var out = [a / 2 / i, a /g/ i, xs[0] / 2, (a) / g, 10 /2/ 5];
+console.log(JSON.stringify(out));
+""",
+    "comment_markers_in_strings": r"""
+var out = ["http://example.com", 'c /* not a comment */ d', "it's // fine", 'a\'//b', "/*", "*/"];
+out.push("x" + /* real comment */ "y"); // trailing comment
+console.log(JSON.stringify(out));
+""",
+    "template_literals": r"""
+var name = "w", a = 3;
+var out = [
+  `x // ${name + `/* ${a} */`} y ${ {k: 1}.k }`,
+  `line one
+    // indented, not a comment
+  line three`,
+  `\` ${"}"} \${a} ${a /2/ 1}`,
+  `${ `${ `${a}` }` }`,
+];
+console.log(JSON.stringify(out));
+""",
+    "asi_line_breaks": r"""
+var out = [];
+var t = 1
+var u = t
+var i = 1
+++i
+out.push(t, u, i)
+function f() {
+  return
+  42
+}
+out.push(String(f()))
+var g = function () { return 5 }
+var h = 2
+  * 3
+out.push(g(), h)
+var s = "a"
+;[1, 2].forEach(function (x) { out.push(x) })
+console.log(JSON.stringify(out))
+""",
+}
+
+
+def _run_node(code: str) -> str:
+    done = subprocess.run([NODE, "-e", code], capture_output=True, text=True, timeout=30)
+    assert done.returncode == 0, done.stderr
+    return done.stdout
+
+
+def _build(tmp_path, script: str, include: str = "var included = 1;\n"):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "lib.js").write_text(include)
+    (src / "index.html").write_text(
+        "<html><head><style>body { color: red; }</style></head><body>\n"
+        '<script src="lib.js"></script>\n'
+        f"<script>{script}</script>\n</body></html>\n"
+    )
+    manifest = assets.build(src, tmp_path / "dist")
+    (js,) = [name for name in manifest["files"] if name.endswith(".js")]
+    return src, (tmp_path / "dist" / js).read_text()
+
+
+@needs_node
+@pytest.mark.parametrize("case", sorted(JS_CASES))
+def test_bundled_js_behaves_like_the_source(tmp_path, case):
+    src, bundled = _build(tmp_path, JS_CASES[case])
+    source = (src / "lib.js").read_text() + JS_CASES[case]
+    expected = _run_node(source)
+    assert expected.strip()
+    assert _run_node(bundled) == expected
+
+
+def test_frontend_bundle_is_self_contained(tmp_path):
+    # The real sources, so anything the page links to must exist.
+    out = tmp_path / "dist"
+    manifest = assets.build(assets.FRONTEND, out)
+    assert manifest["source_sha256"] == assets.source_hash(assets.FRONTEND)
+    for name in manifest["files"]:
+        if name.endswith((".html", ".css")):
+            text = (out / name).read_text()
+            links = re.findall(r'(?:href|src)="([^"]+)"', text) + re.findall(r"url\(['\"]?([^'\")]+)", text)
+            for link in links:
+                assert "//" not in link, f"{name} loads {link} from another origin"
+                assert link.startswith("data:") or (out / link).exists(), f"{name} links to missing {link}"
+
+
+@needs_node
+def test_frontend_bundle_parses(tmp_path):
+    # The page script needs a DOM, so only check that its bundle still parses.
+    manifest = assets.build(assets.FRONTEND, tmp_path / "dist")
+    (js,) = [name for name in manifest["files"] if name.endswith(".js")]
+    done = subprocess.run([NODE, "--check", str(tmp_path / "dist" / js)], capture_output=True, text=True)
+    assert done.returncode == 0, done.stderr
+
+
+@pytest.mark.parametrize("css, expected", [
+    ("a { color: red; }\n/* gone */\nb > c { margin: 0 auto; }", "a{color:red}b>c{margin:0 auto}"),
+    ('p::before { content: "a  /*  b */  ;}"; }', 'p::before{content:"a  /*  b */  ;}"}'),
+    ("div { background: url('x  y.png') ; }", "div{background:url('x  y.png')}"),
+    ("@media (max-width: 600px) { a { b: c } }", "@media (max-width: 600px){a{b:c}}"),
+])
+def test_minify_css_keeps_strings(css, expected):
+    assert assets.minify_css(css) == expected
+
+
+def _page_function(html: str, name: str) -> str:
+    match = re.search(rf"^function {name}\(.*?^}}$", html, re.S | re.M)
+    assert match, f"{name} not found"
+    return match.group(0)
+
+
+@needs_node
+def test_particle_grid_finds_every_neighbour():
+    # checkNeighbours from the benchmark page, on a stub canvas, at sizes
+    # whose width and height are not multiples of the cell and down to one cell.
+    root = assets.FRONTEND.parent
+    page = (root / "benchmarks" / "bench_particles.html").read_text()
+    script = "\n".join([
+        (assets.FRONTEND / "particles.js").read_text(),
+        _page_function(page, "seeded"),
+        _page_function(page, "checkNeighbours"),
+        "const ctx = new Proxy({}, { get: () => () => {} });",
+        "const canvas = () => ({ getContext: () => ctx });",
+        "const sizes = [[65, 1280, 720], [600, 1280, 720], [300, 1000, 333], [80, 100, 90], [200, 2000, 150]];",
+        "const out = sizes.map(([n, w, h]) => checkNeighbours(canvas(), n, 60, w, h));",
+        # Control: a grid that skips the below-left cell must fail the check.
+        "const scan = ParticleField.prototype._scan;",
+        "ParticleField.prototype._scan = function (i, c) {",
+        "  if (c % this.cols !== this.nodeCell[i] % this.cols - 1) scan.call(this, i, c);",
+        "};",
+        "out.push(checkNeighbours(canvas(), 600, 20));",
+        "console.log(JSON.stringify(out));",
+    ])
+    *checked, broken = json.loads(_run_node(script))
+    for check in checked:
+        assert check["edges"] > 0 and check["missing"] == check["extra"] == 0, check
+    assert broken["missing"] > 0 and broken["extra"] == 0
@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+
+from insurance_predictor.batch import PREDICTION_COLUMN, main, score_file
+
+from .conftest import INVALID_ROWS
+
+
+def test_score_file_replaces_output_only_on_success(tmp_path, book):
+    src, out = tmp_path / "book.csv", tmp_path / "priced.csv"
+    book.iloc[:25].to_csv(src, index=False)
+    stats = score_file(src, out, chunk_size=10)
+    assert (stats.rows, stats.chunks) == (25, 3)
+    assert len(pd.read_csv(out)[PREDICTION_COLUMN]) == 25
+
+    bad = pd.concat([book.iloc[:23], pd.DataFrame([INVALID_ROWS[-1]])], ignore_index=True)
+    bad.to_csv(src, index=False)
+    with pytest.raises(ValueError, match=r"chunk 3 \(rows 20-23\): unknown region"):
+        score_file(src, out, chunk_size=10)
+    assert len(pd.read_csv(out)) == 25  # the earlier output is untouched
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["book.csv", "priced.csv"]
+
+
+def test_cli_reports_failed_chunk(tmp_path, book, capsys):
+    src, out = tmp_path / "book.csv", tmp_path / "priced.csv"
+    pd.concat([book.iloc[:3], pd.DataFrame([INVALID_ROWS[-1]])], ignore_index=True).to_csv(src, index=False)
+    assert main([str(src), "-o", str(out), "-q"]) == 1
+    assert "chunk 1 (rows 0-3)" in capsys.readouterr().err
+    assert not out.exists()
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from insurance_predictor.compiled import _column_specs, fold_thresholds
+from insurance_predictor.inference import FEATURES
+
+from .conftest import OUT_OF_RANGE_ROWS
+
+
+def _numeric_splits(pipeline):
+    """``(source, mean, scale, sklearn thresholds)`` for each scaled column."""
+    columns, affine, _ = _column_specs(pipeline.steps[0][1])
+    trees = [e.tree_ for e in pipeline.steps[-1][1].estimators_]
+    for j, (col, (mean, scale)) in enumerate(zip(columns, affine)):
+        if col.kind != "numeric":
+            continue
+        t = np.unique(np.concatenate([tree.threshold[(tree.feature == j) & (tree.children_left != -1)]
+                                      for tree in trees]))
+        yield col.source, mean, scale, t
+
+
+def test_compiled_matches_pipeline(pipeline, compiled, book):
+    np.testing.assert_array_equal(compiled.predict(book), pipeline.predict(book))
+
+
+def test_compiled_matches_pipeline_outside_the_form_ranges(pipeline, compiled):
+    frame = pd.DataFrame(OUT_OF_RANGE_ROWS)[FEATURES]
+    np.testing.assert_array_equal(compiled.predict(frame), pipeline.predict(frame))
+
+
+def test_folded_thresholds_are_exact(pipeline):
+    for _, mean, scale, t in _numeric_splits(pipeline):
+        x = fold_thresholds(t, mean, scale)
+        assert (((x - mean) / scale).astype(np.float32) <= t).all()
+        above = np.nextafter(x, np.inf)
+        assert (((above - mean) / scale).astype(np.float32) > t).all()
+
+
+def test_compiled_matches_pipeline_on_every_split_value(pipeline, compiled):
+    # Each raw split value and the next float above it, so every split is
+    # taken both ways by some row.
+    base = {"age": 40, "sex": "female", "bmi": 30.0, "children": 2, "smoker": "yes", "region": "northwest"}
+    frames = []
+    for source, mean, scale, t in _numeric_splits(pipeline):
+        x = fold_thresholds(t, mean, scale)
+        values = np.concatenate([x, np.nextafter(x, np.inf)])
+        frames.append(pd.DataFrame({**{f: [base[f]] * len(values) for f in FEATURES}, source: values}))
+    frame = pd.concat(frames, ignore_index=True)[FEATURES]
+    np.testing.assert_array_equal(compiled.predict(frame), pipeline.predict(frame))
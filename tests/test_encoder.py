@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from insurance_predictor.encoder import InputEncoder
+from insurance_predictor.inference import normalize_profile
+
+from .conftest import INVALID_ROWS
+
+
+@pytest.fixture(scope="module")
+def design(pipeline):
+    return InputEncoder.for_preprocessor(pipeline.steps[0][1])
+
+
+def test_encode_matches_preprocessor(pipeline, design, book):
+    np.testing.assert_array_equal(design.encode(book), pipeline.steps[0][1].transform(book))
+
+
+def test_encode_one_matches_encode(design, book):
+    rows = book.iloc[:200]
+    for i, row in enumerate(rows.to_dict("records")):
+        np.testing.assert_array_equal(design.encode_one(normalize_profile(row)), design.encode(rows.iloc[i:i + 1]))
+
+
+@pytest.mark.parametrize("row", INVALID_ROWS)
+def test_every_entry_point_rejects_invalid_rows(design, row):
+    columns = {f: np.array([v]) for f, v in row.items()}
+    with pytest.raises(ValueError):
+        design.encode_one(normalize_profile(row))
+    with pytest.raises(ValueError):
+        design.encode(columns)
+    with pytest.raises(ValueError):
+        design.validate(columns)
@@ -0,0 +1,55 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from insurance_predictor.training.incremental import retrain
+from insurance_predictor.training.pipeline import DATA_PATH, FOREST_PARAMS
+
+N_TREES = FOREST_PARAMS["n_estimators"]
+
+
+def _trees(out_dir, report):
+    return joblib.load(out_dir / report["artifacts"]["model"]).steps[-1][1].estimators_
+
+
+def _same(a, b) -> bool:
+    return all(np.array_equal(getattr(a.tree_, k), getattr(b.tree_, k))
+               for k in ("feature", "threshold", "children_left", "value"))
+
+
+@pytest.fixture(scope="module")
+def claims():
+    return pd.read_csv(DATA_PATH)
+
+
+@pytest.mark.parametrize("mode", ["add", "replace"])
+def test_warm_start_keeps_earlier_trees(tmp_path, claims, mode):
+    data, out = tmp_path / "claims.csv", tmp_path / "models"
+    claims.iloc[:1000].to_csv(data, index=False)
+    first = retrain(data, out, mode, log=lambda msg: None)
+    assert first["full_retrain"]
+    old = _trees(out, first)
+
+    claims.to_csv(data, index=False)  # 338 rows appended
+    second = retrain(data, out, mode, log=lambda msg: None)
+    k = -(-N_TREES * 338 // len(claims))
+    assert not second["full_retrain"] and second["preprocessing"] == "reused"
+    assert second["trees"]["added"] == k
+    new = _trees(out, second)
+    kept = old if mode == "add" else old[k:]
+    assert len(new) == len(kept) + k
+    assert all(_same(a, b) for a, b in zip(kept, new))
+    assert not any(_same(old[-1], b) for b in new[len(kept):])  # the new trees were refit
+    assert retrain(data, out, mode, log=lambda msg: None) is None
+
+
+def test_edited_row_forces_a_full_retrain(tmp_path, claims):
+    data, out = tmp_path / "claims.csv", tmp_path / "models"
+    claims.iloc[:600].to_csv(data, index=False)
+    retrain(data, out, log=lambda msg: None)
+    edited = claims.iloc[:700].copy()
+    edited.loc[10, "bmi"] += 1
+    edited.to_csv(data, index=False)
+    report = retrain(data, out, log=lambda msg: None)
+    assert report["full_retrain"] and report["reason"].startswith("rows 0-")
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from insurance_predictor.inference import FEATURES, NATIVE_BATCH_ROWS
+
+from .conftest import INVALID_ROWS
+
+
+@pytest.mark.parametrize("row", INVALID_ROWS)
+@pytest.mark.parametrize("path", ["forest_predictor", "table_predictor"])
+def test_batch_predict_rejects_invalid_rows(request, path, row):
+    predictor = request.getfixturevalue(path)
+    valid = {"age": 40, "sex": "female", "bmi": 30.0, "children": 2, "smoker": "yes", "region": "northwest"}
+    frame = pd.DataFrame([valid, row])[FEATURES]
+    with pytest.raises(ValueError):
+        predictor.predict(frame)
+    with pytest.raises(ValueError):
+        predictor.predict({f: frame[f].to_numpy() for f in FEATURES})
+
+
+@pytest.mark.parametrize("row", INVALID_ROWS)
+def test_table_and_forest_reject_with_the_same_message(forest_predictor, table_predictor, row):
+    frame = pd.DataFrame([row])[FEATURES]
+    with pytest.raises(ValueError) as forest_error:
+        forest_predictor.predict(frame)
+    with pytest.raises(ValueError) as table_error:
+        table_predictor.predict(frame)
+    assert str(table_error.value) == str(forest_error.value)
+
+
+@pytest.mark.parametrize("path", ["forest_predictor", "table_predictor"])
+def test_predict_one_matches_pipeline(request, pipeline, book, path):
+    predictor = request.getfixturevalue(path)
+    rows = book.iloc[::17]
+    costs = [predictor.predict_one(row) for row in rows.to_dict("records")]
+    np.testing.assert_array_equal(costs, pipeline.predict(rows))
+
+
+@pytest.mark.parametrize("row", INVALID_ROWS)
+@pytest.mark.parametrize("path", ["forest_predictor", "table_predictor"])
+def test_predict_one_rejects_invalid_rows(request, path, row):
+    with pytest.raises(ValueError):
+        request.getfixturevalue(path).predict_one(row)
+
+
+def test_forest_matches_pipeline(pipeline, forest_predictor, book):
+    # Below NATIVE_BATCH_ROWS the compiled forest scores; above, sklearn's trees.
+    for frame in (book.iloc[:NATIVE_BATCH_ROWS - 1], book):
+        np.testing.assert_array_equal(forest_predictor.predict(frame), pipeline.predict(frame))
+
+
+def test_table_matches_pipeline(pipeline, table_predictor, book):
+    np.testing.assert_array_equal(table_predictor.predict(book), pipeline.predict(book))
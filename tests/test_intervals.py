@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from insurance_predictor.inference import NATIVE_BATCH_ROWS, FEATURES
+
+from .conftest import INVALID_ROWS
+
+QUANTILES = (0.0, 0.05, 0.5, 0.95, 1.0)
+
+
+@pytest.mark.parametrize("rows", [500, None], ids=["compiled", "native"])
+def test_distribution_matches_per_tree_predictions(pipeline, forest_predictor, book, rows):
+    frame = book.iloc[:rows]
+    assert (len(frame) >= NATIVE_BATCH_ROWS) == (rows is None)
+    dist = forest_predictor.predict_distribution(frame, QUANTILES, std=True)
+    X = pipeline.steps[0][1].transform(frame)
+    per_tree = np.stack([e.predict(X) for e in pipeline.steps[-1][1].estimators_])
+
+    np.testing.assert_array_equal(dist.mean, pipeline.predict(frame))
+    for q in QUANTILES:
+        np.testing.assert_allclose(dist.quantiles[q], np.quantile(per_tree, q, axis=0), rtol=1e-12)
+    np.testing.assert_allclose(dist.std, per_tree.std(axis=0), rtol=1e-9)
+
+
+@pytest.mark.parametrize("row", INVALID_ROWS)
+def test_distribution_rejects_invalid_rows(forest_predictor, row):
+    with pytest.raises(ValueError):
+        forest_predictor.predict_distribution_one(row)
+    with pytest.raises(ValueError):
+        forest_predictor.predict_distribution({f: [row[f]] for f in FEATURES})
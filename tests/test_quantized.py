@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from insurance_predictor.inference import FEATURES, Predictor
+
+from .conftest import INVALID_ROWS
+
+
+def test_quantized_reaches_the_same_leaves(compiled, quantized, book):
+    X = compiled.encode(book)
+    blocks = zip(compiled.iter_tree_values(X), quantized.iter_tree_values(X))
+    for (start, full), (_, reduced) in blocks:
+        np.testing.assert_array_equal(reduced, full.astype(np.float32))
+
+
+def test_quantized_matches_pipeline(pipeline, quantized, book):
+    np.testing.assert_allclose(quantized.predict(book), pipeline.predict(book), rtol=1e-6)
+
+
+def test_rebuilt_thresholds_match(compiled, quantized):
+    np.testing.assert_array_equal(quantized.threshold, compiled.threshold)
+    np.testing.assert_array_equal(quantized.left, compiled.left)
+    np.testing.assert_array_equal(quantized.right, compiled.right)
+
+
+@pytest.mark.parametrize("row", INVALID_ROWS)
+def test_quantized_predictor_rejects_invalid_rows(quantized, row):
+    predictor = Predictor(quantized)
+    with pytest.raises(ValueError):
+        predictor.predict_one(row)
+    with pytest.raises(ValueError):
+        predictor.predict({f: [row[f]] for f in FEATURES})
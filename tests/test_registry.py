@@ -0,0 +1,59 @@
+import os
+import shutil
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+
+from insurance_predictor import DEFAULT_MODEL_PATH, ROOT
+from insurance_predictor.registry import ModelRegistry, publish
+from insurance_predictor.serving import ModelPool
+
+
+def _touch_later(path):
+    # Filesystems with coarse timestamps could otherwise keep the old mtime.
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+def test_registry_reloads_a_replaced_artifact(tmp_path):
+    path = tmp_path / "model.bin"
+    path.write_bytes(b"v1")
+    registry = ModelRegistry(loader=lambda p: open(p, "rb").read())
+    assert registry.get(path) == b"v1"
+    assert registry.get(path) is registry.get(path)
+
+    path.write_bytes(b"v2")
+    _touch_later(path)
+    assert registry.get(path) == b"v2"
+    registry.evict(path)
+    assert registry.info(path) is None
+
+
+def test_pool_serves_a_replaced_model(tmp_path, pipeline, book):
+    live = tmp_path / "live.pkl"
+    shutil.copyfile(DEFAULT_MODEL_PATH, live)
+    pool = ModelPool({"live": live}, cache_dir=tmp_path / "cache")
+    first = pool.predictor("live")
+    assert pool.predictor("live") is first
+
+    # Identical bytes under another route share the loaded predictor.
+    copy = tmp_path / "copy.pkl"
+    shutil.copyfile(DEFAULT_MODEL_PATH, copy)
+    pool.add("copy", copy)
+    assert pool.predictor("copy") is first
+
+    data = pd.read_csv(ROOT / "insurance.csv")
+    regressor = pipeline.steps[-1][0]
+    small = clone(pipeline).set_params(**{f"{regressor}__n_estimators": 3, f"{regressor}__n_jobs": 1})
+    small.fit(data.drop(columns="expenses"), data["expenses"])
+    candidate = tmp_path / "candidate.pkl"
+    joblib.dump(small, candidate)
+    publish(candidate, live)
+    _touch_later(live)
+
+    replaced = pool.predictor("live")
+    assert replaced is not first
+    np.testing.assert_array_equal(replaced.predict(book), small.predict(book))
+    assert pool.predictor("copy") is first
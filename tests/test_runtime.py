@@ -0,0 +1,72 @@
+import json
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from insurance_predictor import DEFAULT_MODEL_PATH, ROOT
+from insurance_predictor.artifact import SUFFIX, export
+from insurance_predictor.inference import FEATURES
+from insurance_predictor.runtime import HEAVY_MODULES, load_runtime
+from insurance_predictor.tabulated import TABLE_SUFFIX, TabulatedModel, source_sha256
+
+from .conftest import INVALID_ROWS
+
+# Runs the runtime CLI with the heavy modules made unimportable.
+BLOCKED = f"""
+import runpy, sys
+
+class Blocked:
+    def find_spec(self, name, path=None, target=None):
+        if name.split(".")[0] in {HEAVY_MODULES!r}:
+            raise ImportError(f"{{name}} is blocked")
+
+sys.meta_path.insert(0, Blocked())
+sys.argv[0] = "runtime"
+runpy.run_module("insurance_predictor.runtime", run_name="__main__")
+"""
+
+
+@pytest.fixture(scope="module")
+def artifact(tmp_path_factory, table):
+    path = tmp_path_factory.mktemp("runtime") / f"model{SUFFIX}"
+    export(DEFAULT_MODEL_PATH, path)
+    # Picked up by name from the header's source_artifact.
+    TabulatedModel(table.axes, table.table, source_sha256(DEFAULT_MODEL_PATH)).save(
+        path.with_name(DEFAULT_MODEL_PATH.stem + TABLE_SUFFIX))
+    assert load_runtime(path, "sync").table is not None
+    return path
+
+
+def _run(artifact, rows, *args):
+    stdin = "".join(json.dumps(row) + "\n" for row in rows)
+    done = subprocess.run([sys.executable, "-c", BLOCKED, str(artifact), "--timing", *args], input=stdin,
+                          capture_output=True, text=True, cwd=ROOT, timeout=120)
+    assert done.returncode == 0, done.stderr
+    assert "imported" not in done.stderr
+    return [json.loads(line) for line in done.stdout.splitlines()], done.stderr
+
+
+@pytest.mark.parametrize("table_mode", ["none", "sync"])
+def test_runtime_matches_the_pipeline_without_pandas_or_sklearn(artifact, pipeline, book, table_mode):
+    sample = book.sample(400, random_state=0)
+    rows = [{k: (v.item() if hasattr(v, "item") else v) for k, v in row.items()}
+            for row in sample[FEATURES].to_dict("records")]
+    out, stderr = _run(artifact, rows, "--table", table_mode)
+    assert stderr.startswith("ready in")
+    np.testing.assert_allclose([o["cost"] for o in out], pipeline.predict(sample[FEATURES]), rtol=1e-9)
+
+
+def test_runtime_rejects_invalid_rows_like_the_predictor(artifact, forest_predictor):
+    out, _ = _run(artifact, INVALID_ROWS, "--table", "none")
+    for row, answer in zip(INVALID_ROWS, out):
+        with pytest.raises(ValueError) as exc:
+            forest_predictor.predict_one(row)
+        assert answer == {"error": str(exc.value)}
+
+
+def test_blocker_blocks():
+    script = BLOCKED.replace("runpy.run_module", "import pandas; runpy.run_module")
+    done = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, cwd=ROOT, timeout=60)
+    assert done.returncode != 0 and "pandas is blocked" in done.stderr
@@ -0,0 +1,49 @@
+import json
+
+import numpy as np
+import pytest
+from sklearn.linear_model import Ridge
+
+from insurance_predictor.training.pipeline import holdout_split, load_dataset
+from insurance_predictor.training.search import TrialCache, candidates, successive_halving
+
+# Cheap to fit, and alpha spreads the scores far enough apart to rank.
+POOL = candidates({"ridge": (Ridge, {"alpha": [0.01, 0.1, 1.0, 10.0, 100.0, 1e3, 1e4, 1e5, 1e6]})})
+
+
+@pytest.fixture(scope="module")
+def train_split():
+    X_train, _, y_train, _ = holdout_split(*load_dataset())
+    return X_train, y_train
+
+
+def _search(train_split, cache=None):
+    return successive_halving(*train_split, POOL, n_splits=5, eta=3, min_resources=100,
+                              n_jobs=1, cache=cache, log=lambda msg: None)
+
+
+def test_budget_grows_by_eta_while_the_pool_shrinks(train_split):
+    result = _search(train_split)
+    full = len(train_split[1]) * 4 // 5  # rows in each fold's training part
+    assert result.rounds == [
+        {"round": 0, "candidates": 9, "n_samples": full // 3, "fits": 45, "cached": 0},
+        {"round": 1, "candidates": 3, "n_samples": full, "fits": 15, "cached": 0},
+    ]
+    assert result.trials.groupby("round").size().tolist() == [9, 3]
+
+
+def test_survivors_and_best_are_the_top_scores(train_split):
+    result = _search(train_split)
+    trials = result.trials
+    first, last = trials[trials["round"] == 0], trials[trials["round"] == 1]
+    assert set(last["params"]) == set(first.nlargest(3, "mean_r2")["params"])
+    for _, row in trials.iterrows():
+        assert row["mean_r2"] == pytest.approx(np.mean(json.loads(row["fold_r2"])), abs=1e-6)
+    assert json.dumps(dict(result.best.params)) == last.loc[last["mean_r2"].idxmax(), "params"]
+
+
+def test_rerun_takes_every_trial_from_the_cache(tmp_path, train_split):
+    first = _search(train_split, TrialCache(tmp_path))
+    again = _search(train_split, TrialCache(tmp_path))
+    assert again.cached_trials == 60 and [r["fits"] for r in again.rounds] == [0, 0]
+    assert again.best == first.best
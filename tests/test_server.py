@@ -0,0 +1,143 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from insurance_predictor import DEFAULT_MODEL_PATH
+from insurance_predictor.server import MicroBatcher, PredictionServer
+from insurance_predictor.serving import single
+from insurance_predictor.telemetry import telemetry
+
+from .conftest import INVALID_ROWS
+
+PROFILE = {"age": 30, "sex": "male", "bmi": 27.5, "children": 1, "smoker": "no", "region": "southwest"}
+
+
+async def _exchange(port: int, raw: bytes) -> tuple[int, bytes]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(raw)
+    await writer.drain()
+    response = await asyncio.wait_for(reader.read(), timeout=10)
+    writer.close()
+    if not response:
+        return 0, b""
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split(b" ", 2)[1]), body
+
+
+def _run(requests: list[bytes], tmp_path) -> list[tuple[int, bytes]]:
+    async def main():
+        batcher = MicroBatcher(single(DEFAULT_MODEL_PATH, cache_dir=tmp_path), max_wait=0.001)
+        batcher.start()
+        app = PredictionServer(batcher)
+        server = await asyncio.start_server(app.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            return [await _exchange(port, raw) for raw in requests]
+        finally:
+            app.close()
+            server.close()
+            await batcher.stop()
+
+    return asyncio.run(main())
+
+
+def _post(body: bytes, length: str | None = None) -> bytes:
+    length = str(len(body)) if length is None else length
+    return (b"POST /predict HTTP/1.1\r\nHost: x\r\nConnection: close\r\n"
+            b"Content-Length: " + length.encode() + b"\r\n\r\n" + body)
+
+
+@pytest.mark.parametrize("length", ["abc", "-1", "1.5"])
+def test_bad_content_length_is_a_400(tmp_path, length):
+    [(status, body)] = _run([_post(b"{}", length)], tmp_path)
+    assert status == 400
+    assert "content-length" in json.loads(body)["error"]
+
+
+def test_predict_and_invalid_input(tmp_path, forest_predictor):
+    (ok, body), (bad, _) = _run([
+        _post(json.dumps(PROFILE).encode()),
+        _post(json.dumps({**PROFILE, "age": 150}).encode()),
+    ], tmp_path)
+    assert ok == 200
+    assert json.loads(body)["cost"] == pytest.approx(forest_predictor.predict_one(PROFILE))
+    assert bad == 400
+
+
+def test_batch_sizes_are_a_prometheus_histogram(tmp_path):
+    requests = [_post(json.dumps(PROFILE).encode())] * 3 + [b"GET /metrics/prometheus HTTP/1.1\r\nHost: x\r\n"
+                                                            b"Connection: close\r\n\r\n"]
+    *_, (status, body) = _run(requests, tmp_path)
+    assert status == 200
+    lines = body.decode().splitlines()
+    assert "# TYPE insurance_batch_size histogram" in lines
+    assert 'insurance_batch_size_bucket{le="1"} 3' in lines
+    assert 'insurance_batch_size_bucket{le="+Inf"} 3' in lines
+    assert "insurance_batch_size_sum 3.0" in lines
+    assert "insurance_batch_size_count 3" in lines
+
+
+def test_closed_servers_stop_exporting(tmp_path):
+    before = len(telemetry._collectors)
+    _run([_post(json.dumps(PROFILE).encode())] * 2, tmp_path)
+    _run([_post(json.dumps(PROFILE).encode())], tmp_path)
+    assert len(telemetry._collectors) == before
+
+
+def test_micro_batches_match_the_pipeline(tmp_path, pipeline, book):
+    rows = book.iloc[:300].to_dict("records")
+    # Invalid rows spread through the batches must fail only their own request.
+    for i, row in enumerate(INVALID_ROWS):
+        rows.insert(37 * i, row)
+
+    async def main():
+        batcher = MicroBatcher(single(DEFAULT_MODEL_PATH, cache_dir=tmp_path), max_batch=16, max_wait=0.01)
+        batcher.start()
+        try:
+            return await asyncio.gather(*(batcher.predict(r) for r in rows), return_exceptions=True), batcher.stats
+        finally:
+            await batcher.stop()
+
+    results, stats = asyncio.run(main())
+    assert stats.rows == len(rows) and stats.batches < len(rows)
+    errors = [r for r in results if isinstance(r, Exception)]
+    assert len(errors) == len(INVALID_ROWS) and all(isinstance(e, ValueError) for e in errors)
+    scored = [r for r in results if not isinstance(r, Exception)]
+    np.testing.assert_array_equal(scored, pipeline.predict(book.iloc[:300]))
+
+
+class _Recorder:
+    """Stands in for a ``ShadowDeployment``: keeps what it is offered."""
+
+    def __init__(self):
+        self.rows, self.costs = [], []
+
+    def mirror(self, data, predictions):
+        self.rows.extend(zip(*(np.asarray(data[f]).tolist() for f in ("age", "bmi"))))
+        self.costs.extend(np.asarray(predictions).tolist())
+
+
+@pytest.mark.parametrize("with_invalid", [False, True], ids=["batched", "fallback"])
+def test_every_scored_row_is_mirrored(tmp_path, book, with_invalid):
+    rows = book.iloc[:40].to_dict("records")
+    if with_invalid:
+        rows.insert(5, INVALID_ROWS[0])
+    recorder = _Recorder()
+
+    async def main():
+        models = single(DEFAULT_MODEL_PATH, cache_dir=tmp_path)
+        batcher = MicroBatcher(models, max_batch=64, max_wait=0.05)
+        batcher.shadows[models.default] = recorder
+        batcher.start()
+        try:
+            return await asyncio.gather(*(batcher.predict(r) for r in rows), return_exceptions=True)
+        finally:
+            await batcher.stop()
+
+    results = asyncio.run(main())
+    served = [r for r in results if not isinstance(r, Exception)]
+    assert len(served) == 40
+    assert recorder.costs == served
+    assert recorder.rows == [(r["age"], r["bmi"]) for r in book.iloc[:40].to_dict("records")]
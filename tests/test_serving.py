@@ -0,0 +1,81 @@
+import shutil
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.base import clone
+
+from insurance_predictor import DEFAULT_MODEL_PATH, ROOT
+from insurance_predictor.artifact import SUFFIX, export
+from insurance_predictor.serving import ModelPool
+
+
+@pytest.fixture(scope="module")
+def small_models(tmp_path_factory, pipeline):
+    """Three small forests of different sizes, as pickles."""
+    data = pd.read_csv(ROOT / "insurance.csv")
+    regressor = pipeline.steps[-1][0]
+    out = tmp_path_factory.mktemp("models")
+    paths = {}
+    for name, trees in (("a", 2), ("b", 3), ("c", 4)):
+        model = clone(pipeline).set_params(**{f"{regressor}__n_estimators": trees, f"{regressor}__n_jobs": 1})
+        model.fit(data.drop(columns="expenses"), data["expenses"])
+        paths[name] = out / f"{name}.pkl"
+        joblib.dump(model, paths[name])
+    return paths
+
+
+def _resident(pool):
+    return {s["id"] for s in pool.status() if s["loaded"]}
+
+
+def test_identical_models_are_loaded_once(tmp_path, book):
+    copy = tmp_path / "copy.pkl"
+    shutil.copyfile(DEFAULT_MODEL_PATH, copy)
+    exported = tmp_path / f"export{SUFFIX}"
+    export(DEFAULT_MODEL_PATH, exported)
+    cache = tmp_path / "cache"
+    pool = ModelPool({"pkl": DEFAULT_MODEL_PATH, "copy": copy, "icpf": exported}, cache_dir=cache)
+
+    served = {model_id: pool.predictor(model_id) for model_id in pool.ids()}
+    assert served["pkl"] is served["copy"] is served["icpf"]
+    summary = pool.summary()
+    assert (summary["loads"], summary["loaded"]) == (1, 1)
+    assert summary["resident_bytes"] == pool.status()[0]["memory_bytes"] > 0
+    assert sorted(pool.status()[0]["shared_with"]) == ["copy", "icpf"]
+
+    # Another process (here, pool) maps the forest compiled by the first.
+    other = ModelPool({"copy": copy}, cache_dir=cache)
+    np.testing.assert_array_equal(other.predictor("copy").predict(book), served["pkl"].predict(book))
+    assert other.summary()["shared_cache_hits"] == 1
+    assert other.status()[0]["source"].startswith(str(cache))
+
+
+def test_least_recently_used_is_unloaded_first(small_models, book):
+    probe = ModelPool(small_models, cache_dir=None)
+    for name in small_models:
+        probe.predictor(name)
+    sizes = {s["id"]: s["memory_bytes"] for s in probe.status()}
+    assert len(set(sizes.values())) == 3
+
+    # Room for any two of the three, not for all three.
+    budget = sizes["b"] + sizes["c"]
+    pool = ModelPool(small_models, memory_budget_bytes=budget, cache_dir=None)
+    pool.predictor("a"), pool.predictor("b"), pool.predictor("a")
+    assert _resident(pool) == {"a", "b"}
+    pool.predictor("c")  # b is the least recently used
+    assert _resident(pool) == {"a", "c"} and pool.evictions == 1
+    assert pool.resident_bytes <= budget
+
+    reloaded = pool.predictor("b")  # back on demand; a goes now
+    assert _resident(pool) == {"b", "c"} and (pool.loads, pool.evictions) == (4, 2)
+    np.testing.assert_array_equal(reloaded.predict(book), joblib.load(small_models["b"]).predict(book))
+
+
+def test_a_model_over_the_budget_still_serves(small_models):
+    pool = ModelPool(small_models, memory_budget_bytes=1, cache_dir=None)
+    for name in ("a", "b", "c"):
+        pool.predictor(name)
+        assert _resident(pool) == {name}
+    assert pool.evictions == 2
@@ -0,0 +1,105 @@
+import multiprocessing as mp
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from insurance_predictor import DEFAULT_MODEL_PATH
+from insurance_predictor.inference import FEATURES
+from insurance_predictor.shadow import (
+    PROMOTED, ROLLED_BACK, SHADOWING, STOPPED, Policy, ShadowDeployment, previous_path_for,
+)
+
+pytestmark = pytest.mark.skipif("fork" not in mp.get_all_start_methods(), reason="needs fork")
+
+
+@pytest.fixture
+def pair(tmp_path):
+    live, candidate = tmp_path / "live.pkl", tmp_path / "candidate.pkl"
+    shutil.copyfile(DEFAULT_MODEL_PATH, live)
+    shutil.copyfile(DEFAULT_MODEL_PATH, candidate)
+    return live, candidate
+
+
+def _rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "age": rng.integers(18, 65, n).astype(float),
+        "sex": rng.choice(["male", "female"], n),
+        "bmi": rng.uniform(16, 45, n).round(1),
+        "children": rng.integers(0, 5, n).astype(float),
+        "smoker": rng.choice(["yes", "no"], n),
+        "region": rng.choice(["southwest", "southeast", "northwest", "northeast"], n),
+    }
+
+
+def _in_workers(target, n):
+    ctx = mp.get_context("fork")
+    workers = [ctx.Process(target=target, args=(i,)) for i in range(n)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(60)
+        assert w.exitcode == 0
+
+
+def test_forked_workers_share_one_decision(pair):
+    live, candidate = pair
+    shadow = ShadowDeployment(live, candidate, auto=False).start()
+    before = os.stat(live).st_mtime_ns
+
+    def decide(i):
+        (shadow.promote if i % 2 else shadow.rollback)()
+
+    _in_workers(decide, 8)
+    assert shadow.state in (PROMOTED, ROLLED_BACK)
+    assert previous_path_for(live).exists() == (shadow.state == PROMOTED)
+    assert (os.stat(live).st_mtime_ns != before) == (shadow.state == PROMOTED)
+    assert shadow.report()["reasons"] in (["promoted by hand"], ["rolled back by hand"])
+    shadow.finish(30)
+
+
+def test_forked_workers_feed_one_evaluator(pair):
+    live, candidate = pair
+    shadow = ShadowDeployment(live, candidate, fraction=1.0, policy=Policy(min_samples=10**6), seed=1).start()
+    from insurance_predictor.inference import get_predictor
+
+    def mirror(i):
+        rows = _rows(50, seed=i)
+        shadow.mirror(rows, get_predictor(live).predict(rows))
+
+    _in_workers(mirror, 4)
+    assert shadow.mirrored == 200
+    report = shadow.finish(60)
+    assert report["rows"] == 200
+    assert report["disagreement_rate"] == 0.0
+    assert report["state"] == SHADOWING
+
+
+def test_no_promotion_over_a_replaced_live_model(pair):
+    live, candidate = pair
+    shadow = ShadowDeployment(live, candidate, auto=False).start()
+    live.write_bytes(live.read_bytes() + b"\0")
+    replaced = live.read_bytes()
+    shadow.promote()
+    assert shadow.state == STOPPED
+    assert shadow.report()["reasons"] == ["the live model was replaced"]
+    assert live.read_bytes() == replaced
+    assert not previous_path_for(live).exists()
+    shadow.finish(30)
+
+
+def test_auto_promotion_of_an_identical_candidate(pair):
+    live, candidate = pair
+    shadow = ShadowDeployment(live, candidate, fraction=1.0, policy=Policy(min_samples=100)).start()
+    rows = _rows(150)
+    from insurance_predictor.inference import get_predictor
+
+    served = get_predictor(live).predict(rows)
+    for start in range(0, 150, 10):
+        shadow._offer({f: rows[f][start:start + 10] for f in FEATURES}, served[start:start + 10], block=True)
+    report = shadow.finish(60)
+    assert report["state"] == PROMOTED
+    assert report["reasons"] == ["all limits met"]
+    assert previous_path_for(live).exists()
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from insurance_predictor.inference import FEATURES
+from insurance_predictor.sweep import MAX_CELLS, sweep
+
+BASE = {"age": 30, "sex": "male", "bmi": 27.5, "children": 1, "smoker": "no", "region": "southwest"}
+
+
+def test_grid_shape_and_axis_values(table_predictor):
+    surface = sweep(table_predictor, BASE, [{"name": "age", "start": 18, "stop": 64},
+                                             {"name": "bmi", "start": 15, "stop": 50, "step": 0.1}])
+    age, bmi = surface.axes
+    assert surface.costs.shape == (47, 351)
+    np.testing.assert_array_equal(age.values, np.arange(18, 65))
+    assert bmi.values[0] == 15 and bmi.values[-1] == 50 and bmi.values[3] == 15.3
+    assert surface.to_dict()["cells"] == 47 * 351
+
+
+@pytest.mark.parametrize("predictor", ["forest_predictor", "table_predictor"])
+def test_cells_match_the_pipeline(request, pipeline, predictor):
+    surface = sweep(request.getfixturevalue(predictor), BASE,
+                    [{"name": "children", "step": 2}, {"name": "region"}])
+    children, region = surface.axes
+    np.testing.assert_array_equal(children.values, [0, 2, 4, 6, 8, 10])
+    assert list(region.values) == ["northeast", "northwest", "southeast", "southwest"]
+    rows = pd.DataFrame([{**BASE, "children": c, "region": r} for c in children.values for r in region.values])
+    expected = pipeline.predict(rows[FEATURES]).reshape(surface.costs.shape)
+    np.testing.assert_allclose(surface.costs, expected, rtol=1e-9)
+    assert surface.base_cost == pytest.approx(pipeline.predict(pd.DataFrame([BASE])[FEATURES])[0])
+
+
+def test_one_axis_is_a_line(table_predictor):
+    surface = sweep(table_predictor, BASE, [{"name": "smoker", "values": ["yes", " NO "]}])
+    assert surface.costs.shape == (2,)
+    assert list(surface.axes[0].values) == ["yes", "no"]
+    assert surface.costs[1] == pytest.approx(surface.base_cost)
+
+
+@pytest.mark.parametrize("axes, message", [
+    ([], "one or two"),
+    ([{"name": "age"}] * 3, "one or two"),
+    ([{"name": "age"}, {"name": "age"}], "different inputs"),
+    ([{"name": "age", "start": 10}], "between"),
+    ([{"name": "bmi", "start": 40, "stop": 30}], "start <= stop"),
+    ([{"name": "region", "values": ["mars"]}], "unknown region"),
+    ([{"name": "expenses"}], "cannot sweep"),
+    ([{"name": "age", "step": 1e-3}, {"name": "bmi", "step": 0.01}], f"limit is {MAX_CELLS:,}"),
+])
+def test_rejects_bad_axes(table_predictor, axes, message):
+    with pytest.raises(ValueError, match=message):
+        sweep(table_predictor, BASE, axes)
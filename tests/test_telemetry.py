@@ -0,0 +1,105 @@
+import re
+
+import pytest
+
+from insurance_predictor.telemetry import LATENCY_BUCKETS, Histogram, Telemetry
+
+# One sample line of the text format: name, optional {labels}, value.
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{((?:[a-zA-Z_]\w*="[^"]*",?)*)\})? (\S+)$')
+
+
+def _parse(text: str):
+    """``{family: (type, help, [(name, labels, value)])}``, checking the layout as it goes."""
+    assert text.endswith("\n")
+    families, current = {}, None
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            name, help_text = line[7:].split(" ", 1)
+            assert name not in families, f"{name} declared twice"
+            families[name] = [None, help_text, []]
+            current = name
+        elif line.startswith("# TYPE "):
+            name, kind = line[7:].split(" ")
+            assert name == current and kind in ("counter", "gauge", "histogram")
+            families[name][0] = kind
+        else:
+            match = SAMPLE.match(line)
+            assert match, f"malformed sample line {line!r}"
+            name, labels, value = match.groups()
+            suffixes = ("_bucket", "_sum", "_count") if families[current][0] == "histogram" else ("",)
+            assert name in {current + s for s in suffixes}, f"{name} outside its family {current}"
+            labels = dict(re.findall(r'(\w+)="([^"]*)"', labels or ""))
+            families[current][2].append((name, labels, float(value)))
+    return families
+
+
+@pytest.fixture
+def metrics():
+    t = Telemetry(enabled=True)
+    for seconds in (30e-6, 2e-3, 2e-3, 20.0):
+        t.observe("traversal", seconds)
+    with t.request("quote"):
+        with t.stage("encode"):
+            pass
+    with pytest.raises(ValueError):
+        with t.request("quote"):
+            raise ValueError("bad row")
+    with t.request("sweep"):
+        t.error("sweep", "no axes")
+    return t
+
+
+def test_disabled_records_nothing():
+    t = Telemetry()
+    with t.request("quote"), t.stage("encode"):
+        pass
+    t.observe("traversal", 1.0)
+    t.error("quote")
+    assert (t.requests, t.errors, t.stages, t.latency) == ({}, {}, {}, {})
+
+
+def test_counters(metrics):
+    families = _parse(metrics.prometheus_text())
+    assert families["insurance_requests_total"][0] == "counter"
+    assert families["insurance_requests_total"][2] == [
+        ("insurance_requests_total", {"kind": "quote"}, 2), ("insurance_requests_total", {"kind": "sweep"}, 1)]
+    assert families["insurance_errors_total"][2] == [
+        ("insurance_errors_total", {"kind": "quote"}, 1), ("insurance_errors_total", {"kind": "sweep"}, 1)]
+
+
+def test_histograms_are_cumulative(metrics):
+    families = _parse(metrics.prometheus_text())
+    assert families["insurance_stage_seconds"][0] == "histogram"
+    samples = [s for s in families["insurance_stage_seconds"][2] if s[1]["stage"] == "traversal"]
+    buckets = [(labels["le"], value) for name, labels, value in samples if name.endswith("_bucket")]
+    assert [le for le, _ in buckets] == [f"{b:g}" for b in LATENCY_BUCKETS] + ["+Inf"]
+    counts = [value for _, value in buckets]
+    assert counts == sorted(counts) and counts[0] == 0
+    assert dict(buckets)["5e-05"] == 1 and dict(buckets)["0.0025"] == 3
+    assert dict(buckets)["10"] == 3 and dict(buckets)["+Inf"] == 4
+    tail = {name.rsplit("_", 1)[1]: value for name, _, value in samples[-2:]}
+    assert tail["count"] == 4 and tail["sum"] == pytest.approx(20.00403)
+    assert {s[1]["kind"] for s in families["insurance_request_seconds"][2]} == {"quote", "sweep"}
+
+
+def test_collected_families(metrics):
+    h = Histogram(buckets=(1.0, 10.0))
+    for v in (1, 4, 64):
+        h.observe(v)
+    metrics.add_collector(lambda: [
+        ("cache_entries", "Entries in the quote cache.", "gauge", [({}, 12)]),
+        ("cache_hits_total", "Cache hits, by model.", "counter", [({"model": "a"}, 3), ({"model": "b"}, 0)]),
+        ("batch_size", "Rows per batch.", "histogram", [({}, h)]),
+    ])
+    families = _parse(metrics.prometheus_text())
+    assert families["insurance_cache_entries"] == ["gauge", "Entries in the quote cache.",
+                                                   [("insurance_cache_entries", {}, 12)]]
+    assert [s[1] for s in families["insurance_cache_hits_total"][2]] == [{"model": "a"}, {"model": "b"}]
+    assert [s[2] for s in families["insurance_batch_size"][2]] == [1, 2, 3, 69, 3]
+    assert metrics.snapshot()["collected"]["batch_size"] == {"count": 3, "sum": 69}
+
+
+def test_official_parser_accepts_it(metrics):
+    parser = pytest.importorskip("prometheus_client.parser")
+    names = {f.name: f.type for f in parser.text_string_to_metric_families(metrics.prometheus_text())}
+    assert names["insurance_requests"] == "counter" and names["insurance_stage_seconds"] == "histogram"